@@ -5,9 +5,10 @@ from sqlalchemy import engine_from_config, pool
 from alembic import context
 
 
-# Load environment variables from .env
+# Load environment variables from .env (optional, local development)
 from dotenv import load_dotenv
-load_dotenv(dotenv_path=r"C:\Users\ghara\OneDrive\Desktop\parth\auroraa sentinal\.env")
+if os.getenv("AURORAA_ENV_FILE"):
+    load_dotenv(dotenv_path=os.getenv("AURORAA_ENV_FILE"))
 
 # Ensure Alembic can find app modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,30 @@
+"""content hash
+
+Revision ID: 3c1f5e7a9b20
+Revises: 00b8978b65d7
+Create Date: 2026-10-19 16:20:11.402917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f5e7a9b20'
+down_revision: Union[str, Sequence[str], None] = '00b8978b65d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('watermarks', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_watermark_content', 'watermarks', ['content_hash', 'owner_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_watermark_content', table_name='watermarks')
+    op.drop_column('watermarks', 'content_hash')
@@ -0,0 +1,28 @@
+"""phash
+
+Revision ID: 7d2a9c4e1f36
+Revises: 3c1f5e7a9b20
+Create Date: 2026-10-19 18:05:42.118304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2a9c4e1f36'
+down_revision: Union[str, Sequence[str], None] = '3c1f5e7a9b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('watermarks', sa.Column('phash', sa.String(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('watermarks', 'phash')
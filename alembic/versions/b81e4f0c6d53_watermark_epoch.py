@@ -0,0 +1,53 @@
+"""watermark epoch
+
+Revision ID: b81e4f0c6d53
+Revises: 7d2a9c4e1f36
+Create Date: 2026-10-19 19:12:07.530861
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81e4f0c6d53'
+down_revision: Union[str, Sequence[str], None] = '7d2a9c4e1f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Quarter of created_at as "YYYY-Qn", per dialect
+EPOCH_EXPR = {
+    'mysql': "CONCAT(YEAR(created_at), '-Q', QUARTER(created_at))",
+    'sqlite': "strftime('%Y', created_at) || '-Q' || ((CAST(strftime('%m', created_at) AS INTEGER) + 2) / 3)",
+    'postgresql': "to_char(created_at, 'YYYY') || '-Q' || to_char(created_at, 'Q')",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('watermarks', sa.Column('epoch', sa.String(length=8), nullable=True))
+
+    # Backfill: rows were embedded under the quarter they were created in.
+    # One set-based UPDATE, no rows pulled into Python
+    expr = EPOCH_EXPR.get(op.get_bind().dialect.name, EPOCH_EXPR['postgresql'])
+
+    op.execute(
+        f"UPDATE watermarks SET epoch = {expr} "
+        "WHERE epoch IS NULL AND created_at IS NOT NULL"
+    )
+
+    op.create_index(
+        'ix_watermark_owner_epoch',
+        'watermarks',
+        ['owner_id', 'status', 'algorithm_version', 'epoch'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_watermark_owner_epoch', table_name='watermarks')
+    op.drop_column('watermarks', 'epoch')
@@ -0,0 +1,28 @@
+"""owner created index
+
+Revision ID: d4a7c2e9b815
+Revises: b81e4f0c6d53
+Create Date: 2026-10-19 20:03:51.274410
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7c2e9b815'
+down_revision: Union[str, Sequence[str], None] = 'b81e4f0c6d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_watermark_owner_created', 'watermarks', ['owner_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_watermark_owner_created', table_name='watermarks')
@@ -0,0 +1,123 @@
+"""partition watermarks by quarter, archive table
+
+Revision ID: e5c3a1f7d902
+Revises: d4a7c2e9b815
+Create Date: 2026-10-19 21:10:33.905126
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c3a1f7d902'
+down_revision: Union[str, Sequence[str], None] = 'd4a7c2e9b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Quarters created past the current one; the retention job keeps this
+# many ready from then on
+PARTITIONS_AHEAD = 2
+
+
+def _quarter_start(year: int, quarter: int) -> datetime:
+    return datetime(year, 3 * (quarter - 1) + 1, 1)
+
+
+def _quarters(first: datetime, last: datetime):
+    """
+    (name, exclusive upper bound) per quarter from `first` to `last`.
+    """
+
+    year, quarter = first.year, (first.month - 1) // 3 + 1
+
+    while _quarter_start(year, quarter) <= last:
+
+        next_year, next_quarter = (year + 1, 1) if quarter == 4 else (year, quarter + 1)
+
+        yield f"p{year}q{quarter}", _quarter_start(next_year, next_quarter)
+
+        year, quarter = next_year, next_quarter
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'watermarks_archive',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('owner_id', sa.String(length=36), nullable=False),
+        sa.Column('content_type', sa.String(length=20), nullable=False),
+        sa.Column('mime_type', sa.String(length=100), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.Column('phash', sa.String(length=16), nullable=True),
+        sa.Column('epoch', sa.String(length=8), nullable=True),
+        sa.Column('algorithm_version', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        mysql_row_format='COMPRESSED',
+    )
+    op.create_index('ix_watermark_archive_owner', 'watermarks_archive', ['owner_id', 'created_at'], unique=False)
+
+    bind = op.get_bind()
+
+    bind.execute(sa.text("UPDATE watermarks SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"))
+
+    with op.batch_alter_table('watermarks') as batch_op:
+        batch_op.alter_column(
+            'created_at',
+            existing_type=sa.DateTime(timezone=True),
+            nullable=False,
+            existing_server_default=sa.text('now()'),
+        )
+
+    if bind.dialect.name != 'mysql':
+        # Partitioning is MySQL-only; other backends keep a plain table
+        return
+
+    # The partition key must be part of every unique key
+    op.execute("ALTER TABLE watermarks DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)")
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    first = bind.execute(sa.text("SELECT MIN(created_at) FROM watermarks")).scalar() or now
+
+    last_year, last_quarter = now.year, (now.month - 1) // 3 + 1
+
+    for _ in range(PARTITIONS_AHEAD):
+        last_year, last_quarter = (last_year + 1, 1) if last_quarter == 4 else (last_year, last_quarter + 1)
+
+    partitions = ", ".join(
+        f"PARTITION {name} VALUES LESS THAN ('{bound:%Y-%m-%d %H:%M:%S}')"
+        for name, bound in _quarters(first, _quarter_start(last_year, last_quarter))
+    )
+
+    op.execute(
+        "ALTER TABLE watermarks PARTITION BY RANGE COLUMNS(created_at) "
+        f"({partitions}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'mysql':
+        op.execute("ALTER TABLE watermarks REMOVE PARTITIONING")
+        op.execute("ALTER TABLE watermarks DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+
+    with op.batch_alter_table('watermarks') as batch_op:
+        batch_op.alter_column(
+            'created_at',
+            existing_type=sa.DateTime(timezone=True),
+            nullable=True,
+            existing_server_default=sa.text('now()'),
+        )
+
+    op.drop_index('ix_watermark_archive_owner', table_name='watermarks_archive')
+    op.drop_table('watermarks_archive')
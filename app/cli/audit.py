@@ -0,0 +1,74 @@
+# audit.py
+#
+# Check a dataset (directory, ZIP or TAR) for an owner's watermark and
+# stream NDJSON results, one line per image plus a final summary:
+#
+#     python -m app.cli.audit DATASET --owner OWNER_ID [--epochs 4]
+#                             [--workers N] [--output results.ndjson]
+#                             [--versions v3-continousid,...]
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services.watermark.image.image_audit import iter_source, run_audit
+from app.services.watermark.image.image_config import previous_epochs
+from app.services.watermark.image.image_engine import registered_versions
+
+
+def main(argv: list[str]) -> int:
+
+    parser = argparse.ArgumentParser(description="Audit a dataset for an owner's watermark")
+    parser.add_argument("source", help="directory, .zip or .tar[.gz|.bz2|.xz]")
+    parser.add_argument("--owner", required=True)
+    parser.add_argument("--epochs", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default="-")
+    parser.add_argument(
+        "--versions",
+        default=",".join(registered_versions()),
+        help="comma-separated algorithm versions to check",
+    )
+    args = parser.parse_args(argv)
+
+    epochs = previous_epochs(args.epochs)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+
+    summary = None
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+
+            for record in run_audit(
+                iter_source(args.source),
+                args.owner,
+                epochs,
+                executor,
+                args.workers,
+                args.versions.split(","),
+            ):
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+
+                if record.get("summary"):
+                    summary = record
+
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if summary:
+        print(
+            f"{summary['matched']}/{summary['images']} matched, "
+            f"combined log10(p) = {summary['combined_log10_p']}",
+            file=sys.stderr,
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,439 @@
+# bulk_embed.py
+#
+# Watermark a back catalogue offline. Every supported image under SOURCE
+# is embedded on a process pool and written to the same relative path
+# under OUTPUT (in AURORAA_OUTPUT_FORMAT, .jpg by default). Finished files are recorded in
+# OUTPUT/.auroraa-manifest.jsonl, so re-running resumes where an
+# interrupted run stopped. Each file's watermark ID reaches the manifest
+# ("pending") before its row is inserted, so a rerun records rows a
+# crash left out instead of embedding again. Sources that would write the same output
+# (a.png and a.jpg) are reported as failed rather than overwritten:
+#
+#     python -m app.cli.bulk_embed SOURCE OUTPUT --owner OWNER_ID
+#                                  [--workers N] [--batch-size 500] [--no-db]
+#                                  [--engine VERSION]
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+
+from app.services.watermark.image.image_config import (
+    IMAGE_EXTENSIONS,
+    current_epoch,
+)
+from app.services.watermark.image.image_encoder import output_extension
+from app.services.watermark.image.image_engine import (
+    DEFAULT_ENGINE_VERSION,
+    get_watermark_engine,
+)
+from app.services.watermark.image.image_phash import phash_bytes, phash_hex
+
+MANIFEST_NAME = ".auroraa-manifest.jsonl"
+
+# Tasks queued per worker
+IN_FLIGHT_PER_WORKER = 4
+
+
+# --------------------------------
+# Manifest
+# --------------------------------
+
+def load_manifest(path: str) -> dict[str, dict]:
+    """
+    Latest manifest entry per relative path.
+    """
+
+    done = {}
+
+    if not os.path.exists(path):
+        return done
+
+    with open(path) as f:
+
+        for line in f:
+
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line from an interrupted run
+                continue
+
+            done[entry["path"]] = entry
+
+    return done
+
+
+def is_done(entry: dict | None, stat: os.stat_result) -> bool:
+
+    # "pending": embedded, the row may not be recorded yet
+    return (
+        entry is not None
+        and entry.get("status") in ("ok", "pending")
+        and entry.get("size") == stat.st_size
+        and entry.get("mtime") == stat.st_mtime_ns
+    )
+
+
+# --------------------------------
+# Discovery
+# --------------------------------
+
+def iter_images(root: str):
+
+    for dirpath, dirnames, filenames in os.walk(root):
+
+        dirnames.sort()
+
+        for filename in sorted(filenames):
+
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, root), os.stat(path)
+
+
+def output_path(output_root: str, rel: str) -> str:
+
+    stem, ext = os.path.splitext(rel)
+
+    return os.path.join(output_root, stem + output_extension(ext))
+
+
+# --------------------------------
+# Worker
+# --------------------------------
+
+def _init_worker():
+
+    from app.services.watermark.image.image_parallel import configure_threads
+
+    # One process per core; no tile threads, OpenCV single-threaded
+    configure_threads(1)
+
+
+def embed_file(
+    source_root: str,
+    output_root: str,
+    rel: str,
+    owner_id: str,
+    epoch: str,
+    version: str
+) -> dict:
+
+    start = time.perf_counter()
+
+    try:
+        with open(os.path.join(source_root, rel), "rb") as f:
+            data = f.read()
+
+        marked = get_watermark_engine(version).embed(data, owner_id, epoch)
+
+        phash = phash_bytes(data)
+
+        dest = output_path(output_root, rel)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+        tmp = dest + ".part"
+
+        with open(tmp, "wb") as f:
+            f.write(marked)
+
+        os.replace(tmp, dest)
+
+    except Exception as e:
+        return {"path": rel, "status": "failed", "error": str(e)}
+
+    return {
+        "path": rel,
+        "status": "ok",
+        "content_hash": hashlib.sha256(data).hexdigest(),
+        "phash": phash_hex(phash) if phash is not None else None,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+# --------------------------------
+# Database
+# --------------------------------
+
+def insert_batch(db, entries: list[dict]):
+    """
+    Rows for manifest entries, under the IDs the manifest holds. IDs
+    already committed (a run that crashed after its insert) are skipped.
+    """
+
+    from app.models.models import Watermark
+
+    now = datetime.now(timezone.utc)
+
+    existing = {
+        row.id for row in db.query(Watermark.id).filter(
+            Watermark.id.in_([entry["watermark_id"] for entry in entries])
+        )
+    }
+
+    db.add_all([
+        Watermark(
+            id=entry["watermark_id"],
+            owner_id=entry["owner_id"],
+            content_type="image",
+            mime_type=entry["mime_type"],
+            content_hash=entry["content_hash"],
+            phash=entry.get("phash"),
+            epoch=entry["epoch"],
+            algorithm_version=entry["algorithm_version"],
+            status="active",
+            created_at=now,
+        )
+        for entry in entries
+        if entry["watermark_id"] not in existing
+    ])
+
+    db.commit()
+
+
+# --------------------------------
+# Runner
+# --------------------------------
+
+def main(argv: list[str]) -> int:
+
+    parser = argparse.ArgumentParser(description="Bulk-embed watermarks into a directory tree")
+    parser.add_argument("source")
+    parser.add_argument("output")
+    parser.add_argument("--owner", required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--no-db", action="store_true", help="do not record Watermark rows")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE_VERSION)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+
+    manifest_path = os.path.join(args.output, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    epoch = current_epoch()
+
+    version = get_watermark_engine(args.engine).version
+
+    db = None
+
+    if not args.no_db:
+        from app.database.database import get_engine, SessionLocal
+        get_engine()
+        db = SessionLocal()
+
+    stats = {"ok": 0, "failed": 0, "skipped": 0, "recovered": 0}
+
+    # Embedded by an interrupted run, rows possibly never committed:
+    # record them under the IDs the manifest already holds
+    if db is not None:
+
+        unrecorded = [
+            entry for entry in manifest.values()
+            if entry.get("status") == "pending"
+        ]
+
+        with open(manifest_path, "a") as manifest_file:
+
+            for i in range(0, len(unrecorded), args.batch_size):
+
+                batch = unrecorded[i:i + args.batch_size]
+
+                try:
+                    insert_batch(db, batch)
+
+                except Exception as e:
+                    # Still pending; the next run tries again
+                    db.rollback()
+
+                    stats["failed"] += len(batch)
+
+                    print(f"FAILED recording {len(batch)} rows of an earlier run: {e}", file=sys.stderr)
+                    continue
+
+                for entry in batch:
+                    manifest_file.write(json.dumps({**entry, "status": "ok"}) + "\n")
+
+                manifest_file.flush()
+
+                stats["recovered"] += len(batch)
+
+    # Successful embeds waiting for their DB batch; the manifest is
+    # marked "ok" only once the rows are committed
+    pending_rows: list[dict] = []
+
+    def flush(manifest_file):
+
+        if not pending_rows:
+            return
+
+        if db is not None:
+
+            # IDs on disk before the rows: a crash past this point leaves
+            # "pending" entries for the next run to record
+            for entry in pending_rows:
+                manifest_file.write(json.dumps({**entry, "status": "pending"}) + "\n")
+
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+
+            try:
+                insert_batch(db, pending_rows)
+
+            except Exception as e:
+                # Left pending, so the next run records them
+                db.rollback()
+
+                stats["ok"] -= len(pending_rows)
+                stats["failed"] += len(pending_rows)
+
+                print(f"FAILED batch of {len(pending_rows)} rows: {e}", file=sys.stderr)
+
+                for entry in pending_rows:
+                    print(f"FAILED {entry['path']}: not recorded (pending)", file=sys.stderr)
+
+                pending_rows.clear()
+                return
+
+        for entry in pending_rows:
+            manifest_file.write(json.dumps(entry) + "\n")
+
+        manifest_file.flush()
+        pending_rows.clear()
+
+    # Output path -> source that writes it; a.png and a.jpg both map to
+    # a.jpg when the output format is fixed, and the first one wins
+    claimed = {
+        output_path(args.output, rel): rel
+        for rel, entry in manifest.items()
+        if entry.get("status") in ("ok", "pending")
+    }
+
+    start = time.perf_counter()
+    last_report = start
+
+    max_in_flight = max(1, args.workers * IN_FLIGHT_PER_WORKER)
+
+    with open(manifest_path, "a") as manifest_file, ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+    ) as executor:
+
+        pending = {}
+        todo = iter_images(args.source)
+        exhausted = False
+
+        try:
+            while not exhausted or pending:
+
+                while not exhausted and len(pending) < max_in_flight:
+
+                    try:
+                        rel, stat = next(todo)
+                    except StopIteration:
+                        exhausted = True
+                        break
+
+                    if is_done(manifest.get(rel), stat):
+                        stats["skipped"] += 1
+                        continue
+
+                    dest = output_path(args.output, rel)
+                    owner = claimed.setdefault(dest, rel)
+
+                    if owner != rel:
+                        stats["failed"] += 1
+                        print(f"FAILED {rel}: output {dest} is already written from {owner}", file=sys.stderr)
+                        manifest_file.write(json.dumps({
+                            "path": rel,
+                            "status": "failed",
+                            "error": f"output collides with {owner}",
+                            "size": stat.st_size,
+                            "mtime": stat.st_mtime_ns,
+                        }) + "\n")
+                        continue
+
+                    fut = executor.submit(
+                        embed_file,
+                        args.source,
+                        args.output,
+                        rel,
+                        args.owner,
+                        epoch,
+                        version,
+                    )
+                    pending[fut] = stat
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for fut in done:
+
+                    stat = pending.pop(fut)
+                    result = fut.result()
+
+                    result["size"] = stat.st_size
+                    result["mtime"] = stat.st_mtime_ns
+
+                    if result["status"] == "ok":
+                        stats["ok"] += 1
+                        result["watermark_id"] = str(uuid.uuid4())
+                        result["owner_id"] = args.owner
+                        result["algorithm_version"] = version
+                        result["epoch"] = epoch
+                        result["mime_type"] = (
+                            mimetypes.guess_type(result["path"])[0] or "image/jpeg"
+                        )
+                        pending_rows.append(result)
+                    else:
+                        stats["failed"] += 1
+                        print(f"FAILED {result['path']}: {result['error']}", file=sys.stderr)
+                        manifest_file.write(json.dumps(result) + "\n")
+
+                if len(pending_rows) >= args.batch_size:
+                    flush(manifest_file)
+
+                now = time.perf_counter()
+
+                if now - last_report >= 5:
+                    rate = stats["ok"] / (now - start)
+                    print(
+                        f"{stats['ok']} embedded, {stats['failed']} failed, "
+                        f"{stats['skipped']} skipped, {rate:.1f} images/s",
+                        file=sys.stderr,
+                    )
+                    last_report = now
+
+        finally:
+            flush(manifest_file)
+
+            if db is not None:
+                db.close()
+
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "embedded": stats["ok"],
+        "failed": stats["failed"],
+        "skipped": stats["skipped"],
+        "recovered": stats["recovered"],
+        "seconds": round(elapsed, 2),
+        "images_per_second": round(stats["ok"] / elapsed, 2) if elapsed else 0.0,
+        "workers": args.workers,
+    }))
+
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,182 @@
+# engine_parity.py
+#
+# Check a candidate watermark engine against the reference before
+# rolling it out:
+#
+#     python -m app.cli.engine_parity IMAGES --candidate VERSION_OR_module:attr
+#                                     [--reference v3-continousid]
+#                                     [--score-tolerance 0.02] [--repeat 3]
+#
+# For every image it reports whether the candidate's output is bit-exact
+# with the reference, the max/mean pixel delta between them, verification
+# scores (own, cross-engine, and against another owner's key) and the
+# embed/verify speedup.
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app.services.watermark.image.image_audit import iter_source
+from app.services.watermark.image.image_config import (
+    ALGORITHM_VERSION,
+    current_epoch,
+)
+from app.services.watermark.image.image_engine import load_engine
+
+
+def _timed(fn, repeat: int):
+
+    best = float("inf")
+    result = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    return result, best
+
+
+def _pixels(data: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def compare(reference, candidate, name, image_bytes, owner_id, other_owner_id, epoch, repeat, tolerance):
+
+    ref_out, ref_embed_s = _timed(
+        lambda: reference.embed(image_bytes, owner_id, epoch), repeat
+    )
+    cand_out, cand_embed_s = _timed(
+        lambda: candidate.embed(image_bytes, owner_id, epoch), repeat
+    )
+
+    ref_score, ref_verify_s = _timed(
+        lambda: reference.verify(ref_out, owner_id, epoch)["confidence"], repeat
+    )
+    cand_score, cand_verify_s = _timed(
+        lambda: candidate.verify(cand_out, owner_id, epoch)["confidence"], repeat
+    )
+
+    # The reference must still read candidate output and vice versa
+    cross_ref = reference.verify(cand_out, owner_id, epoch)["confidence"]
+    cross_cand = candidate.verify(ref_out, owner_id, epoch)["confidence"]
+
+    # Candidate output must not verify for someone else
+    other_owner = candidate.verify(cand_out, other_owner_id, epoch)["confidence"]
+
+    ref_px = _pixels(ref_out)
+    cand_px = _pixels(cand_out)
+
+    if ref_px.shape == cand_px.shape:
+        diff = np.abs(ref_px.astype(np.int16) - cand_px.astype(np.int16))
+        max_delta = int(diff.max())
+        mean_delta = float(diff.mean())
+    else:
+        max_delta = None
+        mean_delta = None
+
+    score_delta = max(
+        abs(cand_score - ref_score),
+        abs(cross_ref - ref_score),
+        abs(cross_cand - ref_score),
+    )
+
+    return {
+        "name": name,
+        "bit_exact": ref_out == cand_out,
+        "pixel_max_delta": max_delta,
+        "pixel_mean_delta": mean_delta,
+        "shape_match": max_delta is not None,
+        "reference_score": ref_score,
+        "candidate_score": cand_score,
+        "cross_reference_score": cross_ref,
+        "cross_candidate_score": cross_cand,
+        "other_owner_score": other_owner,
+        "score_delta": round(score_delta, 4),
+        "within_tolerance": score_delta <= tolerance,
+        "embed_speedup": round(ref_embed_s / cand_embed_s, 3),
+        "verify_speedup": round(ref_verify_s / cand_verify_s, 3),
+    }
+
+
+def main(argv: list[str]) -> int:
+
+    parser = argparse.ArgumentParser(description="Parity check a candidate watermark engine")
+    parser.add_argument("images", help="directory, .zip or .tar of sample images")
+    parser.add_argument("--candidate", required=True)
+    parser.add_argument("--reference", default=ALGORITHM_VERSION)
+    parser.add_argument("--owner", default="parity-owner")
+    parser.add_argument("--other-owner", default="parity-other-owner")
+    parser.add_argument("--epoch", default=current_epoch())
+    parser.add_argument("--score-tolerance", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    reference = load_engine(args.reference)
+    candidate = load_engine(args.candidate)
+
+    rows = []
+
+    for i, (name, data) in enumerate(iter_source(args.images)):
+
+        if args.limit and i >= args.limit:
+            break
+
+        if data is None:
+            continue
+
+        try:
+            row = compare(
+                reference,
+                candidate,
+                name,
+                data,
+                args.owner,
+                args.other_owner,
+                args.epoch,
+                args.repeat,
+                args.score_tolerance,
+            )
+        except ValueError as e:
+            # Not embeddable by the reference (e.g. undecodable)
+            print(json.dumps({"name": name, "skipped": str(e)}))
+            continue
+
+        rows.append(row)
+
+        print(json.dumps(row))
+
+    if not rows:
+        print("No images found", file=sys.stderr)
+        return 2
+
+    summary = {
+        "summary": True,
+        "reference": reference.version,
+        "candidate": candidate.version,
+        "images": len(rows),
+        "bit_exact": sum(r["bit_exact"] for r in rows),
+        "within_tolerance": sum(r["within_tolerance"] for r in rows),
+        "max_pixel_delta": max(
+            (r["pixel_max_delta"] for r in rows if r["pixel_max_delta"] is not None),
+            default=None,
+        ),
+        "max_score_delta": max(r["score_delta"] for r in rows),
+        "max_other_owner_score": max(r["other_owner_score"] for r in rows),
+        "median_embed_speedup": statistics.median(r["embed_speedup"] for r in rows),
+        "median_verify_speedup": statistics.median(r["verify_speedup"] for r in rows),
+    }
+
+    print(json.dumps(summary))
+
+    return 0 if summary["within_tolerance"] == len(rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
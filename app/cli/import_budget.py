@@ -0,0 +1,95 @@
+# import_budget.py
+#
+# Measure the import time of app.main and fail if it exceeds the budget
+# or if the codec stack is pulled in eagerly:
+#
+#     python -m app.cli.import_budget [--budget-ms 1500] [--top 15]
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules that must only load on first request / warm-up
+LAZY_MODULES = ("cv2", "pywt", "scipy")
+
+# Placeholders so app.logger can be imported without real auth config
+IMPORT_ENV = {
+    "AUTH_LOGIN_URL": "http://127.0.0.1:1",
+    "JWT_SECRET_KEY": "import-budget",
+    "JWT_ISSUER": "import-budget",
+}
+
+
+def measure(module: str) -> list[tuple[int, int, str]]:
+    """
+    Return (self_us, cumulative_us, module) rows from -X importtime.
+    """
+
+    env = {**os.environ, **IMPORT_ENV}
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    rows = []
+
+    for line in proc.stderr.splitlines():
+
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+
+    return rows
+
+
+def main(argv: list[str]) -> int:
+
+    parser = argparse.ArgumentParser(description="Measure app import time")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("AURORAA_IMPORT_BUDGET_MS", "1500")),
+    )
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    rows = measure(args.module)
+
+    total_ms = sum(r[0] for r in rows) / 1000
+
+    print(f"{args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: -r[1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+
+    eager = sorted({
+        name.strip() for _, _, name in rows
+        if name.strip().split(".")[0] in LAZY_MODULES
+    })
+
+    if eager:
+        print("Eagerly imported:", ", ".join(eager))
+        failed = True
+
+    if total_ms > args.budget_ms:
+        print("Import-time budget exceeded")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,546 @@
+# loadtest.py
+#
+# End-to-end load test on one machine. Starts the app under uvicorn
+# against a throwaway SQLite database and a stub auth server, mints
+# HS256 tokens for synthetic owners and drives an open-loop mix of
+# uploads and verifies at a target rate:
+#
+#     python -m app.cli.loadtest [--rps 10] [--duration 60]
+#                                [--mix upload=1,verify=3] [--owners 20]
+#                                [--images 16] [--size 1600x1200]
+#                                [--report-every 5] [--soak]
+#                                [--max-rss-growth-mb 64]
+#                                [--url URL --jwt-secret S --jwt-issuer I]
+#
+# One JSON line per interval (throughput, p50/p95/p99 per operation,
+# error and rejection rates, server RSS), then a summary. With --soak
+# the run fails (exit 1) if server RSS keeps growing after warm-up.
+# --url targets an already running server instead (no RSS).
+
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+JWT_ISSUER = "auroraa-loadtest"
+
+# Rate limits are raised out of the way unless --keep-limits
+UNLIMITED_ENV = {
+    "AURORAA_RATELIMIT_UPLOAD_CAPACITY": "1e12",
+    "AURORAA_RATELIMIT_UPLOAD_REFILL": "1e12",
+    "AURORAA_RATELIMIT_VERIFY_CAPACITY": "1e12",
+    "AURORAA_RATELIMIT_VERIFY_REFILL": "1e12",
+}
+
+# 429 / 503 are load shedding (rate limit, admission), not failures
+REJECTED_STATUSES = (429, 503)
+
+
+# --------------------------------
+# Local stand-ins
+# --------------------------------
+
+class _AuthHandler(BaseHTTPRequestHandler):
+    """
+    The two auth-service calls the app makes: username lookup and the
+    login URL advertised in the OpenAPI schema.
+    """
+
+    def do_GET(self):
+
+        if self.path.startswith("/get/"):
+            user_id = self.path[len("/get/"):]
+            self._json(200, {"id": user_id, "username": f"user-{user_id}"})
+        else:
+            self._json(404, {"detail": "Not found"})
+
+    def do_POST(self):
+        self._json(404, {"detail": "Not found"})
+
+    def _json(self, status: int, body: dict):
+
+        data = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_auth_stub() -> ThreadingHTTPServer:
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _AuthHandler)
+
+    threading.Thread(target=server.serve_forever, name="auth-stub", daemon=True).start()
+
+    return server
+
+
+def mint_token(owner_id: str, secret: str, issuer: str, ttl: float) -> str:
+
+    from jose import jwt
+
+    now = int(time.time())
+
+    return jwt.encode(
+        {
+            "sub": owner_id,
+            "username": owner_id,
+            "iss": issuer,
+            "iat": now,
+            "exp": now + int(ttl),
+        },
+        secret,
+        algorithm="HS256",
+    )
+
+
+def _free_port() -> int:
+
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(workdir: str, auth_url: str, secret: str, keep_limits: bool) -> tuple[subprocess.Popen, str]:
+    """
+    Create the schema in a fresh SQLite file and launch uvicorn on it.
+    """
+
+    database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "AUTH_LOGIN_URL": auth_url,
+        "JWT_SECRET_KEY": secret,
+        "JWT_ISSUER": JWT_ISSUER,
+        "AURORAA_WATERMARK_SECRET": os.getenv("AURORAA_WATERMARK_SECRET", "loadtest"),
+        "AURORAA_BLOB_CACHE_DIR": os.path.join(workdir, "blobs"),
+        "AURORAA_PLANE_STORE": os.path.join(workdir, "planes.db"),
+        **({} if keep_limits else UNLIMITED_ENV),
+    }
+
+    from sqlalchemy import create_engine
+
+    from app.database.database import Base
+    import app.models.models  # noqa: F401
+
+    Base.metadata.create_all(create_engine(database_url))
+
+    port = _free_port()
+
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--log-level", "warning",
+        ],
+        env=env,
+    )
+
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def rss_mb(pid: int) -> float | None:
+    """
+    Resident set size from /proc (Linux), None elsewhere.
+    """
+
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+    return None
+
+
+# --------------------------------
+# Workload
+# --------------------------------
+
+def make_images(count: int, width: int, height: int, seed: int = 0) -> list[bytes]:
+    """
+    Distinct synthetic photos-ish JPEGs: gradients plus smoothed noise.
+    """
+
+    import cv2
+
+    rng = np.random.default_rng(seed)
+
+    images = []
+
+    for _ in range(count):
+
+        ramp = np.linspace(0, 1, width, dtype=np.float32)[None, :] * rng.uniform(60, 200)
+        base = ramp + np.linspace(0, 1, height, dtype=np.float32)[:, None] * rng.uniform(0, 80)
+
+        noise = cv2.GaussianBlur(
+            rng.normal(0, 40, (height, width, 3)).astype(np.float32),
+            (0, 0),
+            rng.uniform(1, 6),
+        )
+
+        img = np.clip(base[..., None] + noise + rng.uniform(0, 60, 3), 0, 255).astype(np.uint8)
+
+        ok, enc = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+        if ok:
+            images.append(enc.tobytes())
+
+    return images
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+
+    mix = {}
+
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+
+    unknown = set(mix) - {"upload", "verify"}
+
+    if unknown:
+        raise ValueError(f"Unknown operations in mix: {sorted(unknown)}")
+
+    return mix
+
+
+class Recorder:
+
+    def __init__(self):
+        self.samples: list[tuple[float, str, float, int]] = []
+
+    def add(self, op: str, latency: float, status: int):
+        self.samples.append((time.monotonic(), op, latency, status))
+
+    def window(self, start: float, end: float):
+
+        # Appended in completion order, so sorted by time
+        lo = bisect.bisect_left(self.samples, start, key=lambda s: s[0])
+        hi = bisect.bisect_left(self.samples, end, key=lambda s: s[0])
+
+        return self.samples[lo:hi]
+
+
+def summarize(samples, seconds: float) -> dict:
+
+    out = {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / seconds, 2) if seconds > 0 else 0.0,
+    }
+
+    if not samples:
+        return out
+
+    statuses = np.array([s[3] for s in samples])
+
+    ok = (statuses >= 200) & (statuses < 300)
+    rejected = np.isin(statuses, REJECTED_STATUSES)
+
+    out["error_rate"] = round(float(np.mean(~ok & ~rejected)), 4)
+    out["rejected_rate"] = round(float(np.mean(rejected)), 4)
+
+    for op in sorted({s[1] for s in samples}):
+
+        latencies = np.array([s[2] for s in samples if s[1] == op and 200 <= s[3] < 300])
+
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+            out[op] = {
+                "n": int(len(latencies)),
+                "p50_ms": round(float(p50), 1),
+                "p95_ms": round(float(p95), 1),
+                "p99_ms": round(float(p99), 1),
+            }
+
+    return out
+
+
+async def run_load(
+    base_url: str,
+    tokens: list[tuple[str, str]],
+    images: list[bytes],
+    mix: dict[str, float],
+    rps: float,
+    duration: float,
+    report_every: float,
+    max_inflight: int,
+    server_pid: int | None,
+) -> tuple[Recorder, list[dict], int]:
+    """
+    Open loop: requests start on schedule whether or not earlier ones
+    finished (up to max_inflight, beyond which they are counted as
+    dropped). Returns the recorder, interval reports and drop count.
+    """
+
+    import httpx
+
+    rng = random.Random(0)
+    recorder = Recorder()
+    reports: list[dict] = []
+
+    # Recent outputs (owner, bytes) so verifies hit real watermarks
+    issued: deque[tuple[str, bytes]] = deque(maxlen=64)
+
+    ops = list(mix)
+    weights = [mix[op] for op in ops]
+
+    inflight = 0
+    dropped = 0
+
+    limits = httpx.Limits(max_connections=max_inflight, max_keepalive_connections=max_inflight)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+
+        async def one(op: str):
+
+            nonlocal inflight
+
+            owner_id, token = rng.choice(tokens)
+            headers = {"Authorization": f"Bearer {token}"}
+
+            if op == "verify" and issued:
+                owner_id, payload = rng.choice(issued)
+                headers = {"Authorization": f"Bearer {dict(tokens)[owner_id]}"}
+            else:
+                payload = rng.choice(images)
+
+            start = time.perf_counter()
+
+            try:
+                r = await client.post(
+                    f"/watermark/{op}",
+                    files={"file": ("load.jpg", payload, "image/jpeg")},
+                    headers=headers,
+                )
+                status = r.status_code
+
+                if op == "upload" and status == 200:
+                    issued.append((owner_id, r.content))
+
+            except httpx.HTTPError:
+                status = 0
+
+            finally:
+                inflight -= 1
+
+            recorder.add(op, time.perf_counter() - start, status)
+
+        loop_start = time.monotonic()
+        next_start = loop_start
+        next_report = loop_start + report_every
+        last_report = loop_start
+
+        tasks = set()
+
+        while time.monotonic() - loop_start < duration:
+
+            now = time.monotonic()
+
+            if now >= next_report:
+                report = summarize(recorder.window(last_report, now), now - last_report)
+                report["t"] = round(now - loop_start, 1)
+                report["inflight"] = inflight
+                if server_pid is not None:
+                    rss = rss_mb(server_pid)
+                    report["rss_mb"] = round(rss, 1) if rss is not None else None
+                reports.append(report)
+                print(json.dumps(report), flush=True)
+                last_report = now
+                next_report += report_every
+
+            if inflight >= max_inflight:
+                dropped += 1
+            else:
+                inflight += 1
+                task = asyncio.create_task(one(rng.choices(ops, weights)[0]))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            next_start += 1.0 / rps
+            await asyncio.sleep(max(0.0, next_start - time.monotonic()))
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    return recorder, reports, dropped
+
+
+def rss_growth(reports: list[dict], warmup: float) -> dict | None:
+    """
+    Server RSS change after warm-up: total and fitted slope.
+    """
+
+    points = [(r["t"], r["rss_mb"]) for r in reports if r.get("rss_mb") and r["t"] >= warmup]
+
+    if len(points) < 3:
+        return None
+
+    t, rss = np.array(points).T
+
+    slope = np.polyfit(t, rss, 1)[0]
+
+    return {
+        "rss_start_mb": round(float(rss[0]), 1),
+        "rss_end_mb": round(float(rss[-1]), 1),
+        "growth_mb": round(float(rss[-1] - rss[0]), 1),
+        "slope_mb_per_hour": round(float(slope * 3600), 1),
+    }
+
+
+async def _wait_ready(base_url: str, proc: subprocess.Popen | None, timeout: float):
+
+    import httpx
+
+    deadline = time.monotonic() + timeout
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as client:
+
+        while time.monotonic() < deadline:
+
+            if proc is not None and proc.poll() is not None:
+                raise RuntimeError("App exited during start-up")
+
+            try:
+                if (await client.get("/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+
+            await asyncio.sleep(0.25)
+
+    raise RuntimeError("App not ready in time")
+
+
+# --------------------------------
+# Runner
+# --------------------------------
+
+def main(argv: list[str]) -> int:
+
+    parser = argparse.ArgumentParser(description="Load-test upload/verify end to end")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--mix", default="upload=1,verify=3")
+    parser.add_argument("--owners", type=int, default=20)
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--size", default="1600x1200", help="WIDTHxHEIGHT of generated images")
+    parser.add_argument("--report-every", type=float, default=5.0)
+    parser.add_argument("--max-inflight", type=int, default=256)
+    parser.add_argument("--soak", action="store_true", help="fail on RSS growth after warm-up")
+    parser.add_argument("--warmup", type=float, default=None, help="seconds excluded from RSS growth")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64.0)
+    parser.add_argument("--keep-limits", action="store_true", help="keep the app's rate limits")
+    parser.add_argument("--url", help="existing server instead of a local one")
+    parser.add_argument("--jwt-secret", help="with --url: the server's JWT_SECRET_KEY")
+    parser.add_argument("--jwt-issuer", default=JWT_ISSUER)
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    if args.url and not args.jwt_secret:
+        parser.error("--url needs --jwt-secret")
+
+    images = make_images(args.images, width, height)
+
+    proc = None
+    auth = None
+
+    try:
+        if args.url:
+            base_url, secret, issuer = args.url.rstrip("/"), args.jwt_secret, args.jwt_issuer
+        else:
+            workdir = tempfile.mkdtemp(prefix="auroraa-load-")
+            auth = start_auth_stub()
+            secret, issuer = secrets.token_hex(32), JWT_ISSUER
+            proc, base_url = start_app(
+                workdir,
+                f"http://127.0.0.1:{auth.server_address[1]}",
+                secret,
+                args.keep_limits,
+            )
+
+        ttl = args.duration + 3600
+
+        tokens = [
+            (owner_id, mint_token(owner_id, secret, issuer, ttl))
+            for owner_id in (f"load-owner-{i}" for i in range(args.owners))
+        ]
+
+        asyncio.run(_wait_ready(base_url, proc, timeout=120.0))
+
+        start = time.monotonic()
+
+        recorder, reports, dropped = asyncio.run(run_load(
+            base_url,
+            tokens,
+            images,
+            mix,
+            args.rps,
+            args.duration,
+            args.report_every,
+            args.max_inflight,
+            proc.pid if proc is not None else None,
+        ))
+
+        summary = {
+            "summary": True,
+            "target_rps": args.rps,
+            "mix": mix,
+            "dropped": dropped,
+            **summarize(recorder.samples, time.monotonic() - start),
+        }
+
+        if proc is not None:
+            rss = rss_mb(proc.pid)
+            summary["rss_mb"] = round(rss, 1) if rss is not None else None
+
+        warmup = args.warmup if args.warmup is not None else args.duration * 0.2
+        growth = rss_growth(reports, warmup)
+
+        if growth is not None:
+            summary["rss"] = growth
+
+        failed = bool(args.soak and growth and growth["growth_mb"] > args.max_rss_growth_mb)
+
+        summary["soak_failed"] = failed
+
+        print(json.dumps(summary))
+
+        return 1 if failed else 0
+
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if auth is not None:
+            auth.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,30 @@
+# migrate.py
+#
+# Apply Alembic migrations outside the serving path:
+#
+#     python -m app.cli.migrate            # upgrade to head
+#     python -m app.cli.migrate <revision>
+
+import os
+import sys
+
+from alembic import command
+from alembic.config import Config
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def main(argv: list[str]) -> int:
+
+    revision = argv[0] if argv else "head"
+
+    config = Config()
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+
+    command.upgrade(config, revision)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,45 @@
+# retention.py
+#
+# Archive revoked and expired watermarks and maintain the quarterly
+# partitions of the watermarks table. Meant for a cron job (or enable the
+# in-app schedule with AURORAA_RETENTION_INTERVAL_MINUTES):
+#
+#     python -m app.cli.retention [--quarters 12] [--batch-size 2000]
+#                                 [--max-batches N]
+
+import argparse
+import json
+import sys
+
+from app.services.retention import (
+    ARCHIVE_BATCH_SIZE,
+    RETENTION_QUARTERS,
+    run_retention_locked,
+)
+
+
+def main(argv: list[str]) -> int:
+
+    parser = argparse.ArgumentParser(description="Archive expired/revoked watermarks")
+    parser.add_argument("--quarters", type=int, default=RETENTION_QUARTERS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    result = run_retention_locked(
+        quarters=args.quarters,
+        batch_size=args.batch_size,
+        max_batches=args.max_batches,
+    )
+
+    if result is None:
+        print("Another retention run holds the lock", file=sys.stderr)
+        return 0
+
+    print(json.dumps(result))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
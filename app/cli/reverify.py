@@ -0,0 +1,73 @@
+# reverify.py
+#
+# Re-score images already seen by /verify from their stored delta planes
+# (app.services.plane_store), without the original bytes:
+#
+#     python -m app.cli.reverify --owner OWNER_ID [HASH ...] [--all]
+#                                [--epochs 4] [--engine VERSION]
+#
+# Useful for checking past uploads against another epoch, a rotated key
+# or a new candidate owner. Writes NDJSON, one line per content hash.
+
+import argparse
+import json
+import sys
+
+from app.services.plane_store import plane_store
+from app.services.watermark.image.image_config import previous_epochs
+from app.services.watermark.image.image_engine import (
+    DEFAULT_ENGINE_VERSION,
+    get_watermark_engine,
+)
+
+
+def main(argv: list[str]) -> int:
+
+    parser = argparse.ArgumentParser(description="Re-verify stored delta planes")
+    parser.add_argument("hashes", nargs="*", help="sha256 content hashes")
+    parser.add_argument("--all", action="store_true", help="every stored image for the engine")
+    parser.add_argument("--owner", required=True)
+    parser.add_argument("--epochs", type=int, default=4)
+    parser.add_argument("--engine", default=DEFAULT_ENGINE_VERSION)
+    args = parser.parse_args(argv)
+
+    engine = get_watermark_engine(args.engine)
+
+    if not engine.supports_planes:
+        print(f"Engine {engine.version} does not store planes", file=sys.stderr)
+        return 2
+
+    if args.all:
+        hashes = [h for h, _ in plane_store.hashes(engine.planes_version)]
+    else:
+        hashes = args.hashes
+
+    if not hashes:
+        parser.error("give content hashes or --all")
+
+    epochs = previous_epochs(args.epochs)
+
+    missing = 0
+
+    for content_hash in hashes:
+
+        planes = plane_store.get(content_hash, engine.planes_version)
+
+        if planes is None:
+            missing += 1
+            print(json.dumps({"content_hash": content_hash, "error": "not_stored"}))
+            continue
+
+        raw = engine.verify_planes(planes, args.owner, epochs) or {
+            "verified": False,
+            "confidence": 0.0,
+            "status": "not_verified",
+        }
+
+        print(json.dumps({"content_hash": content_hash, **raw}))
+
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
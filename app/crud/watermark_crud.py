@@ -2,10 +2,15 @@ from sqlalchemy.orm import Session
 from app.models.models import Watermark
 # from app.schemas.watermark_schemas import WatermarkCreate
 
+import base64
 import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, select, union_all
 from sqlalchemy.orm import Session
 
-from app.models.models import Watermark
+from app.models.models import Watermark, WatermarkArchive
 # from app.services.watermark.lsb.watermark_lsb_extractor import extract_image_watermark
 # from app.services.watermark.lsb.watermark_lsb_embedder import hash_content
 
@@ -19,4 +24,259 @@ def map_content_type(mime: str) -> str:
         return "video"
     if mime.startswith("audio/"):
         return "audio"
-    return "document"
\ No newline at end of file
+    return "document"
+
+# ---------- IDEMPOTENT EMBED LOOKUP ----------
+def find_idempotent_watermark(
+    db: Session,
+    content_hash: str,
+    owner_id: str,
+    epoch: str,
+    algorithm_version: str,
+) -> Watermark | None:
+    """
+    Active watermark already issued for these exact bytes, owner, epoch
+    and algorithm version (the earliest, should there be several).
+    """
+
+    return (
+        db.query(Watermark)
+        .filter(
+            Watermark.content_hash == content_hash,
+            Watermark.owner_id == owner_id,
+            Watermark.algorithm_version == algorithm_version,
+            Watermark.status == "active",
+            Watermark.epoch == epoch,
+        )
+        .order_by(Watermark.created_at, Watermark.id)
+        .first()
+    )
+
+
+# ---------- EPOCHS IN USE ----------
+def owner_epoch_summary(
+    db: Session,
+    owner_id: str,
+    since: datetime | None = None,
+) -> list[tuple[str, str]]:
+    """
+    Distinct (algorithm_version, epoch) of the owner's active watermarks,
+    optionally only those created at or after `since` (lets MySQL prune
+    to the quarterly partitions in range).
+    """
+
+    query = db.query(Watermark.algorithm_version, Watermark.epoch).filter(
+        Watermark.owner_id == owner_id,
+        Watermark.status == "active",
+        Watermark.epoch.isnot(None),
+    )
+
+    if since is not None:
+        query = query.filter(Watermark.created_at >= since)
+
+    return query.distinct().all()
+
+
+# ---------- PERCEPTUAL HASHES ----------
+def owner_phashes(db: Session, owner_id: str, since=None) -> list[tuple]:
+    """
+    (id, phash, created_at) of the owner's active watermarks, optionally
+    only those created at or after `since`.
+    """
+
+    query = db.query(
+        Watermark.id,
+        Watermark.phash,
+        Watermark.created_at,
+    ).filter(
+        Watermark.owner_id == owner_id,
+        Watermark.status == "active",
+        Watermark.phash.isnot(None),
+    )
+
+    if since is not None:
+        query = query.filter(Watermark.created_at >= since)
+
+    return query.all()
+
+
+# ---------- SIGNATURE INDEX ----------
+def active_owner_epochs(
+    db: Session,
+    algorithm_versions: list[str],
+    since: datetime | None = None,
+) -> list[tuple]:
+    """
+    (owner_id, epoch, newest created_at) for every owner with active
+    watermarks of these versions, optionally only rows created at or
+    after `since`.
+    """
+
+    query = db.query(
+        Watermark.owner_id,
+        Watermark.epoch,
+        func.max(Watermark.created_at),
+    ).filter(
+        Watermark.algorithm_version.in_(algorithm_versions),
+        Watermark.status == "active",
+        Watermark.epoch.isnot(None),
+    )
+
+    if since is not None:
+        query = query.filter(Watermark.created_at >= since)
+
+    return query.group_by(Watermark.owner_id, Watermark.epoch).all()
+
+
+def get_watermark(db: Session, watermark_id: str) -> Watermark | None:
+    return db.query(Watermark).filter(Watermark.id == watermark_id).first()
+
+
+# ---------- KEYSET LISTING ----------
+# Newest first on (created_at, id), served by ix_watermark_owner_created.
+# The cursor is the last row's sort key, so a page costs the same at any
+# depth and stays stable while new rows are inserted.
+
+EXPORT_COLUMNS = (
+    "id",
+    "content_type",
+    "mime_type",
+    "content_hash",
+    "phash",
+    "epoch",
+    "algorithm_version",
+    "status",
+    "created_at",
+)
+
+
+def encode_cursor(created_at: datetime, watermark_id: str) -> str:
+
+    raw = json.dumps([created_at.isoformat(), watermark_id]).encode()
+
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Raises ValueError on a malformed cursor.
+    """
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, watermark_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(watermark_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _owner_table_query(table, owner_id: str, status: str | None, after: tuple | None):
+
+    query = select(*(getattr(table, c) for c in EXPORT_COLUMNS)).where(
+        table.owner_id == owner_id
+    )
+
+    if status is not None:
+        query = query.where(table.status == status)
+
+    if after is not None:
+
+        created_at, watermark_id = after
+
+        # Expanded row comparison; indexes well on every backend
+        query = query.where(
+            or_(
+                table.created_at < created_at,
+                and_(
+                    table.created_at == created_at,
+                    table.id < watermark_id,
+                ),
+            )
+        )
+
+    return query.order_by(table.created_at.desc(), table.id.desc())
+
+
+def _owner_keyset_query(
+    owner_id: str,
+    status: str | None,
+    after: tuple | None,
+    limit: int | None = None,
+):
+    """
+    The owner's rows from the hot table and the retention archive,
+    merged in keyset order. With a limit, each side is cut to it first
+    so a page never reads more than 2 x limit rows.
+    """
+
+    parts = []
+
+    for table in (Watermark, WatermarkArchive):
+
+        query = _owner_table_query(table, owner_id, status, after)
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        sub = query.subquery()
+
+        parts.append(select(*(sub.c[c] for c in EXPORT_COLUMNS)))
+
+    merged = union_all(*parts).subquery()
+
+    query = select(*(merged.c[c] for c in EXPORT_COLUMNS)).order_by(
+        merged.c.created_at.desc(),
+        merged.c.id.desc(),
+    )
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
+
+
+def list_owner_watermarks(
+    db: Session,
+    owner_id: str,
+    limit: int,
+    cursor: str | None = None,
+    status: str | None = None,
+) -> tuple[list, str | None]:
+    """
+    One page of the owner's watermarks (archived ones included) and the
+    cursor for the next.
+    """
+
+    after = decode_cursor(cursor) if cursor else None
+
+    rows = db.execute(
+        _owner_keyset_query(owner_id, status, after, limit + 1)
+    ).all()
+
+    next_cursor = None
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows, next_cursor
+
+
+def stream_owner_watermarks(
+    db: Session,
+    owner_id: str,
+    status: str | None = None,
+    batch_size: int = 1000,
+):
+    """
+    Every matching row (archived ones included), fetched through a
+    server-side cursor in batches of `batch_size` (constant memory).
+    """
+
+    result = db.execute(
+        _owner_keyset_query(owner_id, status, None),
+        execution_options={"yield_per": batch_size},
+    )
+
+    for partition in result.partitions():
+        yield from partition
@@ -3,27 +3,63 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
-from dotenv import load_dotenv  
+import threading
+from dotenv import load_dotenv
 
-load_dotenv(dotenv_path=r"C:\Users\ghara\OneDrive\Desktop\parth\auroraa sentinal\.env")
+# Optional .env for local development
+ENV_FILE = os.getenv("AURORAA_ENV_FILE")
 
-# MySQL DB connection string
-DATABASE_URL = os.getenv("DATABASE_URL")
-# Create SQLAlchemy engine  by removing ssl_args
-engine = create_engine(DATABASE_URL)
+if ENV_FILE:
+    load_dotenv(dotenv_path=ENV_FILE)
 
-# Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Session factory (bound to the engine on first use)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 # Declarative base
 Base = declarative_base()
 
+# Engine is created lazily so importing the app never touches the DB
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+
+    global _engine
+
+    if _engine is None:
+
+        with _engine_lock:
+
+            if _engine is None:
+
+                # MySQL DB connection string
+                database_url = os.getenv("DATABASE_URL")
+
+                if not database_url:
+                    raise RuntimeError("DATABASE_URL is not set")
+
+                _engine = create_engine(database_url, pool_pre_ping=True)
+
+                SessionLocal.configure(bind=_engine)
+
+    return _engine
+
+
+def dispose_engine():
+    """
+    Drop pooled connections, e.g. after a fork.
+    """
+
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
 # Dependency for FastAPI routes
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
-
-print(os.getenv("DATABASE_URL"))
\ No newline at end of file
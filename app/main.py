@@ -23,17 +23,45 @@
 
 # print(os.getenv("ALLOWED_ORIGIN"))
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.database.database import engine, Base
+from fastapi.responses import JSONResponse
 from app.routes.watermark_routes import waterrouter
+from app.routes.metrics_routes import metricsrouter
+from app.routes.health_routes import healthrouter
+from app.services.admission import Overloaded
+from app.services.cancellation import Cancelled
+from app.services.ratelimit import RateLimited
+from app.services.warmup import start_background_warm_up
+from app.services.watermark.image.image_audit import shutdown_audit_pool
+from app.services.retention import (
+    start_retention_scheduler,
+    stop_retention_scheduler,
+)
 import os
 import json
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Schema changes are applied by `python -m app.cli.migrate`, not at startup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+
+    # Warm codecs and DB pool off the event loop; /ready flips when done
+    start_background_warm_up()
+
+    # Archival / partition upkeep (only if AURORAA_RETENTION_INTERVAL_MINUTES)
+    start_retention_scheduler()
+
+    yield
+
+    stop_retention_scheduler()
+
+    shutdown_audit_pool()
+
 
-app = FastAPI(title="Auroraa Sentinel")
+app = FastAPI(title="Auroraa Sentinel", lifespan=lifespan)
 
 # Load ALLOWED_ORIGIN safely
 raw = os.getenv("ALLOWED_ORIGIN", "")
@@ -75,5 +103,37 @@ app.add_middleware(
 )
 
 app.include_router(waterrouter)
+app.include_router(metricsrouter)
+app.include_router(healthrouter)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(Cancelled)
+async def cancelled_handler(request: Request, exc: Cancelled):
+
+    # The client is gone; this only closes out the request cleanly
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+    )
+
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers=exc.headers,
+    )
 
 print("Final allowed origins:", allowed_origins)
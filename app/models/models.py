@@ -15,12 +15,22 @@ class Watermark(Base):
     mime_type = Column(String(100), nullable=False)
 
     # signature_hash = Column(String(64), nullable=True)
-    # content_hash = Column(String(64), nullable=True)
+
+    # SHA-256 of the uploaded bytes (idempotent embed)
+    content_hash = Column(String(64), nullable=True)
+
+    # 64-bit perceptual hash, hex (source-asset lookup)
+    phash = Column(String(16), nullable=True)
+
+    # Key epoch the watermark was embedded under, e.g. "2026-Q4"
+    epoch = Column(String(8), nullable=True)
 
     algorithm_version = Column(String(20), nullable=False, default="v1")
     status = Column(String(20), nullable=False, default="active")
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Partition key on MySQL (quarterly RANGE COLUMNS, see migration
+    # e5c3a1f7d902); part of the primary key there
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     __table_args__ = (
         Index(
@@ -28,4 +38,57 @@ class Watermark(Base):
             "owner_id",
             "status"
         ),
+        Index(
+            "ix_watermark_content",
+            "content_hash",
+            "owner_id"
+        ),
+        Index(
+            "ix_watermark_owner_created",
+            "owner_id",
+            "created_at",
+            "id"
+        ),
+        Index(
+            "ix_watermark_owner_epoch",
+            "owner_id",
+            "status",
+            "algorithm_version",
+            "epoch"
+        ),
+    )
+
+
+class WatermarkArchive(Base):
+    """
+    Revoked and expired watermarks moved out of the hot table by the
+    retention job (app.services.retention). Same columns, compressed rows.
+    """
+
+    __tablename__ = "watermarks_archive"
+
+    id = Column(String(36), primary_key=True)
+
+    owner_id = Column(String(36), nullable=False)
+
+    content_type = Column(String(20), nullable=False)
+    mime_type = Column(String(100), nullable=False)
+
+    content_hash = Column(String(64), nullable=True)
+    phash = Column(String(16), nullable=True)
+    epoch = Column(String(8), nullable=True)
+
+    algorithm_version = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index(
+            "ix_watermark_archive_owner",
+            "owner_id",
+            "created_at"
+        ),
+        {"mysql_row_format": "COMPRESSED"},
     )
@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.services.warmup import readiness
+
+# ----------------------------------
+# Router
+# ----------------------------------
+
+healthrouter = APIRouter(
+    tags=["Health"]
+)
+
+# ==================================
+# LIVENESS
+# ==================================
+
+@healthrouter.get("/health")
+def health():
+    return {"status": "ok"}
+
+# ==================================
+# READINESS (passes once warmed)
+# ==================================
+
+@healthrouter.get("/ready")
+def ready():
+
+    state = readiness()
+
+    return JSONResponse(
+        status_code=200 if state["ready"] else 503,
+        content=state,
+    )
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Response
+
+from app.services import metrics
+
+# ----------------------------------
+# Router
+# ----------------------------------
+
+metricsrouter = APIRouter(
+    tags=["Metrics"]
+)
+
+# ==================================
+# PROMETHEUS METRICS
+# ==================================
+
+@metricsrouter.get("/metrics")
+def get_metrics():
+
+    return Response(
+        content=metrics.render(),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,32 +1,205 @@
 from fastapi import (
     APIRouter,
+    Request,
     UploadFile,
     File,
     Depends,
     HTTPException,
     Response,
     Form,
+    Query,
 )
 
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-
-from app.database.database import get_db
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+import time
+import uuid
+
+from app.database.database import get_db, get_engine, SessionLocal
 from app.models.models import Watermark
 
-from app.crud.watermark_crud import map_content_type
+from app.crud.watermark_crud import (
+    map_content_type,
+    find_idempotent_watermark,
+    get_watermark,
+    list_owner_watermarks,
+    stream_owner_watermarks,
+    EXPORT_COLUMNS,
+)
+from app.schemas.watermark_schemas import WatermarkItem, WatermarkPage
 from app.logger import get_current_user
-
-from app.services.watermark.image.image_embedder import embed_watermark
-from app.services.watermark.image.image_verifier import verify_watermark
+from app.services.admission import Overloaded, admission, estimate_peak_bytes
+from app.services.cancellation import NEVER, CancelToken, Cancelled, cancel_on_disconnect
+from app.services.concurrency_limiter import CONCURRENCY_LIMITING, compute_limiter
+from app.services.ratelimit import rate_limiter, estimate_cpu_cost
+from app.services.blob_cache import blob_cache
+from app.services.plane_store import plane_store
+from app.services.phash_index import phash_indexes
+from app.services.signature_index import IDENTIFY_REVEAL_OWNERS, signature_indexes
+from app.services.owner_epochs import (
+    VERIFY_EPOCH_WINDOW,
+    owner_epoch_cache,
+    epochs_to_verify,
+)
+from app.services.protection.pipeline import get_pipeline
+from app.services.verify_batcher import VERIFY_BATCHING, verify_batcher
+from app.services.coalesce import SingleFlight
+
+from app.services.watermark.image.image_audit import (
+    AUDIT_WORKERS,
+    get_audit_pool,
+    is_archive,
+    iter_archive,
+    run_audit,
+)
 
 from app.services.watermark.image.image_config import (
     interpret_verification_result,
-    ALGORITHM_VERSION,
+    current_epoch,
     previous_epochs,
-    current_epoch
+    sidak,
+)
+
+from app.services.watermark.image.image_encoder import sniff_media_type
+from app.services.watermark.image.image_engine import (
+    WatermarkEngine,
+    get_watermark_engine,
+    registered_versions,
 )
 
+from app.services.watermark.image.image_phash import phash_bytes, phash_hex
+
+# ----------------------------------
+# Engine selection
+# ----------------------------------
+
+def verification_plan(
+    db: Session,
+    owner_id: str
+) -> list[tuple[WatermarkEngine, list[str]]]:
+    """
+    (engine, epochs) pairs matching the owner's stored watermarks: only
+    algorithm versions and epochs the owner has actually issued, one
+    entry per decoder.
+    """
+
+    plan: dict[str, tuple[WatermarkEngine, set[str]]] = {}
+
+    for version, epochs in epochs_to_verify(
+        db,
+        owner_id,
+        get_watermark_engine().version,
+    ).items():
+
+        try:
+            engine = get_watermark_engine(version)
+        except KeyError:
+            print("No engine registered for stored version:", version)
+            continue
+
+        plan.setdefault(engine.decoder_version, (engine, set()))[1].update(epochs)
+
+    return [
+        (engine, sorted(epochs, reverse=True))
+        for engine, epochs in plan.values()
+    ]
+
+
+@asynccontextmanager
+async def compute_stage(image_bytes: bytes, db: Session | None = None):
+    """
+    Slot for one decode/transform stage: the adaptive in-flight limit
+    (sheds with 503 when saturated), then the memory budget.
+
+    With a session, its read transaction is ended first so a queued
+    request does not hold a pooled connection while it waits.
+    """
+
+    if db is not None:
+        db.commit()
+
+    if not CONCURRENCY_LIMITING:
+        async with admission.admit(image_bytes):
+            yield
+        return
+
+    async with compute_limiter.slot():
+        async with admission.admit(image_bytes):
+            yield
+
+
+async def engine_planes(
+    engine: WatermarkEngine,
+    image_bytes: bytes,
+    content_hash: str,
+):
+    """
+    The image's delta planes for a planes-capable engine: from the plane
+    store when seen before, else extracted (and stored).
+    """
+
+    planes = await run_in_threadpool(plane_store.get, content_hash, engine.planes_version)
+
+    if planes is None:
+
+        async with compute_stage(image_bytes):
+            if VERIFY_BATCHING:
+                # Stacked with concurrent verifies into one transform
+                planes = await verify_batcher.extract(engine, image_bytes)
+            else:
+                planes = await run_in_threadpool(engine.extract_planes, image_bytes)
+
+        if planes is not None:
+            await run_in_threadpool(
+                plane_store.put,
+                content_hash,
+                engine.planes_version,
+                planes,
+            )
+
+    return planes
+
+
+async def verify_with_engine(
+    engine: WatermarkEngine,
+    image_bytes: bytes,
+    content_hash: str,
+    owner_id: str,
+    epochs: list[str],
+) -> dict | None:
+    """
+    Best result across epochs. Engines with persistable planes score
+    repeat images from the plane store without decoding.
+    """
+
+    if not engine.supports_planes:
+        async with compute_stage(image_bytes):
+            return await run_in_threadpool(
+                engine.verify_epochs,
+                image_bytes,
+                owner_id,
+                epochs,
+            )
+
+    planes = await engine_planes(engine, image_bytes, content_hash)
+
+    return await run_in_threadpool(
+        engine.verify_planes,
+        planes,
+        owner_id,
+        epochs,
+    )
+
 # ----------------------------------
 # Router
 # ----------------------------------
@@ -40,8 +213,214 @@ waterrouter = APIRouter(
 # EMBED ENDPOINT
 # ==================================
 
+upload_flights = SingleFlight()
+
+
+def _protect(
+    engine: WatermarkEngine,
+    image_bytes: bytes,
+    owner_id: str,
+    epoch: str,
+    watermark_id: str,
+    cancel: CancelToken = NEVER,
+) -> tuple[bytes, dict]:
+    """
+    Run the protection pipeline (one decode, one encode for all stages).
+    Returns the output and a Server-Timing header when available.
+    """
+
+    pipeline = get_pipeline(engine)
+
+    if pipeline is None:
+        cancel.check()
+        return engine.embed(image_bytes, owner_id, epoch), {}
+
+    result = pipeline.run(
+        image_bytes,
+        owner_id,
+        epoch,
+        tags={"watermark_id": watermark_id},
+        cancel=cancel,
+    )
+
+    return result.data, {"Server-Timing": result.server_timing()}
+
+
+async def _embed_idempotent(
+    db: Session,
+    engine: WatermarkEngine,
+    owner_id: str,
+    content_type: str,
+    mime_type: str,
+    image_bytes: bytes,
+    content_hash: str,
+    epoch: str,
+    cancel: CancelToken = NEVER,
+) -> tuple[str, bytes, str, dict]:
+    """
+    Returns (watermark_id, output bytes, mode, extra response headers).
+    Repeats of an already issued watermark are served from the blob
+    cache without charging or embedding.
+
+    New rows are committed only after the output exists and the client
+    is still there, so abandoned embeds leave nothing behind.
+    """
+
+    existing = find_idempotent_watermark(
+        db,
+        content_hash=content_hash,
+        owner_id=owner_id,
+        epoch=epoch,
+        algorithm_version=engine.version,
+    )
+
+    if existing is not None:
+
+        cached = await run_in_threadpool(blob_cache.get, existing.id)
+
+        if cached is not None:
+            return existing.id, cached, "cached", {}
+
+    # Charge the owner's upload budget before any work is done
+    rate_headers = await rate_limiter.charge(
+        "upload",
+        owner_id,
+        estimate_cpu_cost(image_bytes, passes=1),
+    )
+
+    # Fingerprint, protect and record under one compute slot: a
+    # saturated instance sheds (503) before any work is done
+    async with compute_stage(image_bytes, db):
+
+        if existing is not None:
+
+            # Evicted from the cache: embedding is deterministic, so
+            # re-create the same output under the existing ID
+            watermark = existing
+            created = False
+
+        else:
+
+            # Fingerprint for matching verified copies back to this upload
+            phash = await run_in_threadpool(phash_bytes, image_bytes)
+
+            # ID assigned up front: it is tagged into the output
+            watermark = Watermark(
+                id=str(uuid.uuid4()),
+                owner_id=owner_id,
+                content_type=content_type,
+                mime_type=mime_type,
+                content_hash=content_hash,
+                phash=phash_hex(phash) if phash is not None else None,
+                epoch=epoch,
+                algorithm_version=engine.version,
+                status="active",
+                created_at=datetime.now(timezone.utc),
+            )
+
+            created = True
+
+        watermark_id = watermark.id
+
+        # Protect
+        try:
+            watermarked_bytes, timing_headers = await run_in_threadpool(
+                _protect,
+                engine,
+                image_bytes,
+                owner_id,
+                epoch,
+                watermark_id,
+                cancel,
+            )
+
+        except Cancelled:
+            raise
+
+        except Exception as e:
+
+            raise HTTPException(
+                status_code=500,
+                detail=str(e)
+            )
+
+    # Nobody will read the result: skip the insert
+    cancel.check()
+
+    if created:
+
+        # Create DB record
+        try:
+            db.add(watermark)
+            db.commit()
+
+        except Exception:
+            db.rollback()
+
+            raise HTTPException(
+                status_code=500,
+                detail="Database error"
+            )
+
+        # SingleFlight only coalesces within this worker and the content
+        # index is not unique, so a duplicate upload on another worker
+        # can pass the lookup too. Whoever commits second sees the other
+        # row and defers to the earliest; two racers that both commit
+        # before either re-reads can still keep two rows, and lookups
+        # then consistently resolve to the earliest.
+        earliest = find_idempotent_watermark(
+            db,
+            content_hash=content_hash,
+            owner_id=owner_id,
+            epoch=epoch,
+            algorithm_version=engine.version,
+        )
+
+        if earliest is not None and earliest.id != watermark_id:
+
+            db.delete(watermark)
+            db.commit()
+
+            watermark = earliest
+            watermark_id = earliest.id
+            created = False
+
+            cached = await run_in_threadpool(blob_cache.get, watermark_id)
+
+            if cached is not None:
+                watermarked_bytes = cached
+
+            else:
+                # Deterministic: the same output, tagged with its ID
+                async with compute_stage(image_bytes, db):
+                    watermarked_bytes, _ = await run_in_threadpool(
+                        _protect,
+                        engine,
+                        image_bytes,
+                        owner_id,
+                        epoch,
+                        watermark_id,
+                        cancel,
+                    )
+
+    await run_in_threadpool(blob_cache.put, watermark_id, watermarked_bytes)
+
+    if created:
+
+        owner_epoch_cache.add(owner_id, engine.version, epoch)
+
+        if watermark.phash:
+            phash_indexes.add(owner_id, watermark_id, int(watermark.phash, 16))
+
+        if engine.supports_search:
+            signature_indexes.add(owner_id, epoch)
+
+    return watermark_id, watermarked_bytes, "sync", {**rate_headers, **timing_headers}
+
+
 @waterrouter.post("/upload")
 async def embed_image_watermark(
+    request: Request,
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -71,57 +450,50 @@ async def embed_image_watermark(
     # Generate epoch
     epoch = current_epoch()
 
-    # Create DB record
-    watermark = Watermark(
-        owner_id=owner_id,
-        content_type=content_type,
-        mime_type=file.content_type,
-        algorithm_version=ALGORITHM_VERSION,
-        status="active",
-        created_at=datetime.now(timezone.utc),
-    )
-
-    try:
-        db.add(watermark)
-        db.commit()
-        db.refresh(watermark)
-
-    except Exception:
-        db.rollback()
-
-        raise HTTPException(
-            status_code=500,
-            detail="Database error"
+    # New uploads always use the configured default engine
+    engine = get_watermark_engine()
+
+    # Idempotency key: same bytes, owner, epoch and algorithm
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+
+    flight_key = f"{content_hash}|{owner_id}|{epoch}|{engine.version}"
+
+    # Abandoned uploads stop queueing/processing and are not recorded
+    async with cancel_on_disconnect(request, "upload") as cancel:
+
+        async def embed_once():
+            return await _embed_idempotent(
+                db,
+                engine=engine,
+                owner_id=owner_id,
+                content_type=content_type,
+                mime_type=file.content_type,
+                image_bytes=image_bytes,
+                content_hash=content_hash,
+                epoch=epoch,
+                cancel=cancel,
+            )
+
+        # Concurrent duplicates share the first request's work
+        (watermark_id, watermarked_bytes, mode, rate_headers), shared = (
+            await upload_flights.do(flight_key, embed_once)
         )
 
-    # Embed watermark
-    try:
-        watermarked_bytes = embed_watermark(
-            image_bytes=image_bytes,
-            owner_id=owner_id,
-            epoch=epoch,
-        )
-
-    except Exception as e:
-
-        # Rollback DB entry
-        db.delete(watermark)
-        db.commit()
-
-        raise HTTPException(
-            status_code=500,
-            detail=str(e)
-        )
+    if shared:
+        mode = "coalesced"
 
-    # Return image
+    # Return image (format from the encoded header: cached blobs may
+    # predate an output format change)
     return Response(
         content=watermarked_bytes,
-        media_type="image/jpeg",
+        media_type=sniff_media_type(watermarked_bytes),
         headers={
-            "X-Watermark-ID": watermark.id,
+            "X-Watermark-ID": watermark_id,
             "X-Owner-ID": owner_id,
             "X-Watermark-Epoch": epoch,
-            "X-Watermark-Mode": "sync",
+            "X-Watermark-Mode": mode,
+            "X-Watermark-Algorithm": engine.version,
+            **rate_headers,
         },
     )
 
@@ -132,6 +504,8 @@ async def embed_image_watermark(
 
 @waterrouter.post("/verify")
 async def verify_self(
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -144,32 +518,56 @@ async def verify_self(
 
     image_bytes = await file.read()
 
+    # Only the (engine, epoch) pairs this owner has issued
+    plan = verification_plan(db, owner_id)
+
+    # Hand the connection back before queueing for compute
+    db.commit()
+
+    # One decode, then a block-DCT pass per epoch
+    rate_headers = await rate_limiter.charge(
+        "verify",
+        owner_id,
+        estimate_cpu_cost(
+            image_bytes,
+            passes=sum(len(epochs) for _, epochs in plan),
+        ),
+    )
+
+    response.headers.update(rate_headers)
+
     # Scan all epochs (Owner-Level Uniqueness)
     # We no longer Loop over assets, as the signal is unique to the owner
     
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+
     best = 0.0
     best_raw = None
 
-    epochs = previous_epochs(4)
-    # Add current epoch if not in previous (usually previous_epochs returns past 4, we might want current too?)
-    # The original code called current_epoch() for embed, and previous_epochs(4) for verify? 
-    # Wait, `previous_epochs` implementation:
-    # returns 4 epochs ending with current? No, it starts with current usually.
-    # Let's check `previous_epochs` in `image_config.py` later if needed, but assuming standard usage.
-    # Actually, let's look at `previous_epochs` in `image_config.py` from the view_file earlier.
-    # It starts with `now` and goes back. So it includes current.
+    # Abandoned verifies leave the compute queues before they start
+    async with cancel_on_disconnect(request, "verify"):
 
-    for epoch in epochs:
+        # Dispatch per algorithm version the owner has issued
+        for engine, epochs in plan:
 
-        raw = verify_watermark(
-            image_bytes=image_bytes,
-            owner_id=owner_id,
-            epoch=epoch,
-        )
+            raw = await verify_with_engine(
+                engine,
+                image_bytes,
+                content_hash,
+                owner_id,
+                epochs,
+            )
+
+            if raw is not None and raw["confidence"] > best:
+                best = raw["confidence"]
+                best_raw = raw
+
+        if best_raw is not None and best_raw["verified"]:
+            best_raw = await _with_source_asset(db, owner_id, image_bytes, best_raw)
 
-        if raw["confidence"] > best:
-            best = raw["confidence"]
-            best_raw = raw
+    if best_raw is not None:
+        # Corrected over epochs by the engine; also over the engines tried
+        best_raw = with_p_values_corrected(best_raw, len(plan))
 
     if best_raw is None:
         return interpret_verification_result({
@@ -179,3 +577,376 @@ async def verify_self(
         })
 
     return interpret_verification_result(best_raw)
+
+
+def with_p_values_corrected(raw: dict, n_tests: int) -> dict:
+    """
+    Sidak-correct a result's calibrated p-value for the best of n_tests
+    engines (the empirical floor stays uncorrected).
+    """
+
+    if raw.get("p_value") is None:
+        return raw
+
+    return {**raw, "p_value": sidak(raw["p_value"], n_tests)}
+
+
+async def _with_source_asset(
+    db: Session,
+    owner_id: str,
+    image_bytes: bytes,
+    raw: dict,
+) -> dict:
+    """
+    Attach the owner's upload this image was derived from, matched by
+    perceptual hash, when one is close enough.
+    """
+
+    query_hash = await run_in_threadpool(phash_bytes, image_bytes)
+
+    if query_hash is None:
+        return raw
+
+    # First lookup for an owner loads their hashes; keep it off the loop
+    match = await run_in_threadpool(
+        phash_indexes.find_source,
+        db,
+        owner_id,
+        query_hash,
+    )
+
+    if match is None:
+        return raw
+
+    distance, watermark_id = match
+
+    source = get_watermark(db, watermark_id)
+
+    return {
+        **raw,
+        "watermark_id": watermark_id,
+        "phash_distance": distance,
+        "created_at": source.created_at if source else None,
+    }
+
+
+# ==================================
+# IDENTIFY (ANY OWNER)
+# ==================================
+
+def searchable_versions() -> list[str]:
+    """
+    Registered versions whose block layout is owner-independent.
+    """
+
+    return [
+        version for version in registered_versions()
+        if get_watermark_engine(version).supports_search
+    ]
+
+
+@waterrouter.post("/identify")
+async def identify_owner(
+    request: Request,
+    response: Response,
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Which owner's watermark an image carries, searched across every
+    owner through the signature index (v4 and later uploads). Another
+    owner's ID is only returned to admins (or with
+    AURORAA_IDENTIFY_REVEAL_OWNERS); everyone else learns whether the
+    image is theirs.
+    """
+
+    user_id = current_user.get("user_id")
+
+    if not user_id:
+        raise HTTPException(401, "Unauthorized")
+
+    image_bytes = await file.read()
+
+    versions = searchable_versions()
+
+    # One pass per decoder
+    engines = list({
+        engine.decoder_version: engine
+        for engine in map(get_watermark_engine, versions)
+    }.values())
+
+    rate_headers = await rate_limiter.charge(
+        "verify",
+        user_id,
+        estimate_cpu_cost(image_bytes, passes=len(engines)),
+    )
+
+    response.headers.update(rate_headers)
+
+    await run_in_threadpool(signature_indexes.refresh, db, versions)
+
+    # Hand the connection back before queueing for compute
+    db.commit()
+
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+
+    epochs = previous_epochs(VERIFY_EPOCH_WINDOW)
+
+    best_raw = None
+
+    async with cancel_on_disconnect(request, "identify"):
+
+        for engine in engines:
+
+            planes = await engine_planes(engine, image_bytes, content_hash)
+
+            raw = await run_in_threadpool(
+                signature_indexes.identify,
+                engine,
+                planes,
+                epochs,
+            )
+
+            if raw is not None and raw["confidence"] > (best_raw["confidence"] if best_raw else 0.0):
+                best_raw = raw
+
+    if best_raw is not None:
+        best_raw = with_p_values_corrected(best_raw, len(engines))
+
+    if best_raw is None:
+        return interpret_verification_result({
+            "verified": False,
+            "confidence": 0.0,
+            "status": "not_verified"
+        })
+
+    result = interpret_verification_result(best_raw)
+
+    if result["verified"]:
+
+        result["owned_by_caller"] = best_raw["owner_id"] == user_id
+
+        reveal = IDENTIFY_REVEAL_OWNERS or current_user.get("role") == "admin"
+
+        if not result["owned_by_caller"] and not reveal:
+            result.pop("owner", None)
+
+    return result
+
+
+# ==================================
+# DATASET AUDIT (PRIVATE / OWNER)
+# ==================================
+
+def audit_admitter(loop: asyncio.AbstractEventLoop):
+    """
+    run_audit's `admit` hook: charges each archive member's estimated
+    peak memory to the shared admission budget before it is handed to
+    the audit pool, released when its worker finishes. Called from the
+    streaming thread, so the controller is driven on `loop`.
+    """
+
+    def admit(image_bytes: bytes):
+
+        cost = estimate_peak_bytes(image_bytes)
+
+        while True:
+
+            try:
+                asyncio.run_coroutine_threadsafe(admission.acquire(cost), loop).result()
+                break
+
+            except Overloaded as e:
+
+                if e.status_code == 413:
+                    return None
+
+                # A batch job waits out busy periods instead of failing
+                time.sleep(e.retry_after)
+
+        return lambda: loop.call_soon_threadsafe(admission.release, cost)
+
+    return admit
+
+
+@waterrouter.post("/audit")
+async def audit_dataset(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Verify every image in a ZIP/TAR archive against the caller and
+    stream NDJSON results, ending with an aggregate summary record.
+    """
+
+    owner_id = current_user.get("user_id")
+
+    if not owner_id:
+        raise HTTPException(401, "Unauthorized")
+
+    archive_mb = (file.size or 0) / (1024 * 1024)
+
+    rate_headers = await rate_limiter.charge(
+        "audit",
+        owner_id,
+        max(1.0, archive_mb),
+    )
+
+    # Form files are closed before a streaming body is sent, so keep our
+    # own spooled copy for the lifetime of the stream
+    spool = tempfile.TemporaryFile()
+
+    await run_in_threadpool(shutil.copyfileobj, file.file, spool)
+
+    if not await run_in_threadpool(is_archive, spool):
+        spool.close()
+        raise HTTPException(400, "Expected a ZIP or TAR archive")
+
+    plan = verification_plan(db, owner_id)
+
+    versions = [engine.version for engine, _ in plan]
+
+    # Newest first, across every version the owner has used
+    epochs = sorted({e for _, es in plan for e in es}, reverse=True)
+
+    admit = audit_admitter(asyncio.get_running_loop())
+
+    def stream():
+
+        try:
+            for record in run_audit(
+                iter_archive(spool),
+                owner_id,
+                epochs,
+                get_audit_pool(),
+                AUDIT_WORKERS,
+                versions,
+                admit,
+            ):
+                yield json.dumps(record) + "\n"
+
+        finally:
+            spool.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers=rate_headers,
+    )
+
+
+# ==================================
+# HISTORY (PRIVATE / OWNER)
+# ==================================
+
+@waterrouter.get("/list", response_model=WatermarkPage)
+def list_watermarks(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    status: str | None = None,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    The caller's watermarks, newest first, keyset-paginated.
+    """
+
+    owner_id = current_user.get("user_id")
+
+    if not owner_id:
+        raise HTTPException(401, "Unauthorized")
+
+    try:
+        rows, next_cursor = list_owner_watermarks(
+            db,
+            owner_id,
+            limit,
+            cursor=cursor,
+            status=status,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    return WatermarkPage(
+        items=[WatermarkItem.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+
+def _export_value(value):
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return value
+
+
+@waterrouter.get("/export")
+def export_watermarks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: str | None = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Stream the caller's full watermark history as NDJSON or CSV.
+    """
+
+    owner_id = current_user.get("user_id")
+
+    if not owner_id:
+        raise HTTPException(401, "Unauthorized")
+
+    def stream():
+
+        # Own session: the request's is closed before the body streams
+        get_engine()
+        db = SessionLocal()
+
+        try:
+            rows = stream_owner_watermarks(db, owner_id, status=status)
+
+            if format == "csv":
+
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+
+                writer.writerow(EXPORT_COLUMNS)
+
+                for n, row in enumerate(rows, 1):
+
+                    writer.writerow(_export_value(v) for v in row)
+
+                    if n % 1000 == 0:
+                        yield buf.getvalue()
+                        buf.seek(0)
+                        buf.truncate()
+
+                yield buf.getvalue()
+
+            else:
+
+                for row in rows:
+                    yield json.dumps({
+                        column: _export_value(value)
+                        for column, value in zip(EXPORT_COLUMNS, row)
+                    }) + "\n"
+
+        finally:
+            db.close()
+
+    if format == "csv":
+        media_type = "text/csv"
+    else:
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="watermarks-{owner_id}.{format}"'
+            ),
+        },
+    )
@@ -1 +1,26 @@
-# SCHEMAS FOR WATERMARK SERVICE
\ No newline at end of file
+# SCHEMAS FOR WATERMARK SERVICE
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class WatermarkItem(BaseModel):
+    id: str
+    content_type: str
+    mime_type: str
+    content_hash: str | None = None
+    phash: str | None = None
+    epoch: str | None = None
+    algorithm_version: str
+    status: str
+    created_at: datetime | None = None
+
+    model_config = {"from_attributes": True}
+
+
+class WatermarkPage(BaseModel):
+    items: list[WatermarkItem]
+
+    # Opaque; pass back as ?cursor= for the next page (None at the end)
+    next_cursor: str | None = None
@@ -0,0 +1,42 @@
+# sdk.py
+#
+# In-process watermarking for services that already hold decoded frames.
+# Same engines as the HTTP API, without the JPEG encode/decode round trip:
+#
+#     from app.sdk import get_engine, current_epoch
+#
+#     engine = get_engine()                      # default algorithm version
+#     epoch = current_epoch()
+#
+#     marked = engine.embed_array(bgr, owner_id, epoch)        # (H, W, 3) uint8
+#     result = engine.verify_array(marked, owner_id, epoch)    # score dict
+#
+#     stack = engine.embed_batch(frames, owner_id, epoch)      # (N, H, W, 3)
+#     results = engine.verify_batch(stack, owner_id, epoch)
+#
+# Arrays are uint8 BGR (OpenCV order). Outputs keep the input size
+# (TARGET x TARGET with AURORAA_NATIVE_OUTPUT=0).
+
+from app.services.watermark.image.image_config import (
+    TARGET,
+    current_epoch,
+    previous_epochs,
+)
+from app.services.watermark.image.image_engine import (
+    WatermarkEngine,
+    get_watermark_engine as get_engine,
+    load_engine,
+    register_engine,
+    registered_versions,
+)
+
+__all__ = [
+    "TARGET",
+    "WatermarkEngine",
+    "current_epoch",
+    "get_engine",
+    "load_engine",
+    "previous_epochs",
+    "register_engine",
+    "registered_versions",
+]
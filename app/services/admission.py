@@ -0,0 +1,240 @@
+# admission.py
+
+import asyncio
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+
+from app.services import metrics
+from app.services.watermark.image.image_config import NATIVE_OUTPUT, TARGET
+from app.services.watermark.image.image_header import probe_image
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+MEMORY_BUDGET_MB = int(os.getenv("AURORAA_MEMORY_BUDGET_MB", "512"))
+
+# "queue" waits in FIFO order, "reject" fails fast with 503
+ADMISSION_MODE = os.getenv("AURORAA_ADMISSION_MODE", "queue")
+
+ADMISSION_TIMEOUT = float(os.getenv("AURORAA_ADMISSION_TIMEOUT", "30"))
+ADMISSION_MAX_QUEUE = int(os.getenv("AURORAA_ADMISSION_MAX_QUEUE", "64"))
+
+# Resized BGR + YCrCb + float32 luma, DWT bands, inverse DWT and encode
+# buffers at TARGET resolution
+WORKING_SET_BYTES = TARGET * TARGET * 24
+
+# Native output: int16 BGR delta and the output image at source size
+NATIVE_BYTES_PER_PIXEL = 9 if NATIVE_OUTPUT else 0
+
+# Assumed decode expansion when the header cannot be read
+UNKNOWN_EXPANSION = 10
+
+
+# --------------------------------
+# Errors
+# --------------------------------
+
+class Overloaded(Exception):
+
+    def __init__(self, detail: str, status_code: int = 503, retry_after: int = 1):
+
+        super().__init__(detail)
+
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# --------------------------------
+# Cost model
+# --------------------------------
+
+def estimate_peak_bytes(image_bytes: bytes) -> int:
+    """
+    Estimate peak memory for one request from the image header.
+    """
+
+    probed = probe_image(image_bytes)
+
+    if probed is None:
+        decoded = len(image_bytes) * UNKNOWN_EXPANSION
+    else:
+        _, w, h = probed
+        decoded = w * h * (3 + NATIVE_BYTES_PER_PIXEL)
+
+    return len(image_bytes) + decoded + WORKING_SET_BYTES
+
+
+# --------------------------------
+# Admission controller
+# --------------------------------
+
+class AdmissionController:
+    """
+    Admits requests against a global memory budget.
+
+    Waiters are served strictly in arrival order so a large request at
+    the head of the queue is not starved by a stream of small ones.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        mode: str = "queue",
+        timeout: float = 30.0,
+        max_queue: int = 64,
+    ):
+
+        self.budget = budget_bytes
+        self.mode = mode
+        self.timeout = timeout
+        self.max_queue = max_queue
+
+        self.in_use = 0
+
+        self._waiters: deque = deque()
+
+        self._publish()
+
+    # -----------------------------
+    # Metrics
+    # -----------------------------
+
+    def _publish(self):
+
+        metrics.set_gauge(
+            "auroraa_admission_budget_bytes",
+            self.budget,
+            help_text="Configured memory budget for image processing",
+        )
+        metrics.set_gauge(
+            "auroraa_admission_in_use_bytes",
+            self.in_use,
+            help_text="Estimated memory held by admitted requests",
+        )
+        metrics.set_gauge(
+            "auroraa_admission_queue_depth",
+            len(self._waiters),
+            help_text="Requests waiting for memory budget",
+        )
+
+    def _reject(self, reason: str, detail: str, status_code: int = 503):
+
+        metrics.inc_counter(
+            "auroraa_admission_rejected_total",
+            labels={"reason": reason},
+            help_text="Requests rejected by the admission controller",
+        )
+
+        raise Overloaded(detail, status_code=status_code)
+
+    # -----------------------------
+    # Budget accounting
+    # -----------------------------
+
+    def _fits(self, cost: int) -> bool:
+        return self.in_use + cost <= self.budget
+
+    def _grant(self, cost: int):
+
+        self.in_use += cost
+
+        metrics.inc_counter(
+            "auroraa_admission_admitted_total",
+            help_text="Requests admitted by the admission controller",
+        )
+
+        self._publish()
+
+    def _wake(self):
+
+        while self._waiters:
+
+            cost, fut = self._waiters[0]
+
+            if fut.done():
+                self._waiters.popleft()
+                continue
+
+            if not self._fits(cost):
+                break
+
+            self._waiters.popleft()
+            self._grant(cost)
+            fut.set_result(None)
+
+        self._publish()
+
+    async def acquire(self, cost: int):
+
+        if cost > self.budget:
+            self._reject(
+                "too_large",
+                "Image too large to process",
+                status_code=413,
+            )
+
+        if not self._waiters and self._fits(cost):
+            self._grant(cost)
+            return
+
+        if self.mode == "reject":
+            self._reject("busy", "Server busy, retry later")
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full", "Server busy, retry later")
+
+        fut = asyncio.get_running_loop().create_future()
+        entry = (cost, fut)
+
+        self._waiters.append(entry)
+        self._publish()
+
+        try:
+            await asyncio.wait_for(fut, self.timeout)
+
+        except BaseException as e:
+
+            if fut.done() and not fut.cancelled():
+                # Granted just before we gave up
+                self.release(cost)
+            else:
+                try:
+                    self._waiters.remove(entry)
+                except ValueError:
+                    pass
+                self._wake()
+
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("timeout", "Server busy, retry later")
+
+            raise
+
+    def release(self, cost: int):
+
+        self.in_use = max(0, self.in_use - cost)
+
+        self._wake()
+
+    @asynccontextmanager
+    async def admit(self, image_bytes: bytes):
+
+        cost = estimate_peak_bytes(image_bytes)
+
+        await self.acquire(cost)
+
+        try:
+            yield cost
+        finally:
+            self.release(cost)
+
+
+admission = AdmissionController(
+    budget_bytes=MEMORY_BUDGET_MB * 1024 * 1024,
+    mode=ADMISSION_MODE,
+    timeout=ADMISSION_TIMEOUT,
+    max_queue=ADMISSION_MAX_QUEUE,
+)
@@ -0,0 +1,147 @@
+# blob_cache.py
+
+import os
+import tempfile
+import threading
+import time
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+BLOB_CACHE_DIR = os.getenv(
+    "AURORAA_BLOB_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "auroraa-blobs"),
+)
+BLOB_CACHE_MB = int(os.getenv("AURORAA_BLOB_CACHE_MB", "256"))
+
+# Workers share the directory but count only their own puts; the total
+# is re-read from disk this often
+BLOB_CACHE_RESYNC_SECONDS = float(os.getenv("AURORAA_BLOB_CACHE_RESYNC_SECONDS", "60"))
+
+# Eviction goes down to this fraction of the budget, so one walk of the
+# tree buys room for many puts
+_LOW_WATER = 0.9
+
+
+# --------------------------------
+# Size-bounded local blob cache
+# --------------------------------
+
+class BlobCache:
+    """
+    Files on local disk, evicted least-recently-used (by mtime) down to
+    90% of `max_bytes` once the total size exceeds it.
+    """
+
+    def __init__(self, root: str, max_bytes: int, resync_seconds: float = BLOB_CACHE_RESYNC_SECONDS):
+
+        self.root = root
+        self.max_bytes = max_bytes
+        self.resync_seconds = resync_seconds
+
+        self._lock = threading.Lock()
+        self._total = None
+        self._synced_at = 0.0
+
+    def _path(self, key: str) -> str:
+
+        # Keys are hex digests / UUIDs; fan out to keep directories small
+        safe = "".join(c for c in key if c.isalnum() or c in "-_")
+
+        return os.path.join(self.root, safe[:2], safe)
+
+    def _entries(self):
+
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st
+
+    def _ensure_total(self):
+
+        now = time.monotonic()
+
+        if self._total is None or now - self._synced_at >= self.resync_seconds:
+            os.makedirs(self.root, exist_ok=True)
+            self._total = sum(st.st_size for _, st in self._entries())
+            self._synced_at = now
+
+    def _evict(self):
+
+        if self._total <= self.max_bytes:
+            return
+
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+
+        # The walk is a fresh count, including other workers' files
+        self._total = sum(st.st_size for _, st in entries)
+        self._synced_at = time.monotonic()
+
+        low_water = self.max_bytes * _LOW_WATER
+
+        for path, st in entries:
+
+            if self._total <= low_water:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+
+            self._total -= st.st_size
+
+    def get(self, key: str) -> bytes | None:
+
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        # Touch for LRU ordering
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return data
+
+    def put(self, key: str, data: bytes):
+
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+
+        with self._lock:
+
+            self._ensure_total()
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            try:
+                previous = os.path.getsize(path)
+            except FileNotFoundError:
+                previous = 0
+
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+
+            with open(tmp, "wb") as f:
+                f.write(data)
+
+            os.replace(tmp, path)
+
+            self._total += len(data) - previous
+
+            self._evict()
+
+
+blob_cache = BlobCache(BLOB_CACHE_DIR, BLOB_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,107 @@
+# cancellation.py
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from app.services import metrics
+
+# --------------------------------
+# Errors
+# --------------------------------
+
+class Cancelled(Exception):
+    """
+    The client went away; the result would never be read.
+    """
+
+    # nginx's "client closed request"; never actually delivered
+    status_code = 499
+
+
+# --------------------------------
+# Cancellation tokens
+# --------------------------------
+# Work running in the threadpool cannot be interrupted by asyncio
+# cancellation, so long jobs take a token and call check() at stage
+# boundaries (after decode, between transform stages, before encode).
+
+class CancelToken:
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def check(self):
+
+        if self._event.is_set():
+            raise Cancelled("Client disconnected")
+
+
+# Default for callers without a request (CLIs, workers, warm-up)
+NEVER = CancelToken()
+
+
+# --------------------------------
+# Client disconnects
+# --------------------------------
+
+async def _wait_disconnect(request):
+
+    # The body has been read, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+@asynccontextmanager
+async def cancel_on_disconnect(request, route: str):
+    """
+    Yields a CancelToken for the request. If the client disconnects, the
+    token is set (stopping threadpool work at its next stage boundary)
+    and the handler task is cancelled (dropping it from any queue it
+    waits in); the block then raises Cancelled.
+
+    Enter only after the request body has been consumed.
+    """
+
+    token = CancelToken()
+
+    task = asyncio.current_task()
+
+    async def watch():
+
+        await _wait_disconnect(request)
+
+        token.cancel()
+        task.cancel()
+
+    watcher = asyncio.create_task(watch())
+
+    try:
+        yield token
+
+    except (asyncio.CancelledError, Cancelled):
+
+        if not token.cancelled:
+            raise
+
+        # Our own cancel, not the server's: surface it as an error
+        if task.cancelling():
+            task.uncancel()
+
+        metrics.inc_counter(
+            "auroraa_requests_cancelled_total",
+            labels={"route": route},
+            help_text="Requests abandoned by their client before completion",
+        )
+
+        raise Cancelled("Client disconnected")
+
+    finally:
+        watcher.cancel()
@@ -0,0 +1,60 @@
+# coalesce.py
+
+import asyncio
+
+# --------------------------------
+# Request coalescing (single flight)
+# --------------------------------
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution and its
+    result (or exception). Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._flights: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn):
+        """
+        Await `fn()` once per key; returns (result, shared).
+        """
+
+        while True:
+
+            flight = self._flights.get(key)
+
+            if flight is None:
+                break
+
+            try:
+                return await asyncio.shield(flight), True
+
+            except asyncio.CancelledError:
+                # Leader was cancelled, not us: take over
+                if flight.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+
+        try:
+            result = await fn()
+
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark retrieved so an unobserved failure is not logged
+            flight.exception()
+            raise
+
+        else:
+            flight.set_result(result)
+            return result, False
+
+        finally:
+            del self._flights[key]
@@ -0,0 +1,219 @@
+# concurrency_limiter.py
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from app.services import metrics
+from app.services.admission import Overloaded
+from app.services.watermark.image.image_parallel import THREAD_BUDGET
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+CONCURRENCY_LIMITING = os.getenv("AURORAA_CONCURRENCY_LIMITING", "1") != "0"
+
+# Latency SLO for one compute stage (admission wait included)
+LATENCY_TARGET_MS = float(os.getenv("AURORAA_LATENCY_TARGET_MS", "1500"))
+
+CONCURRENCY_INITIAL = int(os.getenv("AURORAA_CONCURRENCY_INITIAL", str(2 * THREAD_BUDGET)))
+CONCURRENCY_MIN = int(os.getenv("AURORAA_CONCURRENCY_MIN", "1"))
+CONCURRENCY_MAX = int(os.getenv("AURORAA_CONCURRENCY_MAX", "64"))
+
+# Multiplicative decrease applied when the SLO is missed
+BACKOFF = float(os.getenv("AURORAA_CONCURRENCY_BACKOFF", "0.8"))
+
+# Waiters allowed per unit of limit before requests are shed
+QUEUE_FACTOR = float(os.getenv("AURORAA_CONCURRENCY_QUEUE_FACTOR", "1"))
+
+# Smoothing of the latency estimate
+_EWMA = 0.2
+
+
+# --------------------------------
+# Adaptive concurrency limit (AIMD)
+# --------------------------------
+# The in-flight limit grows by about one per limit's worth of requests
+# completing within the target, and shrinks by BACKOFF when the smoothed
+# latency exceeds it. Only requests started after the last decrease can
+# trigger another one, so a single overload episode backs off once per
+# round trip rather than once per slow request.
+#
+# Requests over the limit wait in a short FIFO queue (QUEUE_FACTOR x
+# limit) for at most the latency target; beyond that they are shed with
+# a fast 503 so queues cannot grow without bound. Small images finish
+# quickly and push the limit up; 48 MP uploads stretch latency and pull
+# it down.
+
+class ConcurrencyLimiter:
+    """
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        initial: int = CONCURRENCY_INITIAL,
+        min_limit: int = CONCURRENCY_MIN,
+        max_limit: int = CONCURRENCY_MAX,
+        target: float = LATENCY_TARGET_MS / 1000,
+        backoff: float = BACKOFF,
+        queue_factor: float = QUEUE_FACTOR,
+    ):
+
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+
+        self.target = target
+        self.backoff = backoff
+        self.queue_factor = queue_factor
+
+        self.in_flight = 0
+        self.latency = 0.0
+
+        self._last_decrease = 0.0
+
+        self._waiters: deque = deque()
+
+        self._publish()
+
+    # -----------------------------
+    # Metrics
+    # -----------------------------
+
+    def _publish(self):
+
+        metrics.set_gauge(
+            "auroraa_concurrency_limit",
+            self.limit,
+            help_text="Current adaptive in-flight limit for compute",
+        )
+        metrics.set_gauge(
+            "auroraa_concurrency_in_flight",
+            self.in_flight,
+            help_text="Compute stages currently running",
+        )
+        metrics.set_gauge(
+            "auroraa_concurrency_queue_depth",
+            len(self._waiters),
+            help_text="Requests waiting for a compute slot",
+        )
+        metrics.set_gauge(
+            "auroraa_concurrency_latency_seconds",
+            self.latency,
+            help_text="Smoothed compute stage latency",
+        )
+
+    def _shed(self, reason: str):
+
+        metrics.inc_counter(
+            "auroraa_concurrency_shed_total",
+            labels={"reason": reason},
+            help_text="Requests shed by the concurrency limiter",
+        )
+
+        raise Overloaded("Server busy, retry later")
+
+    # -----------------------------
+    # Limit adjustment
+    # -----------------------------
+
+    def _capacity(self) -> int:
+        return max(self.min_limit, math.floor(self.limit))
+
+    def _record(self, started: float, elapsed: float):
+
+        if self.latency:
+            self.latency += _EWMA * (elapsed - self.latency)
+        else:
+            self.latency = elapsed
+
+        if self.latency > self.target:
+
+            if started >= self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = time.monotonic()
+
+        elif self._waiters or self.in_flight >= self._capacity():
+            # Only grow while the limit is actually the constraint
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    # -----------------------------
+    # Slots
+    # -----------------------------
+
+    def _wake(self):
+
+        while self._waiters and self.in_flight < self._capacity():
+
+            fut = self._waiters.popleft()
+
+            if fut.done():
+                continue
+
+            self.in_flight += 1
+            fut.set_result(None)
+
+        self._publish()
+
+    async def acquire(self):
+
+        if not self._waiters and self.in_flight < self._capacity():
+            self.in_flight += 1
+            self._publish()
+            return
+
+        if len(self._waiters) >= math.ceil(self.limit * self.queue_factor):
+            self._shed("queue_full")
+
+        fut = asyncio.get_running_loop().create_future()
+
+        self._waiters.append(fut)
+        self._publish()
+
+        try:
+            await asyncio.wait_for(fut, self.target)
+
+        except BaseException as e:
+
+            if fut.done() and not fut.cancelled():
+                # Granted just before we gave up
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+                self._wake()
+
+            if isinstance(e, asyncio.TimeoutError):
+                self._shed("timeout")
+
+            raise
+
+    def release(self):
+
+        self.in_flight = max(0, self.in_flight - 1)
+
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self):
+
+        await self.acquire()
+
+        started = time.monotonic()
+
+        try:
+            yield
+        finally:
+            self._record(started, time.monotonic() - started)
+            self.release()
+
+
+compute_limiter = ConcurrencyLimiter()
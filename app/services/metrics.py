@@ -0,0 +1,74 @@
+# metrics.py
+
+import threading
+
+# --------------------------------
+# Minimal in-process metrics registry
+# --------------------------------
+# Rendered in the Prometheus text exposition format by /metrics.
+
+_lock = threading.Lock()
+
+_metrics: dict[str, dict] = {}
+
+
+def _register(name: str, kind: str, help_text: str) -> dict:
+
+    with _lock:
+
+        metric = _metrics.get(name)
+
+        if metric is None:
+            metric = {
+                "kind": kind,
+                "help": help_text,
+                "values": {},
+            }
+            _metrics[name] = metric
+
+        return metric
+
+
+def _key(labels: dict | None) -> tuple:
+    return tuple(sorted((labels or {}).items()))
+
+
+def set_gauge(name: str, value: float, labels: dict | None = None, help_text: str = ""):
+
+    metric = _register(name, "gauge", help_text)
+
+    with _lock:
+        metric["values"][_key(labels)] = float(value)
+
+
+def inc_counter(name: str, amount: float = 1.0, labels: dict | None = None, help_text: str = ""):
+
+    metric = _register(name, "counter", help_text)
+
+    with _lock:
+        key = _key(labels)
+        metric["values"][key] = metric["values"].get(key, 0.0) + amount
+
+
+def render() -> str:
+
+    lines = []
+
+    with _lock:
+
+        for name, metric in sorted(_metrics.items()):
+
+            if metric["help"]:
+                lines.append(f"# HELP {name} {metric['help']}")
+
+            lines.append(f"# TYPE {name} {metric['kind']}")
+
+            for labels, value in sorted(metric["values"].items()):
+
+                if labels:
+                    label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f"{name}{{{label_str}}} {value:g}")
+                else:
+                    lines.append(f"{name} {value:g}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,130 @@
+# owner_epochs.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.services.watermark.image.image_config import (
+    current_epoch,
+    epoch_bounds,
+    previous_epochs,
+)
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+# How far back verification looks (quarters); only epochs the owner
+# actually used inside the window are tried
+VERIFY_EPOCH_WINDOW = int(os.getenv("AURORAA_VERIFY_EPOCH_WINDOW", "12"))
+
+# Re-read an owner's summary after this long (picks up other workers'
+# inserts and revocations)
+EPOCH_CACHE_SECONDS = float(os.getenv("AURORAA_EPOCH_CACHE_SECONDS", "60"))
+EPOCH_CACHE_MAX_OWNERS = int(os.getenv("AURORAA_EPOCH_CACHE_MAX_OWNERS", "10000"))
+
+
+# --------------------------------
+# Per-owner epoch summary
+# --------------------------------
+# {algorithm_version: {epoch, ...}} of the owner's active watermarks,
+# i.e. exactly the (engine, epoch) pairs a verification can match.
+
+class OwnerEpochCache:
+
+    def __init__(self, ttl: float, max_owners: int):
+
+        self.ttl = ttl
+        self.max_owners = max_owners
+
+        self._entries: OrderedDict[str, tuple[float, dict[str, set[str]]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def summary(self, db, owner_id: str) -> dict[str, set[str]]:
+
+        from app.crud.watermark_crud import owner_epoch_summary
+
+        now = time.monotonic()
+
+        with self._lock:
+
+            entry = self._entries.get(owner_id)
+
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(owner_id)
+                return entry[1]
+
+        summary: dict[str, set[str]] = {}
+
+        # Nothing older than the verify window is ever tried
+        since = epoch_bounds(previous_epochs(VERIFY_EPOCH_WINDOW)[-1])[0]
+
+        for version, epoch in owner_epoch_summary(db, owner_id, since.replace(tzinfo=None)):
+            summary.setdefault(version, set()).add(epoch)
+
+        with self._lock:
+
+            self._entries[owner_id] = (now, summary)
+            self._entries.move_to_end(owner_id)
+
+            while len(self._entries) > self.max_owners:
+                self._entries.popitem(last=False)
+
+        return summary
+
+    def add(self, owner_id: str, version: str, epoch: str):
+        """
+        Record a new insert (no-op if the owner is not cached).
+        """
+
+        with self._lock:
+
+            entry = self._entries.get(owner_id)
+
+            if entry is not None:
+
+                # Copy on write: readers may be iterating the old summary
+                summary = {v: set(e) for v, e in entry[1].items()}
+                summary.setdefault(version, set()).add(epoch)
+
+                self._entries[owner_id] = (entry[0], summary)
+
+    def invalidate(self, owner_id: str):
+
+        with self._lock:
+            self._entries.pop(owner_id, None)
+
+
+owner_epoch_cache = OwnerEpochCache(EPOCH_CACHE_SECONDS, EPOCH_CACHE_MAX_OWNERS)
+
+
+def epochs_to_verify(
+    db,
+    owner_id: str,
+    default_version: str,
+    window: int = VERIFY_EPOCH_WINDOW,
+) -> dict[str, list[str]]:
+    """
+    {algorithm_version: epochs newest first} to try for this owner.
+
+    The current epoch is always tried with the default engine: an upload
+    made moments ago on another worker may not be in this worker's
+    cached summary yet.
+    """
+
+    summary = owner_epoch_cache.summary(db, owner_id)
+
+    recent = previous_epochs(window)
+
+    plan = {
+        version: [e for e in recent if e in epochs]
+        for version, epochs in summary.items()
+    }
+
+    current = current_epoch()
+
+    if current not in plan.get(default_version, []):
+        plan.setdefault(default_version, []).insert(0, current)
+
+    return {version: epochs for version, epochs in plan.items() if epochs}
@@ -0,0 +1,279 @@
+# phash_index.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from app.services import metrics
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+# Max Hamming distance for a source-asset match (of 64 bits). Up to 7
+# probes one bit per substring (~0.3 ms at 1M hashes); 8-11 probe two
+# and cost ~6x more
+PHASH_MAX_DISTANCE = int(os.getenv("AURORAA_PHASH_MAX_DISTANCE", "7"))
+
+# Owners kept in memory, and how often an owner's index picks up rows
+# written by other workers
+PHASH_MAX_OWNERS = int(os.getenv("AURORAA_PHASH_MAX_OWNERS", "1024"))
+PHASH_REFRESH_SECONDS = float(os.getenv("AURORAA_PHASH_REFRESH_SECONDS", "5"))
+
+
+# --------------------------------
+# Multi-index hashing
+# --------------------------------
+# The 64-bit hash is split into 4 x 16-bit substrings, each with its own
+# exact-match table. Two hashes within distance r agree to within r // 4
+# bits on at least one substring (pigeonhole), so probing every table
+# with its substring's r // 4 neighbourhood finds all candidates; only
+# those are compared in full.
+#
+# Tables are bucket-sorted arrays (positions ordered by substring plus
+# 2^16 + 1 bucket offsets), so a probe is a handful of vectorized
+# gathers. Entries added since the last rebuild are scanned directly
+# until the tail is worth re-sorting.
+
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# Rebuild once the unsorted tail exceeds this share of the index
+_TAIL_FRACTION = 8
+_MIN_TAIL = 4096
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(radius: int) -> np.ndarray:
+
+    masks = [0]
+
+    for r in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), r):
+            masks.append(sum(1 << b for b in bits))
+
+    return np.array(masks, dtype=np.int64)
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Concatenation of arange(s, e) for every (s, e) pair.
+    """
+
+    lengths = ends - starts
+    total = int(lengths.sum())
+
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+
+    offsets = np.cumsum(lengths) - lengths
+
+    return np.repeat(starts - offsets, lengths) + np.arange(total)
+
+
+class PhashIndex:
+    """
+    Hamming-distance index over (watermark id, 64-bit pHash) pairs.
+    """
+
+    def __init__(self):
+
+        self.ids: list[str] = []
+
+        # Grown by doubling; first len(ids) entries are live
+        self._hashes = np.zeros(1024, dtype=np.uint64)
+
+        self._known: set[str] = set()
+        self._lock = threading.Lock()
+
+        # Entries [0, _sorted) are in the tables
+        self._sorted = 0
+        self._positions: list[np.ndarray] = []
+        self._offsets: list[np.ndarray] = []
+
+        # Newest created_at loaded from the database
+        self.loaded_until: datetime | None = None
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, item_id: str, value: int):
+
+        with self._lock:
+
+            if item_id in self._known:
+                return
+
+            self._known.add(item_id)
+
+            pos = len(self.ids)
+
+            if pos == len(self._hashes):
+                self._hashes = np.concatenate([self._hashes, np.zeros_like(self._hashes)])
+
+            self.ids.append(item_id)
+            self._hashes[pos] = value
+
+    def _rebuild(self):
+
+        n = len(self.ids)
+        hashes = self._hashes[:n]
+
+        self._positions = []
+        self._offsets = []
+
+        for c in range(CHUNKS):
+
+            sub = ((hashes >> np.uint64(c * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.int64)
+
+            self._positions.append(np.argsort(sub, kind="stable"))
+
+            offsets = np.zeros(CHUNK_MASK + 2, dtype=np.int64)
+            np.cumsum(np.bincount(sub, minlength=CHUNK_MASK + 1), out=offsets[1:])
+
+            self._offsets.append(offsets)
+
+        self._sorted = n
+
+    def search(self, value: int, max_distance: int = PHASH_MAX_DISTANCE) -> list[tuple[int, str]]:
+        """
+        (distance, id) of every entry within `max_distance`, nearest first.
+        """
+
+        with self._lock:
+            return self._search(value, max_distance)
+
+    def _search(self, value: int, max_distance: int) -> list[tuple[int, str]]:
+
+        n = len(self.ids)
+
+        if n - self._sorted > max(_MIN_TAIL, self._sorted // _TAIL_FRACTION):
+            self._rebuild()
+
+        masks = _flip_masks(max_distance // CHUNKS)
+
+        found = [np.arange(self._sorted, n)]
+
+        for c in range(self._sorted and CHUNKS):
+
+            keys = ((value >> (c * CHUNK_BITS)) & CHUNK_MASK) ^ masks
+            offsets = self._offsets[c]
+
+            found.append(
+                self._positions[c][_ranges(offsets[keys], offsets[keys + 1])]
+            )
+
+        candidates = np.unique(np.concatenate(found))
+
+        if len(candidates) == 0:
+            return []
+
+        distances = np.bitwise_count(
+            self._hashes[candidates] ^ np.uint64(value)
+        )
+
+        keep = distances <= max_distance
+
+        return sorted(
+            (int(d), self.ids[pos])
+            for d, pos in zip(distances[keep], candidates[keep])
+        )
+
+
+# --------------------------------
+# Per-owner indexes
+# --------------------------------
+
+class OwnerPhashIndexes:
+    """
+    LRU of per-owner indexes, loaded from the watermarks table on first
+    use and topped up incrementally.
+    """
+
+    def __init__(self, max_owners: int, refresh_seconds: float):
+
+        self.max_owners = max_owners
+        self.refresh_seconds = refresh_seconds
+
+        self._indexes: OrderedDict[str, PhashIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index(self, owner_id: str) -> PhashIndex:
+
+        with self._lock:
+
+            index = self._indexes.get(owner_id)
+
+            if index is None:
+
+                index = PhashIndex()
+                self._indexes[owner_id] = index
+
+                while len(self._indexes) > self.max_owners:
+                    self._indexes.popitem(last=False)
+
+            else:
+                self._indexes.move_to_end(owner_id)
+
+            return index
+
+    def refresh(self, db, owner_id: str) -> PhashIndex:
+
+        from app.crud.watermark_crud import owner_phashes
+
+        index = self._index(owner_id)
+
+        now = time.monotonic()
+
+        if now - index.refreshed_at < self.refresh_seconds:
+            return index
+
+        for item_id, value, created_at in owner_phashes(db, owner_id, index.loaded_until):
+
+            index.add(item_id, int(value, 16))
+
+            if created_at is not None and (
+                index.loaded_until is None or created_at > index.loaded_until
+            ):
+                index.loaded_until = created_at
+
+        index.refreshed_at = now
+
+        return index
+
+    def add(self, owner_id: str, item_id: str, value: int):
+
+        with self._lock:
+            index = self._indexes.get(owner_id)
+
+        # Not loaded yet: the first lookup reads it from the database
+        if index is not None:
+            index.add(item_id, value)
+
+    def find_source(self, db, owner_id: str, value: int) -> tuple[int, str] | None:
+        """
+        (distance, watermark id) of the closest upload, or None.
+        """
+
+        start = time.perf_counter()
+
+        hits = self.refresh(db, owner_id).search(value)
+
+        metrics.inc_counter(
+            "auroraa_phash_lookup_seconds_total",
+            time.perf_counter() - start,
+            help_text="Time spent matching verified images to source uploads",
+        )
+
+        return hits[0] if hits else None
+
+
+phash_indexes = OwnerPhashIndexes(PHASH_MAX_OWNERS, PHASH_REFRESH_SECONDS)
@@ -0,0 +1,175 @@
+# plane_store.py
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from app.services import metrics
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+PLANE_STORE_PATH = os.getenv(
+    "AURORAA_PLANE_STORE",
+    os.path.join(tempfile.gettempdir(), "auroraa-planes.sqlite3"),
+)
+PLANE_STORE_MAX_ENTRIES = int(os.getenv("AURORAA_PLANE_STORE_MAX_ENTRIES", "200000"))
+
+# Prune at most once per this many writes
+_PRUNE_EVERY = 1000
+
+
+# --------------------------------
+# Per-image delta planes
+# --------------------------------
+# The block deltas of an image's LL/LH/HL bands do not depend on owner or
+# epoch; only the keyed gather over them does. Storing them (float16,
+# ~24 KB per image at TARGET) lets any owner/epoch/key be checked later
+# without the original bytes or a decode.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS planes (
+    content_hash TEXT NOT NULL,
+    version TEXT NOT NULL,
+    bands INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (content_hash, version)
+);
+CREATE INDEX IF NOT EXISTS ix_planes_used ON planes (used_at);
+"""
+
+
+class PlaneStore:
+    """
+    SQLite file of delta planes keyed by (content hash, algorithm
+    version), pruned least-recently-used past `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+
+        self.path = path
+        self.max_entries = max_entries
+
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+
+            self._local.conn = conn
+
+        return conn
+
+    def get(self, content_hash: str, version: str) -> np.ndarray | None:
+
+        conn = self._conn()
+
+        row = conn.execute(
+            "SELECT bands, rows, cols, data FROM planes "
+            "WHERE content_hash = ? AND version = ?",
+            (content_hash, version),
+        ).fetchone()
+
+        if row is None:
+            metrics.inc_counter(
+                "auroraa_plane_store_misses_total",
+                help_text="Verifications that had to decode the image",
+            )
+            return None
+
+        metrics.inc_counter(
+            "auroraa_plane_store_hits_total",
+            help_text="Verifications served from stored delta planes",
+        )
+
+        conn.execute(
+            "UPDATE planes SET used_at = ? WHERE content_hash = ? AND version = ?",
+            (time.time(), content_hash, version),
+        )
+
+        bands, rows, cols, data = row
+
+        return (
+            np.frombuffer(data, dtype=np.float16)
+            .reshape(bands, rows, cols)
+            .astype(np.float32)
+        )
+
+    def put(self, content_hash: str, version: str, planes: np.ndarray):
+
+        bands, rows, cols = planes.shape
+
+        conn = self._conn()
+
+        conn.execute(
+            "INSERT OR REPLACE INTO planes "
+            "(content_hash, version, bands, rows, cols, data, used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                content_hash,
+                version,
+                bands,
+                rows,
+                cols,
+                planes.astype(np.float16).tobytes(),
+                time.time(),
+            ),
+        )
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY == 1
+
+        if prune:
+            self.prune()
+
+    def prune(self):
+
+        conn = self._conn()
+
+        (count,) = conn.execute("SELECT COUNT(*) FROM planes").fetchone()
+
+        excess = count - self.max_entries
+
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM planes WHERE rowid IN "
+                "(SELECT rowid FROM planes ORDER BY used_at LIMIT ?)",
+                (excess,),
+            )
+
+    def hashes(self, version: str | None = None):
+
+        conn = self._conn()
+
+        if version is None:
+            rows = conn.execute("SELECT content_hash, version FROM planes")
+        else:
+            rows = conn.execute(
+                "SELECT content_hash, version FROM planes WHERE version = ?",
+                (version,),
+            )
+
+        yield from rows
+
+
+plane_store = PlaneStore(PLANE_STORE_PATH, PLANE_STORE_MAX_ENTRIES)
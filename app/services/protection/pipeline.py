@@ -0,0 +1,326 @@
+# pipeline.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.services.cancellation import NEVER, CancelToken
+from app.services.watermark.image.image_config import NATIVE_OUTPUT
+from app.services.watermark.image.image_encoder import (
+    OUTPUT_FORMAT,
+    OUTPUT_PRESET,
+    encode_image,
+    output_format,
+)
+from app.services.watermark.image.image_engine import WatermarkEngine
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+# Stages applied on upload, in order
+PROTECT_STAGES = os.getenv("AURORAA_PROTECT_STAGES", "watermark,metadata")
+
+PIPELINE_THREADS = int(os.getenv("AURORAA_PIPELINE_THREADS", str(min(4, os.cpu_count() or 1))))
+
+# Horizontal strips for tileable stages
+PIPELINE_TILES = int(os.getenv("AURORAA_PIPELINE_TILES", "4"))
+
+
+# --------------------------------
+# Shared frame
+# --------------------------------
+# Every stage works on one decoded uint8 YCrCb frame (TARGET x TARGET),
+# so an upload is decoded and encoded exactly once however many
+# stages run. With native output, the frame's net change is mapped back
+# onto the decoded original at the end. Tags are written into the
+# encoded file.
+
+@dataclass
+class Frame:
+    ycrcb: np.ndarray
+    owner_id: str
+    epoch: str
+    tags: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class ProtectionResult:
+
+    # Encoder buffer (see image_encoder.encode_image)
+    data: bytes | memoryview
+    media_type: str
+
+    # Seconds per stage, plus "decode" and "encode"
+    timings: dict[str, float]
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value (milliseconds).
+        """
+
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}"
+            for name, seconds in self.timings.items()
+        )
+
+
+class Stage:
+    """
+    One protection step. `channels` are the YCrCb channels it writes
+    (empty: pixels untouched); stages writing disjoint channels run
+    concurrently. Tileable stages only depend on the rows they are given
+    and are also split into horizontal strips.
+    """
+
+    name: str = ""
+    channels: tuple[int, ...] = ()
+    tileable: bool = False
+
+    def run(self, frame: Frame, rows: slice):
+        raise NotImplementedError
+
+
+# --------------------------------
+# Pipeline
+# --------------------------------
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=PIPELINE_THREADS,
+            thread_name_prefix="protect",
+        )
+
+    return _executor
+
+
+def _groups(stages: list[Stage]) -> list[list[Stage]]:
+    """
+    Consecutive stages with pairwise disjoint channels.
+    """
+
+    groups = []
+    used: set[int] = set()
+
+    for stage in stages:
+
+        if groups and not used & set(stage.channels):
+            groups[-1].append(stage)
+        else:
+            groups.append([stage])
+            used = set()
+
+        used |= set(stage.channels)
+
+    return groups
+
+
+def _strips(height: int, tiles: int) -> list[slice]:
+
+    bounds = np.linspace(0, height, max(1, tiles) + 1).astype(int)
+
+    return [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+class Pipeline:
+
+    def __init__(
+        self,
+        engine: WatermarkEngine,
+        stages: list[Stage],
+        tiles: int = PIPELINE_TILES,
+        native: bool = NATIVE_OUTPUT,
+        output: str = OUTPUT_FORMAT,
+        preset: str = OUTPUT_PRESET,
+    ):
+
+        # The engine defines the working frame (size, colour space)
+        self.engine = engine
+        self.stages = stages
+        self.tiles = tiles
+        self.native = native
+        self.output = output
+        self.preset = preset
+
+    def _run_group(self, group: list[Stage], frame: Frame, timings: dict):
+
+        tasks = []
+
+        for stage in group:
+
+            if stage.tileable and self.tiles > 1:
+                rows = _strips(frame.ycrcb.shape[0], self.tiles)
+            else:
+                rows = [slice(None)]
+
+            tasks.extend((stage, r) for r in rows)
+
+        def timed(stage, rows):
+            start = time.perf_counter()
+            stage.run(frame, rows)
+            return stage.name, start, time.perf_counter()
+
+        if len(tasks) == 1:
+            results = [timed(*tasks[0])]
+        else:
+            executor = _get_executor()
+            results = [f.result() for f in [executor.submit(timed, *t) for t in tasks]]
+
+        # Wall time per stage across its tiles
+        spans: dict[str, list[float]] = {}
+
+        for name, start, end in results:
+            span = spans.setdefault(name, [start, end])
+            span[0] = min(span[0], start)
+            span[1] = max(span[1], end)
+
+        for name, (start, end) in spans.items():
+            timings[name] = end - start
+
+    def run_frame(self, frame: Frame, cancel: CancelToken = NEVER) -> dict[str, float]:
+
+        timings: dict[str, float] = {}
+
+        for group in _groups(self.stages):
+            cancel.check()
+            self._run_group(group, frame, timings)
+
+        return timings
+
+    def run_array(
+        self,
+        img: np.ndarray,
+        owner_id: str,
+        epoch: str,
+        tags: dict[str, str] | None = None,
+        cancel: CancelToken = NEVER,
+    ) -> tuple[np.ndarray, Frame, dict[str, float]]:
+        """
+        uint8 BGR in, protected uint8 BGR out (no codec work), at the
+        input's size with native output.
+        """
+
+        import cv2
+
+        frame = Frame(self.engine.to_frame(img), owner_id, epoch, dict(tags or {}))
+
+        native = self.native and img.shape[:2] != frame.ycrcb.shape[:2]
+
+        before = frame.ycrcb.copy() if native else None
+
+        timings = self.run_frame(frame, cancel)
+
+        if not native:
+            return cv2.cvtColor(frame.ycrcb, cv2.COLOR_YCrCb2BGR), frame, timings
+
+        from app.services.watermark.image.image_embedder import restore_resolution
+
+        cancel.check()
+
+        start = time.perf_counter()
+
+        out = restore_resolution(img, before, frame.ycrcb)
+
+        timings["native"] = time.perf_counter() - start
+
+        return out, frame, timings
+
+    def run(
+        self,
+        image_bytes: bytes,
+        owner_id: str,
+        epoch: str,
+        tags: dict[str, str] | None = None,
+        cancel: CancelToken = NEVER,
+    ) -> ProtectionResult:
+        """
+        Decode, run the stages and encode. `cancel` is checked between
+        stages; a cancelled run raises Cancelled.
+        """
+
+        import cv2
+
+        start = time.perf_counter()
+
+        img = cv2.imdecode(
+            np.frombuffer(image_bytes, np.uint8),
+            cv2.IMREAD_COLOR
+        )
+
+        if img is None:
+            raise ValueError("Invalid image")
+
+        decoded = time.perf_counter()
+
+        out, frame, stage_timings = self.run_array(img, owner_id, epoch, tags, cancel)
+
+        cancel.check()
+
+        encode_start = time.perf_counter()
+
+        encoded = encode_image(
+            out,
+            output_format(image_bytes, self.output),
+            self.preset,
+            frame.tags,
+        )
+
+        return ProtectionResult(
+            data=encoded.data,
+            media_type=encoded.media_type,
+            timings={
+                "decode": decoded - start,
+                **stage_timings,
+                "encode": time.perf_counter() - encode_start,
+            },
+        )
+
+
+# --------------------------------
+# Upload pipeline per engine
+# --------------------------------
+
+_pipelines: dict[str, Pipeline] = {}
+
+
+def supports_frames(engine: WatermarkEngine) -> bool:
+    return type(engine).embed_ycrcb is not WatermarkEngine.embed_ycrcb
+
+
+def get_pipeline(engine: WatermarkEngine) -> Pipeline | None:
+    """
+    The configured stages around this engine's watermark, or None if the
+    engine cannot work on a shared frame (callers fall back to embed()).
+    """
+
+    if not supports_frames(engine):
+        return None
+
+    pipeline = _pipelines.get(engine.version)
+
+    if pipeline is None:
+
+        from .stages import make_stage
+
+        pipeline = Pipeline(
+            engine,
+            [
+                make_stage(name.strip(), engine)
+                for name in PROTECT_STAGES.split(",")
+                if name.strip()
+            ],
+        )
+
+        _pipelines[engine.version] = pipeline
+
+    return pipeline
@@ -0,0 +1,122 @@
+# stages.py
+
+import hashlib
+import hmac
+import os
+
+import cv2
+import numpy as np
+
+from app.services.watermark.image.image_crypto import load_secret
+from app.services.watermark.image.image_engine import WatermarkEngine
+
+from .pipeline import Frame, Stage
+
+# Peak chroma offset of the cloak, in 8-bit levels
+CLOAK_STRENGTH = float(os.getenv("AURORAA_CLOAK_STRENGTH", "2.0"))
+
+# Cloak noise is drawn on a grid this many pixels apart, then smoothed
+CLOAK_CELL = 8
+
+# Plaintext owner/epoch tags expose the account ID to anyone holding
+# the file and tell a stripper what to remove; off unless asked for
+METADATA_OWNER_TAGS = os.getenv("AURORAA_METADATA_OWNER_TAGS", "0") != "0"
+
+
+class WatermarkStage(Stage):
+    """
+    Owner/epoch watermark from a registered engine, in place on the frame.
+    """
+
+    name = "watermark"
+
+    def __init__(self, engine: WatermarkEngine):
+
+        self.engine = engine
+        self.channels = tuple(engine.frame_channels)
+
+    def run(self, frame: Frame, rows: slice):
+
+        self.engine.embed_ycrcb(frame.ycrcb, frame.owner_id, frame.epoch)
+
+        frame.tags.setdefault("algorithm", self.engine.version)
+
+
+class CloakStage(Stage):
+    """
+    Keyed low-frequency chroma perturbation. Chroma only, so it runs
+    alongside the (luma) watermark and does not disturb its signal.
+    Deterministic per owner, epoch and strip.
+    """
+
+    name = "cloak"
+    channels = (1, 2)
+    tileable = True
+
+    def __init__(self, strength: float = CLOAK_STRENGTH):
+        self.strength = strength
+
+    def _rng(self, frame: Frame, start: int) -> np.random.Generator:
+
+        digest = hmac.new(
+            load_secret(),
+            f"CLOAK|{frame.owner_id}|{frame.epoch}|{start}".encode(),
+            hashlib.sha256
+        ).digest()
+
+        return np.random.default_rng(int.from_bytes(digest[:8], "big"))
+
+    def run(self, frame: Frame, rows: slice):
+
+        strip = frame.ycrcb[rows, :, 1:]
+
+        h, w = strip.shape[:2]
+
+        if h == 0:
+            return
+
+        start = rows.start or 0
+
+        grid = self._rng(frame, start).uniform(
+            -self.strength,
+            self.strength,
+            (max(1, h // CLOAK_CELL), max(1, w // CLOAK_CELL), 2),
+        ).astype(np.float32)
+
+        noise = cv2.resize(grid, (w, h), interpolation=cv2.INTER_CUBIC)
+
+        frame.ycrcb[rows, :, 1:] = np.clip(
+            strip.astype(np.float32) + noise,
+            0,
+            255
+        ).astype(np.uint8)
+
+
+class MetadataStage(Stage):
+    """
+    Provenance tags, written by the encoder as a JPEG comment. By
+    default only the watermark id and algorithm set by the route and
+    the watermark stage; owner and epoch with METADATA_OWNER_TAGS.
+    """
+
+    name = "metadata"
+
+    def run(self, frame: Frame, rows: slice):
+
+        if METADATA_OWNER_TAGS:
+            frame.tags.setdefault("owner", frame.owner_id)
+            frame.tags.setdefault("epoch", frame.epoch)
+
+
+def make_stage(name: str, engine: WatermarkEngine) -> Stage:
+
+    if name == "watermark":
+        return WatermarkStage(engine)
+
+    if name == "cloak":
+        return CloakStage()
+
+    if name == "metadata":
+        return MetadataStage()
+
+    raise ValueError(f"Unknown protection stage {name!r}")
@@ -0,0 +1,266 @@
+# ratelimit.py
+
+import asyncio
+import math
+import os
+import time
+
+from app.services import metrics
+from app.services.watermark.image.image_config import TARGET
+from app.services.watermark.image.image_header import probe_image
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+# redis://... for shared buckets across replicas, memory:// for local only
+RATELIMIT_BACKEND_URL = os.getenv("AURORAA_RATELIMIT_URL", "memory://")
+
+# Budgets are in CPU units: one unit = one decode/DWT/DCT pass at TARGET
+RATELIMIT_BUDGETS = {
+    "upload": (
+        float(os.getenv("AURORAA_RATELIMIT_UPLOAD_CAPACITY", "60")),
+        float(os.getenv("AURORAA_RATELIMIT_UPLOAD_REFILL", "1.0")),
+    ),
+    "verify": (
+        float(os.getenv("AURORAA_RATELIMIT_VERIFY_CAPACITY", "120")),
+        float(os.getenv("AURORAA_RATELIMIT_VERIFY_REFILL", "2.0")),
+    ),
+    # Charged per archive MB
+    "audit": (
+        float(os.getenv("AURORAA_RATELIMIT_AUDIT_CAPACITY", "512")),
+        float(os.getenv("AURORAA_RATELIMIT_AUDIT_REFILL", "0.5")),
+    ),
+}
+
+# Idle buckets are pruned once the in-memory table grows past this
+MEMORY_BACKEND_MAX_KEYS = 100_000
+
+
+# --------------------------------
+# Errors
+# --------------------------------
+
+class RateLimited(Exception):
+
+    def __init__(self, detail: str, headers: dict):
+
+        super().__init__(detail)
+
+        self.detail = detail
+        self.status_code = 429
+        self.headers = headers
+
+
+# --------------------------------
+# Cost model
+# --------------------------------
+
+def estimate_cpu_cost(image_bytes: bytes, passes: int = 1) -> float:
+    """
+    CPU units for `passes` full decode/transform passes over this image.
+    The decode scales with source pixels, the transform is at TARGET.
+    """
+
+    probed = probe_image(image_bytes)
+
+    if probed is None:
+        source_ratio = 1.0
+    else:
+        _, w, h = probed
+        source_ratio = (w * h) / (TARGET * TARGET)
+
+    return passes * (1.0 + source_ratio)
+
+
+# --------------------------------
+# Backends
+# --------------------------------
+
+class MemoryBackend:
+    """
+    Token buckets held in this process.
+    """
+
+    def __init__(self, max_keys: int = MEMORY_BACKEND_MAX_KEYS):
+
+        self.max_keys = max_keys
+
+        # key -> (tokens, last update, time the bucket is full again)
+        self._buckets: dict[str, tuple[float, float, float]] = {}
+        self._lock = asyncio.Lock()
+        self._pruned_at = float("-inf")
+
+    def _prune(self, now: float):
+
+        # At most once a second (or at twice the cap): at peak every
+        # take() would otherwise rebuild the dict under the lock
+        if now - self._pruned_at < 1.0 and len(self._buckets) < 2 * self.max_keys:
+            return
+
+        self._pruned_at = now
+
+        # A bucket that has refilled is the same as no bucket at all.
+        # Each one carries its own refill time, so routes with slow
+        # refill (audit) are not dropped early by fast ones.
+        self._buckets = {
+            k: v for k, v in self._buckets.items()
+            if now < v[2]
+        }
+
+        # Still over the cap: drop the buckets closest to full, which
+        # forgives the least
+        if len(self._buckets) > self.max_keys:
+            keep = sorted(
+                self._buckets.items(),
+                key=lambda kv: kv[1][2],
+                reverse=True,
+            )[:self.max_keys]
+            self._buckets = dict(keep)
+
+    async def take(self, key: str, cost: float, capacity: float, rate: float):
+
+        async with self._lock:
+
+            now = time.monotonic()
+
+            tokens, ts, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+
+            allowed = tokens >= cost
+
+            if allowed:
+                tokens -= cost
+
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+
+            return allowed, tokens
+
+
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """
+    Token buckets shared across replicas, updated atomically in Lua.
+    """
+
+    def __init__(self, url: str, prefix: str = "auroraa:rl:"):
+
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, cost: float, capacity: float, rate: float):
+
+        allowed, tokens = await self._script(
+            keys=[self.prefix + key],
+            args=[capacity, rate, cost],
+        )
+
+        return bool(allowed), float(tokens)
+
+
+def make_backend(url: str):
+
+    if url.startswith(("redis://", "rediss://", "unix://")):
+
+        try:
+            return RedisBackend(url)
+        except ImportError:
+            print("redis package not installed – falling back to in-memory rate limiting")
+
+    return MemoryBackend()
+
+
+# --------------------------------
+# Rate limiter
+# --------------------------------
+
+class RateLimiter:
+
+    def __init__(self, backend, budgets: dict[str, tuple[float, float]]):
+
+        self.backend = backend
+        self.budgets = budgets
+
+    async def charge(self, route: str, owner_id: str, cost: float) -> dict:
+        """
+        Charge `cost` units to the owner's bucket for `route`.
+        Returns rate-limit headers, raises RateLimited when exhausted.
+        """
+
+        capacity, rate = self.budgets[route]
+
+        # Oversized requests are admitted when the bucket is full
+        cost = min(cost, capacity)
+
+        allowed, tokens = await self.backend.take(
+            f"{route}:{owner_id}",
+            cost,
+            capacity,
+            rate,
+        )
+
+        headers = {
+            "RateLimit-Limit": str(int(capacity)),
+            "RateLimit-Remaining": str(max(0, int(tokens))),
+            "RateLimit-Reset": str(math.ceil((capacity - tokens) / rate)),
+        }
+
+        if not allowed:
+
+            metrics.inc_counter(
+                "auroraa_ratelimit_rejected_total",
+                labels={"route": route},
+                help_text="Requests rejected by per-owner rate limiting",
+            )
+
+            headers["Retry-After"] = str(math.ceil((cost - tokens) / rate))
+
+            raise RateLimited("Rate limit exceeded", headers)
+
+        metrics.inc_counter(
+            "auroraa_ratelimit_charged_units_total",
+            cost,
+            labels={"route": route},
+            help_text="CPU units charged to owner rate-limit buckets",
+        )
+
+        return headers
+
+
+rate_limiter = RateLimiter(
+    make_backend(RATELIMIT_BACKEND_URL),
+    RATELIMIT_BUDGETS,
+)
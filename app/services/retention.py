@@ -0,0 +1,358 @@
+# retention.py
+
+import os
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert, or_, select, text
+
+from app.services import metrics
+from app.services.owner_epochs import VERIFY_EPOCH_WINDOW
+from app.services.watermark.image.image_config import (
+    current_epoch,
+    epoch_bounds,
+    previous_epochs,
+)
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+# Quarters kept hot. Verification never looks past its epoch window, so
+# older rows are only needed for listing/export, which read the archive
+# alongside the hot table.
+RETENTION_QUARTERS = int(os.getenv("AURORAA_RETENTION_QUARTERS", str(VERIFY_EPOCH_WINDOW)))
+
+# Rows moved per transaction
+ARCHIVE_BATCH_SIZE = int(os.getenv("AURORAA_ARCHIVE_BATCH_SIZE", "2000"))
+
+# Future quarterly partitions kept ready ahead of time (MySQL)
+PARTITIONS_AHEAD = int(os.getenv("AURORAA_PARTITIONS_AHEAD", "2"))
+
+# In-app schedule; 0 disables (use `python -m app.cli.retention` from cron)
+RETENTION_INTERVAL_MINUTES = float(os.getenv("AURORAA_RETENTION_INTERVAL_MINUTES", "0"))
+
+# Cross-worker mutex (MySQL GET_LOCK)
+_LOCK_NAME = "auroraa_retention"
+
+
+# --------------------------------
+# Quarterly partitions (MySQL)
+# --------------------------------
+# watermarks is RANGE COLUMNS(created_at) partitioned per quarter, named
+# pYYYYqN, with a trailing pmax catch-all. Partitions for coming quarters
+# are split off pmax before rows arrive; quarters past retention are
+# dropped once archived.
+
+def partition_name(epoch: str) -> str:
+    return "p" + epoch.replace("-Q", "q")
+
+
+def partition_epoch(name: str) -> str | None:
+
+    if not name.startswith("p") or "q" not in name:
+        return None
+
+    year, quarter = name[1:].split("q")
+
+    return f"{year}-Q{quarter}"
+
+
+def next_epoch(epoch: str) -> str:
+
+    _, end = epoch_bounds(epoch)
+
+    return f"{end.year}-Q{(end.month - 1) // 3 + 1}"
+
+
+def _is_partitioned(conn) -> bool:
+
+    if conn.dialect.name != "mysql":
+        return False
+
+    return bool(_partitions(conn))
+
+
+def _partitions(conn) -> list[str]:
+
+    rows = conn.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'watermarks' "
+        "AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ))
+
+    return [r[0] for r in rows]
+
+
+def ensure_partitions(conn, ahead: int = PARTITIONS_AHEAD) -> list[str]:
+    """
+    Split upcoming quarters off pmax. Returns the partitions added.
+    """
+
+    if not _is_partitioned(conn):
+        return []
+
+    existing = {partition_epoch(p) for p in _partitions(conn)} - {None}
+
+    epoch = current_epoch()
+    wanted = []
+
+    for _ in range(ahead + 1):
+        if epoch not in existing:
+            wanted.append(epoch)
+        epoch = next_epoch(epoch)
+
+    # Only quarters after the newest existing partition can come off pmax
+    newest = max(existing) if existing else None
+    wanted = [e for e in wanted if newest is None or e > newest]
+
+    if not wanted:
+        return []
+
+    parts = ", ".join(
+        f"PARTITION {partition_name(e)} VALUES LESS THAN "
+        f"('{epoch_bounds(e)[1]:%Y-%m-%d %H:%M:%S}')"
+        for e in wanted
+    )
+
+    conn.execute(text(
+        "ALTER TABLE watermarks REORGANIZE PARTITION pmax INTO "
+        f"({parts}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+    ))
+
+    return [partition_name(e) for e in wanted]
+
+
+def drop_archived_partitions(conn, cutoff: datetime) -> list[str]:
+    """
+    Drop quarters that end on or before `cutoff` and hold no rows.
+    """
+
+    if not _is_partitioned(conn):
+        return []
+
+    dropped = []
+
+    for name in _partitions(conn):
+
+        epoch = partition_epoch(name)
+
+        if epoch is None or epoch_bounds(epoch)[1].replace(tzinfo=None) > cutoff:
+            continue
+
+        empty = conn.execute(text(
+            f"SELECT NOT EXISTS (SELECT 1 FROM watermarks PARTITION ({name}))"
+        )).scalar()
+
+        if empty:
+            conn.execute(text(f"ALTER TABLE watermarks DROP PARTITION {name}"))
+            dropped.append(name)
+
+    return dropped
+
+
+# --------------------------------
+# Archival
+# --------------------------------
+
+def retention_cutoff(quarters: int = RETENTION_QUARTERS) -> datetime:
+    """
+    Start of the oldest retained quarter (naive UTC, as stored).
+    """
+
+    return epoch_bounds(previous_epochs(quarters)[-1])[0].replace(tzinfo=None)
+
+
+def archive_batch(db, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Move one batch of revoked or expired rows to watermarks_archive.
+    Returns the number of rows moved.
+    """
+
+    from app.models.models import Watermark, WatermarkArchive
+
+    columns = [
+        "id",
+        "owner_id",
+        "content_type",
+        "mime_type",
+        "content_hash",
+        "phash",
+        "epoch",
+        "algorithm_version",
+        "status",
+        "created_at",
+    ]
+
+    ids = db.execute(
+        select(Watermark.id)
+        .where(or_(
+            Watermark.status != "active",
+            Watermark.created_at < cutoff,
+        ))
+        .limit(batch_size)
+    ).scalars().all()
+
+    if not ids:
+        return 0
+
+    try:
+        db.execute(
+            insert(WatermarkArchive).from_select(
+                columns,
+                select(*(getattr(Watermark, c) for c in columns))
+                .where(Watermark.id.in_(ids)),
+            )
+        )
+
+        db.execute(delete(Watermark).where(Watermark.id.in_(ids)))
+
+        db.commit()
+
+    except Exception:
+        db.rollback()
+        raise
+
+    return len(ids)
+
+
+def run_retention(
+    db,
+    quarters: int = RETENTION_QUARTERS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: int | None = None,
+) -> dict:
+    """
+    One retention pass: archive, drop emptied quarters, pre-create
+    upcoming ones.
+    """
+
+    cutoff = retention_cutoff(quarters)
+
+    archived = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+
+        moved = archive_batch(db, cutoff, batch_size)
+
+        if not moved:
+            break
+
+        archived += moved
+        batches += 1
+
+    conn = db.connection()
+
+    dropped = drop_archived_partitions(conn, cutoff)
+    added = ensure_partitions(conn)
+
+    db.commit()
+
+    metrics.inc_counter(
+        "auroraa_retention_archived_rows_total",
+        archived,
+        help_text="Watermark rows moved to watermarks_archive",
+    )
+
+    return {
+        "cutoff": cutoff.isoformat(),
+        "archived": archived,
+        "partitions_dropped": dropped,
+        "partitions_added": added,
+    }
+
+
+# --------------------------------
+# Scheduling
+# --------------------------------
+
+def run_retention_locked(**kwargs) -> dict | None:
+    """
+    run_retention in a fresh session, skipped (None) when another worker
+    or host already holds the retention lock.
+    """
+
+    from app.database.database import get_engine, SessionLocal
+
+    get_engine()
+
+    db = SessionLocal()
+
+    mysql = db.bind.dialect.name == "mysql"
+
+    try:
+        if mysql and not db.execute(
+            text("SELECT GET_LOCK(:name, 0)"), {"name": _LOCK_NAME}
+        ).scalar():
+            return None
+
+        try:
+            return run_retention(db, **kwargs)
+
+        finally:
+            if mysql:
+                db.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": _LOCK_NAME})
+
+    finally:
+        db.close()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_retention_scheduler():
+    """
+    Run retention every RETENTION_INTERVAL_MINUTES in this process
+    (no-op when disabled). Safe to call from every worker.
+    """
+
+    global _scheduler
+
+    if RETENTION_INTERVAL_MINUTES <= 0:
+        return
+
+    with _scheduler_lock:
+
+        if _scheduler is not None:
+            return
+
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        _scheduler = BackgroundScheduler(daemon=True)
+
+        _scheduler.add_job(
+            _scheduled_run,
+            "interval",
+            minutes=RETENTION_INTERVAL_MINUTES,
+            next_run_time=datetime.now(timezone.utc),
+            max_instances=1,
+            coalesce=True,
+        )
+
+        _scheduler.start()
+
+
+def stop_retention_scheduler():
+
+    global _scheduler
+
+    with _scheduler_lock:
+
+        if _scheduler is not None:
+            _scheduler.shutdown(wait=False)
+            _scheduler = None
+
+
+def _scheduled_run():
+
+    try:
+        result = run_retention_locked()
+    except Exception as e:
+        print("Retention run failed:", e)
+        return
+
+    if result is not None:
+        print("Retention:", result)
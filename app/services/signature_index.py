@@ -0,0 +1,468 @@
+# signature_index.py
+
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services import metrics
+from app.services.owner_epochs import VERIFY_EPOCH_WINDOW
+from app.services.watermark.image.image_config import epoch_bounds, previous_epochs
+from app.services.watermark.image.image_crypto import (
+    SIGNAL_WORDS,
+    pack_signal_bits,
+    signal_words,
+)
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+# Owners per epoch that get the full correlation after the popcount pass
+SIGNATURE_SHORTLIST = int(os.getenv("AURORAA_SIGNATURE_SHORTLIST", "16"))
+
+# Optional directory of per-epoch snapshots, memory-mapped on load so
+# workers share the pages and start without re-deriving signatures
+SIGNATURE_INDEX_DIR = os.getenv("AURORAA_SIGNATURE_INDEX_DIR")
+
+# How often rows written by other workers are picked up
+SIGNATURE_REFRESH_SECONDS = float(os.getenv("AURORAA_SIGNATURE_REFRESH_SECONDS", "30"))
+
+# Rows are stamped before the embed and committed after it, so a refresh
+# re-reads this far behind the newest created_at it has seen
+SIGNATURE_REFRESH_OVERLAP_SECONDS = float(
+    os.getenv("AURORAA_SIGNATURE_REFRESH_OVERLAP_SECONDS", "600")
+)
+
+# Whether /identify names owners other than the caller; otherwise only
+# the "admin" role sees them, everyone else gets a match flag
+IDENTIFY_REVEAL_OWNERS = os.getenv("AURORAA_IDENTIFY_REVEAL_OWNERS", "0") != "0"
+
+SIGNAL_BITS = SIGNAL_WORDS * 64
+
+# Snapshot once this many signatures were added since the last one
+_SNAPSHOT_EVERY = 4096
+
+
+# --------------------------------
+# Snapshot files
+# --------------------------------
+# The snapshot directory is shared by every worker. Writers hold an
+# exclusive lock on it and write under unique temporary names; readers
+# take it shared, so a words/ids pair is never read half-replaced.
+
+@contextmanager
+def _directory_lock(directory: str, shared: bool = False):
+
+    with open(os.path.join(directory, ".lock"), "a") as f:
+
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _temp_path(path: str) -> str:
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+
+
+# --------------------------------
+# Packed signatures
+# --------------------------------
+# Each owner's signal for an epoch is SIGNAL_BITS keyed bits; stored
+# packed as uint64 words, one contiguous array per word. A query is the
+# image's decoded signal thresholded to bits: XOR-popcount against every
+# row gives the Hamming distance (bit errors), and only the nearest
+# SIGNATURE_SHORTLIST owners are scored with the full correlation.
+# ~4 ms per epoch at 1M owners, single core.
+#
+# Rows are a read-only base (memory-mapped snapshot, if any) plus an
+# in-memory tail grown by doubling; ids are append-only.
+
+class EpochSignatures:
+    """
+    Packed signatures of every owner with searchable watermarks in one
+    epoch.
+    """
+
+    def __init__(self, epoch: str):
+
+        self.epoch = epoch
+
+        self.ids: list[str] = []
+
+        self._known: set[str] = set()
+        self._lock = threading.Lock()
+
+        # (SIGNAL_WORDS, n) base and (SIGNAL_WORDS, capacity) tail
+        self._base = np.zeros((SIGNAL_WORDS, 0), dtype=np.uint64)
+        self._tail = np.zeros((SIGNAL_WORDS, 1024), dtype=np.uint64)
+
+        self.added_since_snapshot = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add_many(self, owner_ids: list[str]):
+
+        with self._lock:
+            new = [o for o in dict.fromkeys(owner_ids) if o not in self._known]
+
+        if not new:
+            return
+
+        words = np.stack([signal_words(o, self.epoch) for o in new], axis=1)
+
+        with self._lock:
+
+            keep = [i for i, o in enumerate(new) if o not in self._known]
+
+            start = len(self.ids) - self._base.shape[1]
+            end = start + len(keep)
+
+            if end > self._tail.shape[1]:
+                grown = np.zeros((SIGNAL_WORDS, max(end, 2 * self._tail.shape[1])), dtype=np.uint64)
+                grown[:, :start] = self._tail[:, :start]
+                self._tail = grown
+
+            self._tail[:, start:end] = words[:, keep]
+
+            for i in keep:
+                self._known.add(new[i])
+                self.ids.append(new[i])
+
+            self.added_since_snapshot += len(keep)
+
+    def add(self, owner_id: str):
+        self.add_many([owner_id])
+
+    def _distances(self, words: np.ndarray, query: np.ndarray) -> np.ndarray:
+
+        d = np.bitwise_count(words[0] ^ query[0])
+
+        for w in range(1, SIGNAL_WORDS):
+            d += np.bitwise_count(words[w] ^ query[w])
+
+        return d
+
+    def search(self, query: np.ndarray, k: int = SIGNATURE_SHORTLIST) -> list[tuple[int, str]]:
+        """
+        (bit distance, owner id) of the k nearest signatures to the
+        packed query, nearest first.
+        """
+
+        with self._lock:
+            base = self._base
+            tail = self._tail[:, :len(self.ids) - base.shape[1]]
+
+        n = base.shape[1] + tail.shape[1]
+
+        if n == 0 or k <= 0:
+            return []
+
+        query = np.asarray(query, dtype=np.uint64)
+
+        d = np.concatenate([self._distances(base, query), self._distances(tail, query)])
+
+        # Smallest distance with at least k rows at or below it
+        counts = np.cumsum(np.bincount(d, minlength=SIGNAL_BITS + 1))
+        threshold = int(np.searchsorted(counts, min(k, n)))
+
+        candidates = np.flatnonzero(d <= threshold)
+        candidates = candidates[np.argsort(d[candidates], kind="stable")[:k]]
+
+        return [(int(d[i]), self.ids[i]) for i in candidates]
+
+    # -----------------------------
+    # Snapshots
+    # -----------------------------
+
+    def save(self, directory: str):
+        """
+        Write base + tail and re-open it memory-mapped as the new base.
+        """
+
+        with self._lock:
+
+            n = len(self.ids)
+
+            words = np.concatenate(
+                [self._base, self._tail[:, :n - self._base.shape[1]]],
+                axis=1,
+            )
+            ids = list(self.ids)
+
+        words_path = os.path.join(directory, f"{self.epoch}.words.npy")
+        ids_path = os.path.join(directory, f"{self.epoch}.ids")
+
+        words_tmp = _temp_path(words_path)
+        ids_tmp = _temp_path(ids_path)
+
+        # Written aside and renamed; load() also rejects a torn pair by length
+        with open(words_tmp, "wb") as f:
+            np.save(f, words)
+        with open(ids_tmp, "w") as f:
+            f.write("\n".join(ids))
+
+        with _directory_lock(directory):
+
+            os.replace(ids_tmp, ids_path)
+            os.replace(words_tmp, words_path)
+
+            base = np.load(words_path, mmap_mode="r")
+
+        with self._lock:
+
+            # Rows added meanwhile move to the front of a fresh tail
+            extra = self._tail[:, n - self._base.shape[1]:len(self.ids) - self._base.shape[1]]
+
+            tail = np.zeros((SIGNAL_WORDS, max(1024, extra.shape[1])), dtype=np.uint64)
+            tail[:, :extra.shape[1]] = extra
+
+            self._base = base
+            self._tail = tail
+
+            self.added_since_snapshot = len(self.ids) - n
+
+    @classmethod
+    def load(cls, directory: str, epoch: str) -> "EpochSignatures | None":
+
+        words_path = os.path.join(directory, f"{epoch}.words.npy")
+        ids_path = os.path.join(directory, f"{epoch}.ids")
+
+        try:
+            with _directory_lock(directory, shared=True):
+
+                words = np.load(words_path, mmap_mode="r")
+                with open(ids_path) as f:
+                    ids = f.read().split("\n") if os.path.getsize(ids_path) else []
+
+        except (OSError, ValueError):
+            return None
+
+        if words.shape != (SIGNAL_WORDS, len(ids)):
+            return None
+
+        index = cls(epoch)
+
+        index._base = words
+        index.ids = ids
+        index._known = set(ids)
+
+        return index
+
+
+# --------------------------------
+# All epochs
+# --------------------------------
+
+class SignatureIndexes:
+    """
+    EpochSignatures per epoch, filled from the watermarks table and
+    topped up by new uploads.
+    """
+
+    def __init__(self, directory: str | None, refresh_seconds: float):
+
+        self.directory = directory
+        self.refresh_seconds = refresh_seconds
+
+        self._epochs: dict[str, EpochSignatures] = {}
+        self._lock = threading.Lock()
+
+        # One refresh at a time; the others wait and then find it fresh
+        self._refresh_lock = threading.Lock()
+
+        # Newest created_at loaded from the database
+        self.loaded_until: datetime | None = None
+        self.refreshed_at = 0.0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_meta()
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _load_meta(self):
+
+        try:
+            with open(self._meta_path()) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        epochs = {}
+
+        for epoch in meta.get("epochs", []):
+
+            index = EpochSignatures.load(self.directory, epoch)
+
+            # Any missing or torn snapshot: reload everything from the DB
+            if index is None:
+                return
+
+            epochs[epoch] = index
+
+        self._epochs = epochs
+
+        if meta.get("loaded_until"):
+            self.loaded_until = datetime.fromisoformat(meta["loaded_until"])
+
+    def _save(self):
+
+        for index in list(self._epochs.values()):
+            if index.added_since_snapshot:
+                index.save(self.directory)
+
+        meta = {
+            "epochs": sorted(self._epochs),
+            "loaded_until": self.loaded_until.isoformat() if self.loaded_until else None,
+        }
+
+        tmp = _temp_path(self._meta_path())
+
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+
+        with _directory_lock(self.directory):
+            os.replace(tmp, self._meta_path())
+
+    def _epoch(self, epoch: str) -> EpochSignatures:
+
+        with self._lock:
+
+            index = self._epochs.get(epoch)
+
+            if index is None:
+                index = EpochSignatures(epoch)
+                self._epochs[epoch] = index
+
+            return index
+
+    def refresh(self, db, versions: list[str]):
+        """
+        Pick up (owner, epoch) pairs of these versions written since the
+        last refresh. Blocking; run off the event loop.
+        """
+
+        with self._refresh_lock:
+            self._refresh(db, versions)
+
+    def _refresh(self, db, versions: list[str]):
+
+        from app.crud.watermark_crud import active_owner_epochs
+
+        now = time.monotonic()
+
+        if now - self.refreshed_at < self.refresh_seconds:
+            return
+
+        if self.loaded_until is None:
+            since = epoch_bounds(previous_epochs(VERIFY_EPOCH_WINDOW)[-1])[0]
+        else:
+            # Late commits carry an older created_at; already loaded
+            # owners are skipped by add_many
+            since = self.loaded_until - timedelta(seconds=SIGNATURE_REFRESH_OVERLAP_SECONDS)
+
+        by_epoch: dict[str, list[str]] = {}
+
+        for owner_id, epoch, created_at in active_owner_epochs(db, versions, since):
+
+            by_epoch.setdefault(epoch, []).append(owner_id)
+
+            if created_at is not None and (
+                self.loaded_until is None or created_at > self.loaded_until
+            ):
+                self.loaded_until = created_at
+
+        for epoch, owner_ids in by_epoch.items():
+            self._epoch(epoch).add_many(owner_ids)
+
+        self.refreshed_at = now
+
+        if self.directory and any(
+            index.added_since_snapshot >= _SNAPSHOT_EVERY
+            for index in list(self._epochs.values())
+        ):
+            self._save()
+
+        metrics.set_gauge(
+            "auroraa_signature_index_entries",
+            sum(len(index) for index in list(self._epochs.values())),
+            help_text="Owner signatures held by the signature index",
+        )
+
+    def add(self, owner_id: str, epoch: str):
+        self._epoch(epoch).add(owner_id)
+
+    def identify(self, engine, planes: np.ndarray | None, epochs: list[str]) -> dict | None:
+        """
+        Best owner for an image's planes across epochs: popcount
+        shortlist per epoch, then the verifier's correlation on the
+        shortlisted owners only. None when nothing correlated.
+        """
+
+        from app.services.watermark.image.image_verifier import (
+            calibrate,
+            decode_signal,
+            score_deltas,
+        )
+
+        if planes is None:
+            return None
+
+        start = time.perf_counter()
+
+        best = None
+
+        # Owners the best match was chosen among
+        searched = 0
+
+        for epoch in epochs:
+
+            index = self._epochs.get(epoch)
+
+            if not index:
+                continue
+
+            searched += len(index)
+
+            observed = engine.gather_planes(planes, epoch)
+
+            decoded = decode_signal(observed) if observed is not None else None
+
+            if decoded is None or len(decoded) < SIGNAL_BITS:
+                continue
+
+            decoded = decoded[:SIGNAL_BITS]
+
+            query = pack_signal_bits(decoded > decoded.mean())
+
+            for _, owner_id in index.search(query):
+
+                raw = score_deltas(observed, owner_id, epoch)
+
+                if raw["confidence"] > (best["confidence"] if best else 0.0):
+                    best = raw
+
+        best = calibrate(best, planes, searched)
+
+        metrics.inc_counter(
+            "auroraa_signature_search_seconds_total",
+            time.perf_counter() - start,
+            help_text="Time spent identifying owners through the signature index",
+        )
+
+        return best
+
+
+signature_indexes = SignatureIndexes(SIGNATURE_INDEX_DIR, SIGNATURE_REFRESH_SECONDS)
@@ -0,0 +1,184 @@
+# verify_batcher.py
+
+import asyncio
+import math
+import os
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.services import metrics
+from app.services.watermark.image.image_engine import WatermarkEngine
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+VERIFY_BATCHING = os.getenv("AURORAA_VERIFY_BATCHING", "1") != "0"
+
+# Upper bounds; the effective size and wait adapt to the arrival rate
+VERIFY_BATCH_MAX = int(os.getenv("AURORAA_VERIFY_BATCH_MAX", "16"))
+VERIFY_BATCH_WINDOW_MS = float(os.getenv("AURORAA_VERIFY_BATCH_WINDOW_MS", "5"))
+
+# Smoothing of the arrival-rate and batch-time estimates
+_EWMA = 0.2
+
+
+# --------------------------------
+# Dynamic micro-batching
+# --------------------------------
+# Plane extractions that arrive close together are stacked and
+# transformed as one array computation (engine.extract_planes_batch);
+# results are fanned back out to the waiting requests.
+#
+# The target batch size is the number of requests expected to arrive
+# while one batch runs (rate x batch time), so an idle instance
+# dispatches every request immediately and a busy one groups what would
+# otherwise queue. A partial batch waits at most the time its target
+# should take to fill, capped by the window.
+
+class VerifyBatcher:
+    """
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_batch: int = VERIFY_BATCH_MAX, max_window: float = VERIFY_BATCH_WINDOW_MS / 1000):
+
+        self.max_batch = max(1, max_batch)
+        self.max_window = max_window
+
+        # Requests per second and seconds per batch (EWMA)
+        self.rate = 0.0
+        self.batch_seconds = 0.0
+
+        self._last_arrival: float | None = None
+
+        self._queues: dict[str, list[tuple[bytes, asyncio.Future]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+
+    # -----------------------------
+    # Adaptive policy
+    # -----------------------------
+
+    def _observe_arrival(self):
+
+        now = time.monotonic()
+
+        if self._last_arrival is not None:
+            gap = max(now - self._last_arrival, 1e-4)
+            self.rate += _EWMA * (1.0 / gap - self.rate)
+
+        self._last_arrival = now
+
+    def target_size(self) -> int:
+        return max(1, min(self.max_batch, math.ceil(self.rate * self.batch_seconds)))
+
+    def window(self, queued: int) -> float:
+        """
+        Seconds a partial batch of `queued` may wait for the rest.
+        """
+
+        missing = self.target_size() - queued
+
+        if missing <= 0 or self.rate <= 0:
+            return 0.0
+
+        return min(self.max_window, missing / self.rate)
+
+    # -----------------------------
+    # Queueing
+    # -----------------------------
+
+    async def extract(self, engine: WatermarkEngine, image_bytes: bytes):
+        """
+        engine.extract_planes(image_bytes), batched with concurrent calls.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        self._observe_arrival()
+
+        fut = loop.create_future()
+
+        # Engines extracting the same planes share a queue
+        queue = self._queues.setdefault(engine.planes_version, [])
+        queue.append((image_bytes, fut))
+
+        wait = self.window(len(queue))
+
+        if wait <= 0:
+            self._flush(engine)
+
+        elif engine.planes_version not in self._timers:
+            self._timers[engine.planes_version] = loop.call_later(wait, self._flush, engine)
+
+        return await fut
+
+    def _flush(self, engine: WatermarkEngine):
+
+        timer = self._timers.pop(engine.planes_version, None)
+
+        if timer is not None:
+            timer.cancel()
+
+        queue = self._queues.get(engine.planes_version)
+
+        while queue:
+
+            batch = queue[:self.max_batch]
+            del queue[:self.max_batch]
+
+            asyncio.get_running_loop().create_task(self._run(engine, batch))
+
+    async def _run(self, engine: WatermarkEngine, batch: list[tuple[bytes, asyncio.Future]]):
+
+        # Callers that went away while queued (client disconnects)
+        batch = [(image_bytes, fut) for image_bytes, fut in batch if not fut.done()]
+
+        if not batch:
+            return
+
+        start = time.monotonic()
+
+        try:
+            results = await run_in_threadpool(
+                engine.extract_planes_batch,
+                [image_bytes for image_bytes, _ in batch],
+            )
+
+        except Exception as e:
+
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+
+            return
+
+        elapsed = time.monotonic() - start
+
+        if self.batch_seconds:
+            self.batch_seconds += _EWMA * (elapsed - self.batch_seconds)
+        else:
+            self.batch_seconds = elapsed
+
+        for (_, fut), planes in zip(batch, results):
+            if not fut.done():
+                fut.set_result(planes)
+
+        metrics.inc_counter(
+            "auroraa_verify_batches_total",
+            help_text="Batched plane extractions run",
+        )
+        metrics.inc_counter(
+            "auroraa_verify_batched_images_total",
+            len(batch),
+            help_text="Images extracted through the verify batcher",
+        )
+        metrics.set_gauge(
+            "auroraa_verify_batch_target",
+            self.target_size(),
+            help_text="Current adaptive verify batch size",
+        )
+
+
+verify_batcher = VerifyBatcher()
@@ -0,0 +1,153 @@
+# warmup.py
+
+import os
+import threading
+import time
+
+# --------------------------------
+# Lazy codec initialisation and readiness
+# --------------------------------
+# cv2 / pywt / numpy and the watermark secret are loaded here, off the
+# import path of app.main. The process reports ready only after a full
+# embed/verify round trip and a DB ping have succeeded.
+
+# A failed attempt (e.g. the database still starting) is retried with
+# exponential backoff up to this interval, so /ready recovers by itself
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("AURORAA_WARMUP_RETRY_MAX_SECONDS", "30"))
+
+_ready = threading.Event()
+_lock = threading.Lock()
+
+_state = {
+    "imports": False,
+    "error": None,
+    "attempts": 0,
+    "warmup_seconds": None,
+}
+
+
+def warm_imports():
+    """
+    Import the codec stack and load the secret.
+
+    Safe to run in a preforking master: it starts no threads and opens
+    no connections, so workers inherit the modules copy-on-write.
+    """
+
+    if _state["imports"]:
+        return
+
+    from app.services.watermark.image import image_embedder, image_verifier  # noqa: F401
+    from app.services.watermark.image import image_engine  # noqa: F401
+    from app.services.watermark.image.image_crypto import load_secret
+
+    load_secret()
+
+    _state["imports"] = True
+
+
+def _configure_threads():
+
+    from app.services.watermark.image.image_parallel import configure_threads
+
+    # Per worker, after fork: OpenCV's pool must not be created pre-fork
+    configure_threads()
+
+
+def _exercise_codec():
+
+    import cv2
+    import numpy as np
+
+    from app.services.watermark.image.image_config import TARGET, current_epoch
+    from app.services.watermark.image.image_engine import get_watermark_engine
+
+    ramp = np.linspace(0, 255, TARGET, dtype=np.float32)
+    img = np.dstack([np.add.outer(ramp, ramp) / 2] * 3).astype(np.uint8)
+
+    ok, enc = cv2.imencode(".jpg", img)
+
+    if not ok:
+        raise RuntimeError("Warm-up encoding failed")
+
+    epoch = current_epoch()
+
+    engine = get_watermark_engine()
+
+    marked = engine.embed(enc.tobytes(), "warmup", epoch)
+    engine.verify(marked, "warmup", epoch)
+
+
+def _ping_database():
+
+    from sqlalchemy import text
+
+    from app.database.database import get_engine
+
+    with get_engine().connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def warm_up() -> bool:
+
+    with _lock:
+
+        if _ready.is_set():
+            return True
+
+        start = time.perf_counter()
+
+        _state["attempts"] += 1
+
+        try:
+            warm_imports()
+            _configure_threads()
+            _exercise_codec()
+            _ping_database()
+
+        except Exception as e:
+            _state["error"] = str(e)
+            print("WARM-UP FAILED:", e)
+            return False
+
+        _state["error"] = None
+        _state["warmup_seconds"] = round(time.perf_counter() - start, 3)
+
+        _ready.set()
+
+        print("Warm-up complete in", _state["warmup_seconds"], "s")
+
+        return True
+
+
+def _warm_up_until_ready():
+
+    delay = 1.0
+
+    while not warm_up():
+        time.sleep(delay)
+        delay = min(2 * delay, WARMUP_RETRY_MAX_SECONDS)
+
+
+def start_background_warm_up():
+
+    if _ready.is_set():
+        return
+
+    threading.Thread(
+        target=_warm_up_until_ready,
+        name="auroraa-warmup",
+        daemon=True,
+    ).start()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def readiness() -> dict:
+
+    return {
+        "ready": _ready.is_set(),
+        **_state,
+    }
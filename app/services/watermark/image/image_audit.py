@@ -0,0 +1,399 @@
+# image_audit.py
+
+import math
+import multiprocessing
+import os
+import tarfile
+import zipfile
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    wait,
+)
+from typing import BinaryIO, Callable, Iterator
+
+from .image_config import SIGNAL_LENGTH, IMAGE_EXTENSIONS, sidak
+
+# --------------------------------
+# Audit settings
+# --------------------------------
+
+# Members above this size are reported and skipped, never read
+MAX_MEMBER_BYTES = 64 * 1024 * 1024
+
+# Images queued per worker; bounds memory held by one audit
+IN_FLIGHT_PER_WORKER = 2
+
+
+def _is_image(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+# --------------------------------
+# Sources (lazy: one member in memory at a time)
+# --------------------------------
+
+def iter_directory(root: str) -> Iterator[tuple[str, bytes | None]]:
+
+    for dirpath, dirnames, filenames in os.walk(root):
+
+        dirnames.sort()
+
+        for filename in sorted(filenames):
+
+            if not _is_image(filename):
+                continue
+
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, root)
+
+            if os.path.getsize(path) > MAX_MEMBER_BYTES:
+                yield name, None
+                continue
+
+            with open(path, "rb") as f:
+                yield name, f.read()
+
+
+def iter_archive(fileobj: BinaryIO) -> Iterator[tuple[str, bytes | None]]:
+    """
+    Iterate image members of a ZIP or (optionally compressed) TAR stream.
+    """
+
+    if zipfile.is_zipfile(fileobj):
+
+        fileobj.seek(0)
+
+        with zipfile.ZipFile(fileobj) as zf:
+
+            for info in zf.infolist():
+
+                if info.is_dir() or not _is_image(info.filename):
+                    continue
+
+                if info.file_size > MAX_MEMBER_BYTES:
+                    yield info.filename, None
+                    continue
+
+                yield info.filename, zf.read(info)
+
+        return
+
+    fileobj.seek(0)
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+
+        for member in tf:
+
+            if not member.isfile() or not _is_image(member.name):
+                continue
+
+            if member.size > MAX_MEMBER_BYTES:
+                yield member.name, None
+                continue
+
+            f = tf.extractfile(member)
+
+            yield member.name, f.read() if f is not None else None
+
+
+def is_archive(fileobj: BinaryIO) -> bool:
+
+    try:
+        if zipfile.is_zipfile(fileobj):
+            return True
+
+        fileobj.seek(0)
+
+        with tarfile.open(fileobj=fileobj, mode="r:*"):
+            return True
+
+    except tarfile.TarError:
+        return False
+
+    finally:
+        fileobj.seek(0)
+
+
+def iter_source(path: str) -> Iterator[tuple[str, bytes | None]]:
+
+    if os.path.isdir(path):
+        yield from iter_directory(path)
+        return
+
+    with open(path, "rb") as f:
+        yield from iter_archive(f)
+
+
+# --------------------------------
+# Evidence
+# --------------------------------
+
+def image_p_value(confidence: float, n_epochs: int) -> float:
+    """
+    One-sided p-value of the best correlation over `n_epochs` epochs.
+
+    Under the null the normalised correlation of SIGNAL_LENGTH values is
+    ~N(0, 1/L); the Sidak step accounts for taking the max over epochs.
+    """
+
+    z = confidence * math.sqrt(SIGNAL_LENGTH)
+
+    p = 0.5 * math.erfc(z / math.sqrt(2))
+
+    return sidak(p, n_epochs)
+
+
+def fisher_combined_log_p(p_values: list[float]) -> float:
+    """
+    Natural log of Fisher's combined p-value.
+
+    X = -2 * sum(ln p) ~ chi2(2n) and, for even dof,
+    P(X > x) = exp(-x/2) * sum_{k<n} (x/2)^k / k!  (summed in log space).
+    """
+
+    n = len(p_values)
+
+    if n == 0:
+        return 0.0
+
+    half_x = -sum(math.log(max(p, 1e-300)) for p in p_values)
+
+    if half_x == 0.0:
+        return 0.0
+
+    log_term = 0.0
+    log_sum = 0.0
+
+    for k in range(1, n):
+        log_term += math.log(half_x) - math.log(k)
+        hi, lo = max(log_sum, log_term), min(log_sum, log_term)
+        log_sum = hi + math.log1p(math.exp(lo - hi))
+
+    return min(0.0, -half_x + log_sum)
+
+
+# --------------------------------
+# Worker
+# --------------------------------
+
+def audit_image(
+    name: str,
+    image_bytes: bytes | None,
+    owner_id: str,
+    epochs: list[str],
+    versions: list[str | None]
+) -> dict:
+
+    if image_bytes is None:
+        return {
+            "name": name,
+            "verified": False,
+            "confidence": 0.0,
+            "status": "skipped",
+            "reason": "too_large",
+        }
+
+    from .image_engine import get_watermark_engine
+
+    raw = None
+
+    try:
+        for version in versions:
+
+            candidate = get_watermark_engine(version).verify_epochs(
+                image_bytes,
+                owner_id,
+                epochs
+            )
+
+            if candidate is not None and (
+                raw is None or candidate["confidence"] > raw["confidence"]
+            ):
+                raw = candidate
+
+    except Exception as e:
+        raw = {"reason": f"error: {e}"}
+
+    if raw is None:
+        raw = {"verified": False, "confidence": 0.0, "status": "not_verified"}
+
+    result = {
+        "name": name,
+        "verified": bool(raw.get("verified", False)),
+        "confidence": float(raw.get("confidence", 0.0)),
+        "status": raw.get("status", "error"),
+        "epoch": raw.get("epoch"),
+    }
+
+    if raw.get("reason"):
+        result["reason"] = raw["reason"]
+        result["status"] = "error"
+    elif raw.get("p_value") is not None:
+        # Calibrated per image (already corrected over epochs)
+        result["p_value"] = sidak(raw["p_value"], len(versions))
+    else:
+        result["p_value"] = image_p_value(
+            result["confidence"],
+            len(epochs) * len(versions)
+        )
+
+    return result
+
+
+# --------------------------------
+# Audit runner
+# --------------------------------
+
+def run_audit(
+    items: Iterator[tuple[str, bytes | None]],
+    owner_id: str,
+    epochs: list[str],
+    executor: ProcessPoolExecutor,
+    workers: int,
+    versions: list[str | None] | None = None,
+    admit: Callable[[bytes | None], Callable[[], None] | None] | None = None,
+) -> Iterator[dict]:
+    """
+    Verify every item in parallel and yield per-image results as they
+    complete, followed by one aggregate summary record.
+
+    At most workers * IN_FLIGHT_PER_WORKER images are held at once, so
+    memory does not depend on the size of the source. `admit`, if given,
+    is called with each image before it is submitted and may block until
+    it fits a memory budget; it returns the release callback to run when
+    the image is done, or None to skip the image as too large.
+
+    Closing the generator cancels images that have not started.
+    """
+
+    max_in_flight = max(1, workers * IN_FLIGHT_PER_WORKER)
+
+    # None = default engine
+    versions = versions or [None]
+
+    pending = set()
+
+    images = 0
+    matched = 0
+    errors = 0
+    p_values = []
+
+    def record(result: dict):
+
+        nonlocal images, matched, errors
+
+        images += 1
+
+        if result["verified"]:
+            matched += 1
+
+        if "p_value" in result:
+            p_values.append(result["p_value"])
+        else:
+            errors += 1
+
+    items = iter(items)
+    exhausted = False
+
+    try:
+        while not exhausted or pending:
+
+            while not exhausted and len(pending) < max_in_flight:
+
+                try:
+                    name, data = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                release = None
+
+                if admit is not None and data is not None:
+
+                    release = admit(data)
+
+                    # Over the whole budget: reported like an oversized member
+                    if release is None:
+                        data = None
+
+                fut = executor.submit(
+                    audit_image,
+                    name,
+                    data,
+                    owner_id,
+                    epochs,
+                    versions
+                )
+
+                if release is not None:
+                    # Also runs for cancelled futures
+                    fut.add_done_callback(lambda _, release=release: release())
+
+                pending.add(fut)
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for fut in done:
+
+                result = fut.result()
+
+                record(result)
+
+                yield result
+
+    finally:
+        # Client gone (or an error): drop what has not started yet
+        for fut in pending:
+            fut.cancel()
+
+    log_p = fisher_combined_log_p(p_values)
+
+    yield {
+        "summary": True,
+        "owner_id": owner_id,
+        "epochs": epochs,
+        "algorithm_versions": versions,
+        "images": images,
+        "matched": matched,
+        "errors": errors,
+        "match_rate": round(matched / images, 4) if images else 0.0,
+        "combined_method": "fisher",
+        "combined_p_value": math.exp(log_p),
+        "combined_log10_p": round(log_p / math.log(10), 3),
+    }
+
+
+# --------------------------------
+# Shared pool for the HTTP endpoint
+# --------------------------------
+
+AUDIT_WORKERS = int(os.getenv("AURORAA_AUDIT_WORKERS", str(os.cpu_count() or 1)))
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_audit_pool() -> ProcessPoolExecutor:
+
+    global _pool
+
+    if _pool is None:
+        # spawn: the server process is multi-threaded, forking it is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=AUDIT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    return _pool
+
+
+def shutdown_audit_pool():
+
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -4,27 +4,18 @@
 
 from datetime import datetime, timezone
 import math
+import os
 
 # -------------------------------
-# Adaptive Strength
+# Perceptual strength masking
 # -------------------------------
+# Masked engines scale each block's amplitude by its texture energy
+# (RMS of the band coefficients), normalised to mean 1 over the band so
+# the mean amplitude stays STRENGTH: flat regions get less,
+# busy texture more. The verifier is unchanged; it never needs the map.
 
-# REF_SIZE = 1024 * 1024   # reference area (1MP)
-# STRENGTH = 50       # your current value
-
-
-# def adaptive_strength(h: int, w: int) -> float:
-#     """
-#     Scale watermark strength by image size.
-#     """
-#     area = h * w
-
-#     scale = math.sqrt(area / REF_SIZE)
-
-#     # Clamp to safe range
-#     scale = max(0.6, min(scale, 1.8))
-
-#     return STRENGTH * scale
+MASK_MIN = 0.5
+MASK_MAX = 2.0
 
 
 # -------------------------------
@@ -51,12 +42,42 @@ SIGNAL_LENGTH = 128
 
 TARGET = 1024
 
+# -------------------------------
+# Output resolution
+# -------------------------------
+# The transform always runs at TARGET. With native output, the change
+# made to the TARGET frame is resized back onto the decoded original, so
+# results keep the upload's size and aspect ratio; otherwise outputs are
+# TARGET x TARGET.
+
+NATIVE_OUTPUT = os.getenv("AURORAA_NATIVE_OUTPUT", "1") != "0"
+
+# -------------------------------
+# Supported inputs (batch tools)
+# -------------------------------
+
+IMAGE_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff",
+)
+
 # -------------------------------
 # Versioning
 # -------------------------------
 
 ALGORITHM_VERSION = "v3-continousid"
 
+# Same decoder as ALGORITHM_VERSION, texture-masked embedding
+MASKED_ALGORITHM_VERSION = "v3-masked"
+
+# Texture-masked embedding over a per-epoch Feistel block layout
+PERMUTED_ALGORITHM_VERSION = "v4-feistel"
+
+# Block layouts: "shuffle" draws a per (owner, epoch) shuffled list of
+# all blocks (v3), "feistel" maps positions through a keyed permutation
+# (v4, see image_crypto)
+LAYOUT_SHUFFLE = "shuffle"
+LAYOUT_FEISTEL = "feistel"
+
 
 # -------------------------------
 # Performance
@@ -84,6 +105,31 @@ def confidence_to_status(score: float) -> str:
         return "not_verified"
 
 
+# -------------------------------
+# Null calibration
+# -------------------------------
+# The thresholds above are the same for every image; how high a chance
+# correlation can go depends on the image. With calibration on, the
+# verifier also scores the image's deltas against NULL_KEYS random
+# keys (random layout + random signal) and reports a per-image p-value
+# next to the confidence.
+
+NULL_CALIBRATION = os.getenv("AURORAA_NULL_CALIBRATION", "1") != "0"
+
+NULL_KEYS = int(os.getenv("AURORAA_NULL_KEYS", "128"))
+
+
+def sidak(p: float, n_tests: int) -> float:
+    """
+    p-value of the best of n_tests independent tests.
+    """
+
+    if p >= 1.0:
+        return 1.0
+
+    return -math.expm1(max(1, n_tests) * math.log1p(-p))
+
+
 # -------------------------------
 # Epoch helpers
 # -------------------------------
@@ -118,6 +164,25 @@ def previous_epochs(n: int = 4) -> list[str]:
 
     return epochs
 
+def epoch_bounds(epoch: str) -> tuple[datetime, datetime]:
+    """
+    UTC [start, end) of an epoch such as "2026-Q1".
+    """
+
+    year, quarter = epoch.split("-Q")
+
+    year = int(year)
+    quarter = int(quarter)
+
+    start = datetime(year, 3 * (quarter - 1) + 1, 1, tzinfo=timezone.utc)
+
+    if quarter == 4:
+        end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    else:
+        end = datetime(year, 3 * quarter + 1, 1, tzinfo=timezone.utc)
+
+    return start, end
+
 # -------------------------------
 # Result formatting
 # -------------------------------
@@ -170,10 +235,22 @@ def interpret_verification_result(result: dict) -> dict:
         "issued_on": issued_on,
     }
 
+    # Calibrated p-value and the empirical floor behind it
+    for key in ("p_value", "p_value_empirical"):
+        if result.get(key) is not None:
+            response[key] = float(f"{result[key]:.3g}")
+
     if status == "verified" and result.get("owner_id"):
 
         response["owner"] = {
             "id": result["owner_id"]
         }
 
+    if result.get("watermark_id"):
+
+        response["asset"] = {
+            "watermark_id": result["watermark_id"],
+            "phash_distance": result.get("phash_distance"),
+        }
+
     return response
@@ -3,32 +3,50 @@
 import os
 import hmac
 import hashlib
+from functools import lru_cache
+
 import numpy as np
 
-from app.services.watermark.image.image_config import SIGNAL_LENGTH
+from app.services.watermark.image.image_config import (
+    LAYOUT_FEISTEL,
+    LAYOUT_SHUFFLE,
+    SIGNAL_LENGTH,
+)
 
-SECRET = os.environ.get("AURORAA_WATERMARK_SECRET")
 
-if not SECRET:
-    raise RuntimeError("AURORAA_WATERMARK_SECRET is not set")
+@lru_cache(maxsize=1)
+def load_secret() -> bytes:
+    """
+    Read the watermark secret on first use rather than at import.
+    """
 
-SECRET = SECRET.encode()
+    secret = os.environ.get("AURORAA_WATERMARK_SECRET")
 
+    if not secret:
+        raise RuntimeError("AURORAA_WATERMARK_SECRET is not set")
 
-def generate_signal(owner_id: str, epoch: str) -> np.ndarray:
-    """
-    Generate style continuous watermark signal.
-    """
+    return secret.encode()
+
+
+def _signal_digest(owner_id: str, epoch: str) -> bytes:
 
     # asset_id is IGNORED for owner-level uniqueness
     msg = f"AURORAA|{owner_id}|{epoch}".encode()
 
-    digest = hmac.new(
-        SECRET,
+    return hmac.new(
+        load_secret(),
         msg,
         hashlib.sha256
     ).digest()
 
+
+def generate_signal(owner_id: str, epoch: str) -> np.ndarray:
+    """
+    Generate style continuous watermark signal.
+    """
+
+    digest = _signal_digest(owner_id, epoch)
+
     bits = np.unpackbits(
         np.frombuffer(digest, dtype=np.uint8)
     )[:SIGNAL_LENGTH]
@@ -38,13 +56,39 @@ def generate_signal(owner_id: str, epoch: str) -> np.ndarray:
 
     return signal
 
+# Signal bits packed into 64-bit words (signature index)
+SIGNAL_WORDS = SIGNAL_LENGTH // 64
+
+
+def signal_words(owner_id: str, epoch: str) -> np.ndarray:
+    """
+    generate_signal as packed bits, (SIGNAL_WORDS,) uint64: the same
+    bytes np.packbits(signal > 0) gives, viewed as words.
+    """
+
+    digest = _signal_digest(owner_id, epoch)
+
+    return np.frombuffer(digest[:SIGNAL_WORDS * 8], dtype=np.uint64).copy()
+
+
+def pack_signal_bits(bits: np.ndarray) -> np.ndarray:
+    """
+    (..., SIGNAL_LENGTH) bools -> (..., SIGNAL_WORDS) uint64, comparable
+    with signal_words by XOR-popcount.
+    """
+
+    packed = np.packbits(np.asarray(bits, dtype=bool), axis=-1)
+
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
 def generate_shuffle_seed(owner_id, epoch):
 
     # asset_id is IGNORED
     msg = f"SHUFFLE|{owner_id}|{epoch}".encode()
 
     digest = hmac.new(
-        SECRET,
+        load_secret(),
         msg,
         hashlib.sha256
     ).digest()
@@ -70,3 +114,148 @@ def shuffled_blocks(h, w, owner_id, epoch):
 
     return blocks
 
+
+def block_order(
+    gh: int,
+    gw: int,
+    owner_id: str,
+    epoch: str,
+    layout: str = LAYOUT_SHUFFLE
+) -> np.ndarray:
+    """
+    Keyed block order for a layout, as flat row-major block indices
+    (read-only, cached).
+    """
+
+    if layout == LAYOUT_FEISTEL:
+        return feistel_order(gh * gw, epoch)
+
+    return shuffled_order(gh, gw, owner_id, epoch)
+
+
+@lru_cache(maxsize=256)
+def shuffled_order(gh: int, gw: int, owner_id: str, epoch: str) -> np.ndarray:
+    """
+    shuffled_blocks as flat row-major block indices (i // 8 * gw + j // 8).
+
+    Generator.shuffle draws the same swaps for a list and an array, so
+    the order is identical; cached and read-only, shared across calls.
+    """
+
+    order = np.arange(gh * gw)
+
+    rng = np.random.default_rng(
+        generate_shuffle_seed(owner_id, epoch)
+    )
+    rng.shuffle(order)
+
+    order.setflags(write=False)
+
+    return order
+
+
+# --------------------------------
+# Keyed permutation (Feistel layout)
+# --------------------------------
+# A balanced Feistel network over the smallest even-width bit domain
+# covering [0, n), cycle-walked back into range: position k maps to its
+# block index in O(1) with no table, for any array of positions and any
+# stack of keys at once. Keyed per epoch (owner-independent), so one
+# gather of an image's planes serves every owner of that epoch.
+
+FEISTEL_ROUNDS = 4
+
+_MIX_A = np.uint32(0x85EBCA6B)
+_MIX_B = np.uint32(0xC2B2AE35)
+
+
+def permutation_keys(epoch: str) -> np.ndarray:
+    """
+    Round keys for an epoch's layout, (FEISTEL_ROUNDS,) uint32.
+    """
+
+    msg = f"PERMUTE|{epoch}".encode()
+
+    digest = hmac.new(
+        load_secret(),
+        msg,
+        hashlib.sha256
+    ).digest()
+
+    return np.frombuffer(digest[:4 * FEISTEL_ROUNDS], dtype=">u4").astype(np.uint32)
+
+
+def _round(r: np.ndarray, key: np.ndarray, mask: np.uint32) -> np.ndarray:
+
+    # murmur3 finaliser of (r ^ key)
+    x = r ^ key
+    x = (x ^ (x >> np.uint32(16))) * _MIX_A
+    x = (x ^ (x >> np.uint32(13))) * _MIX_B
+    x = x ^ (x >> np.uint32(16))
+
+    return x & mask
+
+
+def _encrypt(x: np.ndarray, keys: np.ndarray, half: int) -> np.ndarray:
+
+    shift = np.uint32(half)
+    mask = np.uint32((1 << half) - 1)
+
+    left = x >> shift
+    right = x & mask
+
+    for i in range(FEISTEL_ROUNDS):
+        left, right = right, left ^ _round(right, keys[:, i], mask)
+
+    return (left << shift) | right
+
+
+def feistel_permute(k, n: int, keys: np.ndarray) -> np.ndarray:
+    """
+    Keyed permutation of [0, n): positions `k` -> block indices (int64).
+
+    `keys` is (FEISTEL_ROUNDS,) or a stack (..., FEISTEL_ROUNDS) that
+    broadcasts against `k`, e.g. keys[:, None] with k of shape (L,)
+    gives an (E, L) order per key.
+    """
+
+    if not 0 < n <= 1 << 32:
+        raise ValueError("Permutation domain must be 1 .. 2**32 blocks")
+
+    keys = np.asarray(keys, dtype=np.uint32)
+
+    half = max(1, ((n - 1).bit_length() + 1) // 2)
+
+    k = np.asarray(k)
+
+    shape = np.broadcast_shapes(k.shape, keys.shape[:-1])
+
+    # Flat working copies (1-D even for a scalar k)
+    x = np.broadcast_to(k.astype(np.uint32), shape).reshape(-1).copy()
+    keys = np.broadcast_to(keys, (*shape, FEISTEL_ROUNDS)).reshape(-1, FEISTEL_ROUNDS)
+
+    x = _encrypt(x, keys, half)
+
+    # Cycle-walk: the domain is < 4n, so few points take a second step
+    pending = np.flatnonzero(x >= n)
+
+    while pending.size:
+
+        x[pending] = _encrypt(x[pending], keys[pending], half)
+
+        pending = pending[x[pending] >= n]
+
+    return x.reshape(shape).astype(np.int64)
+
+
+@lru_cache(maxsize=64)
+def feistel_order(n: int, epoch: str) -> np.ndarray:
+    """
+    Feistel block order over all n blocks (read-only, cached per epoch).
+    """
+
+    order = feistel_permute(np.arange(n), n, permutation_keys(epoch))
+
+    order.setflags(write=False)
+
+    return order
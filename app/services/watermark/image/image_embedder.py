@@ -1,36 +1,184 @@
 # image_embedder.py
 
+from functools import lru_cache
+
 import cv2
 import numpy as np
 import pywt
 
 from .image_config import (
     DWT_WAVE,
-    DCT_POS_A,
-    DCT_POS_B,
+    LAYOUT_SHUFFLE,
+    NATIVE_OUTPUT,
     REPEAT,
     STRENGTH,
     TARGET
 )
 
-from .image_crypto import generate_signal, shuffled_blocks
+from .image_crypto import generate_signal, block_order
+from .image_encoder import encode_image, output_format
+from .image_parallel import TRANSFORM_TILES, map_tiles
+from .image_transform import (
+    add_pattern,
+    block_grid,
+    block_rms,
+    luma_strips,
+    mask_from_rms,
+)
 
 
-def embed_watermark(
-    image_bytes: bytes,
+# --------------------------------
+# Per (owner, epoch) embedding plan
+# --------------------------------
+
+@lru_cache(maxsize=256)
+def band_amplitudes(
     owner_id: str,
-    epoch: str
-) -> bytes:
+    epoch: str,
+    gh: int,
+    gw: int,
+    strength: float = STRENGTH,
+    layout: str = LAYOUT_SHUFFLE
+) -> tuple[np.ndarray | None, ...]:
+    """
+    Signed pattern amplitude per block for LL, LH, HL (None = untouched).
+
+    Bits are laid out REPEAT times each over the keyed block order of LL,
+    then LH, then HL. Cached, so batches and repeat calls for the same
+    owner/epoch skip signal and permutation generation entirely.
+    """
+
+    signal = generate_signal(owner_id, epoch)
+
+    n = gh * gw
 
     # --------------------------------
-    # Decode image
+    # Capacity check (3 bands)
     # --------------------------------
-    img = cv2.imdecode(
-        np.frombuffer(image_bytes, np.uint8),
-        cv2.IMREAD_COLOR
-    )
+    if len(signal) * REPEAT > 3 * n:
+        raise ValueError("Image too small for watermark")
 
-    if img is None:
+    per_position = np.repeat(signal, REPEAT).astype(np.float32)
+
+    order = block_order(gh, gw, owner_id, epoch, layout)
+
+    amplitudes = []
+
+    for b in range(3):
+
+        chunk = per_position[b * n:(b + 1) * n]
+
+        if len(chunk) == 0:
+            amplitudes.append(None)
+            continue
+
+        # Reduce power on high-frequency bands
+        band_strength = strength if b == 0 else strength * 0.7
+
+        grid = np.zeros(n, dtype=np.float32)
+        grid[order[:len(chunk)]] = band_strength * chunk
+
+        grid = grid.reshape(gh, gw)
+        grid.setflags(write=False)
+
+        amplitudes.append(grid)
+
+    return tuple(amplitudes)
+
+
+# --------------------------------
+# Luma core
+# --------------------------------
+
+def embed_luma(
+    y: np.ndarray,
+    owner_id: str,
+    epoch: str,
+    masking: bool = False,
+    tiles: int = TRANSFORM_TILES,
+    layout: str = LAYOUT_SHUFFLE
+) -> np.ndarray:
+    """
+    Watermark a float32 luma plane (..., H, W) with even H and W.
+    A leading batch axis is processed in one pass. With `masking`, each
+    block's amplitude follows its texture energy (see texture_mask).
+
+    The plane is cut into up to `tiles` row strips transformed on the
+    thread budget (map_tiles); the result does not depend on `tiles`.
+    """
+
+    gh, gw = block_grid(y.shape[-2] // 2, y.shape[-1] // 2)
+
+    amplitudes = band_amplitudes(owner_id, epoch, gh, gw, layout=layout)
+
+    strips = luma_strips(y.shape[-2], tiles)
+
+    # --------------------------------
+    # DWT (+ block energy for masking)
+    # --------------------------------
+    def forward(rows):
+
+        LL, (LH, HL, HH) = pywt.dwt2(y[..., rows, :], DWT_WAVE, axes=(-2, -1))
+
+        rms = None
+
+        if masking:
+            rms = [
+                block_rms(band, *block_grid(*band.shape[-2:]))
+                for band in (LL, LH, HL)
+            ]
+
+        return (LL, LH, HL, HH), rms
+
+    forwards = map_tiles(forward, strips)
+
+    scales = [None, None, None]
+
+    if masking:
+        # Normalised over the whole band, not per strip
+        scales = [
+            mask_from_rms(np.concatenate([rms[b] for _, rms in forwards], axis=-2))
+            for b in range(3)
+        ]
+
+    out = np.empty(y.shape, dtype=np.result_type(y, np.float32))
+
+    # --------------------------------
+    # Multi-band embedding + inverse DWT
+    # --------------------------------
+    def inverse(k):
+
+        (LL, LH, HL, HH), _ = forwards[k]
+
+        rows = strips[k]
+
+        # First block row of this strip
+        r0 = (rows.start or 0) // 16
+
+        for band, amplitude, scale in zip((LL, LH, HL), amplitudes, scales):
+
+            if amplitude is None:
+                continue
+
+            r1 = r0 + block_grid(*band.shape[-2:])[0]
+
+            amplitude = amplitude[r0:r1]
+
+            if scale is not None:
+                amplitude = amplitude * scale[..., r0:r1, :]
+
+            add_pattern(band, amplitude)
+
+        out[..., rows, :] = pywt.idwt2((LL, (LH, HL, HH)), DWT_WAVE, axes=(-2, -1))
+
+    map_tiles(inverse, list(range(len(strips))))
+
+    return out
+
+
+def _to_ycrcb(img: np.ndarray) -> np.ndarray:
+
+    if img is None or img.ndim != 3 or img.shape[2] != 3:
         raise ValueError("Invalid image")
 
     # --------------------------------
@@ -42,142 +190,176 @@ def embed_watermark(
         interpolation=cv2.INTER_AREA
     )
 
-    # --------------------------------
-    # Generate watermark signal
-    # --------------------------------
-    signal = generate_signal(owner_id, epoch)
-
     # --------------------------------
     # Convert to Y channel
     # --------------------------------
-    ycrcb = cv2.cvtColor(img, cv2.COLOR_BGR2YCrCb)
-    y = ycrcb[:, :, 0].astype(np.float32)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2YCrCb)
 
-    h, w = y.shape
 
-    # Make even for DWT
-    y = y[:h - h % 2, :w - w % 2]
+def to_ycrcb(img: np.ndarray) -> np.ndarray:
+    """
+    uint8 BGR (H, W, 3) -> uint8 YCrCb (TARGET, TARGET, 3), the frame the
+    embedder works on.
+    """
 
-    # --------------------------------
-    # Fixed strength (normalized size)
-    # --------------------------------
-    strength = STRENGTH
+    return _to_ycrcb(img)
 
-    # --------------------------------
-    # DWT
-    # --------------------------------
-    LL, (LH, HL, HH) = pywt.dwt2(y, DWT_WAVE)
 
-    # --------------------------------
-    # Capacity check (3 bands)
-    # --------------------------------
-    total_blocks = 0
+def _write_luma(ycrcb: np.ndarray, y_marked: np.ndarray):
 
-    for band in (LL, LH, HL):
+    h2 = min(y_marked.shape[-2], ycrcb.shape[-3])
+    w2 = min(y_marked.shape[-1], ycrcb.shape[-2])
 
-        blocks = shuffled_blocks(
-            band.shape[0],
-            band.shape[1],
-            owner_id,
-            epoch
-        )
+    ycrcb[..., :h2, :w2, 0] = np.clip(
+        y_marked[..., :h2, :w2],
+        0,
+        255
+    )
 
-        total_blocks += len(blocks)
 
-    if len(signal) * REPEAT > total_blocks:
-        raise ValueError("Image too small for watermark")
+# --------------------------------
+# Array API
+# --------------------------------
+
+def embed_array(
+    img: np.ndarray,
+    owner_id: str,
+    epoch: str,
+    masking: bool = False,
+    native: bool = NATIVE_OUTPUT,
+    layout: str = LAYOUT_SHUFFLE
+) -> np.ndarray:
+    """
+    uint8 BGR (H, W, 3) -> watermarked uint8 BGR, (H, W, 3) with
+    `native`, else (TARGET, TARGET, 3).
+    """
+
+    ycrcb = _to_ycrcb(img)
+
+    if native and img.shape[:2] != ycrcb.shape[:2]:
+
+        before = ycrcb.copy()
+
+        embed_ycrcb(ycrcb, owner_id, epoch, masking, layout)
+
+        return restore_resolution(img, before, ycrcb)
+
+    embed_ycrcb(ycrcb, owner_id, epoch, masking, layout)
 
     # --------------------------------
-    # Multi-band embedding
+    # Convert back to BGR
     # --------------------------------
-    bands = [LL, LH, HL]
+    return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+
+
+def restore_resolution(
+    img: np.ndarray,
+    before: np.ndarray,
+    after: np.ndarray
+) -> np.ndarray:
+    """
+    Apply the edit between two TARGET YCrCb frames to the source image
+    it was taken from: the BGR difference is resized to the source size
+    and added with saturation in one pass. Cost is a resize and an add
+    at source resolution; the transform itself stays at TARGET.
+    """
+
+    delta = cv2.subtract(
+        cv2.cvtColor(after, cv2.COLOR_YCrCb2BGR),
+        cv2.cvtColor(before, cv2.COLOR_YCrCb2BGR),
+        dtype=cv2.CV_16S
+    )
 
-    bit = 0
-    rep = 0
+    h, w = img.shape[:2]
 
-    for band in bands:
+    if (h, w) != delta.shape[:2]:
 
-        # Reduce power on high-frequency bands
-        if band is LL:
-            band_strength = strength
-        else:
-            band_strength = strength * 0.7
-
-        blocks = shuffled_blocks(
-            band.shape[0],
-            band.shape[1],
-            owner_id,
-            epoch
+        upscale = h * w > delta.shape[0] * delta.shape[1]
+
+        delta = cv2.resize(
+            delta,
+            (w, h),
+            interpolation=cv2.INTER_LINEAR if upscale else cv2.INTER_AREA
         )
 
-        for (i, j) in blocks:
+    return cv2.add(img, delta, dtype=cv2.CV_8U)
 
-            if bit >= len(signal):
-                break
 
-            block = band[i:i+8, j:j+8]
+def embed_ycrcb(
+    ycrcb: np.ndarray,
+    owner_id: str,
+    epoch: str,
+    masking: bool = False,
+    layout: str = LAYOUT_SHUFFLE
+):
+    """
+    In place: watermark the Y plane of a uint8 YCrCb frame. Cr/Cb are
+    not touched.
+    """
 
-            if block.shape != (8, 8):
-                continue
+    y = ycrcb[:, :, 0].astype(np.float32)
 
-            dct = cv2.dct(block)
+    h, w = y.shape
 
-            s = signal[bit]
+    # Make even for DWT
+    y = y[:h - h % 2, :w - w % 2]
 
-            # Embed watermark
-            dct[DCT_POS_A] += band_strength * s
-            dct[DCT_POS_B] -= band_strength * s
+    _write_luma(ycrcb, embed_luma(y, owner_id, epoch, masking, layout=layout))
 
-            band[i:i+8, j:j+8] = cv2.idct(dct)
 
-            rep += 1
+def embed_batch(
+    images: np.ndarray,
+    owner_id: str,
+    epoch: str,
+    masking: bool = False,
+    native: bool = NATIVE_OUTPUT,
+    layout: str = LAYOUT_SHUFFLE
+) -> np.ndarray:
+    """
+    uint8 BGR (N, H, W, 3) -> (N, H, W, 3) with `native`, else
+    (N, TARGET, TARGET, 3).
 
-            if rep >= REPEAT:
-                rep = 0
-                bit += 1
+    The signal and block plan are built once for the batch. Frames go
+    through the transform one at a time: a whole-stack DWT is slower
+    than per-frame passes that stay in cache.
+    """
 
-        if bit >= len(signal):
-            break
+    shape = images.shape if native else (len(images), TARGET, TARGET, 3)
 
-    # --------------------------------
-    # Inverse DWT
-    # --------------------------------
-    y_marked = pywt.idwt2((LL, (LH, HL, HH)), DWT_WAVE)
+    out = np.empty(shape, dtype=np.uint8)
 
-    h2 = min(y_marked.shape[0], ycrcb.shape[0])
-    w2 = min(y_marked.shape[1], ycrcb.shape[1])
+    for n, img in enumerate(images):
+        out[n] = embed_array(img, owner_id, epoch, masking, native, layout)
 
-    ycrcb[:h2, :w2, 0] = np.clip(
-        y_marked[:h2, :w2],
-        0,
-        255
-    )
+    return out
 
-    # --------------------------------
-    # Convert back to BGR
-    # --------------------------------
-    out = cv2.cvtColor(
-        ycrcb.astype(np.uint8),
-        cv2.COLOR_YCrCb2BGR
-    )
+
+# --------------------------------
+# Bytes API (HTTP)
+# --------------------------------
+
+def embed_watermark(
+    image_bytes: bytes,
+    owner_id: str,
+    epoch: str,
+    masking: bool = False,
+    layout: str = LAYOUT_SHUFFLE
+) -> bytes | memoryview:
 
     # --------------------------------
-    # Encode JPEG
+    # Decode image
     # --------------------------------
-    ok, enc = cv2.imencode(
-        ".jpg",
-        out,
-        [cv2.IMWRITE_JPEG_QUALITY, 92]
+    img = cv2.imdecode(
+        np.frombuffer(image_bytes, np.uint8),
+        cv2.IMREAD_COLOR
     )
 
-    if not ok:
-        raise RuntimeError("Encoding failed")
+    if img is None:
+        raise ValueError("Invalid image")
 
-    # Debug (remove later)
-    print(
-        "SIGNAL:",
-        round(np.mean(signal), 4),
-        round(np.std(signal), 4)
-    )
+    out = embed_array(img, owner_id, epoch, masking, layout=layout)
 
-    return enc.tobytes()
+    # --------------------------------
+    # Encode (configured format / preset)
+    # --------------------------------
+    return encode_image(out, output_format(image_bytes)).data
@@ -0,0 +1,332 @@
+# image_engine.py
+
+import importlib
+import os
+
+import numpy as np
+
+from .image_config import (
+    ALGORITHM_VERSION,
+    LAYOUT_FEISTEL,
+    LAYOUT_SHUFFLE,
+    MASKED_ALGORITHM_VERSION,
+    PERMUTED_ALGORITHM_VERSION,
+)
+
+# --------------------------------
+# Watermark engines
+# --------------------------------
+# An engine is one embed/verify implementation, identified by the
+# algorithm version written to every Watermark row. Verification
+# dispatches on the row's version; new uploads use the default engine.
+#
+# Besides encoded bytes (HTTP), engines take decoded uint8 BGR arrays so
+# in-process callers skip the JPEG round trip; the *_batch variants take
+# (N, H, W, 3) stacks.
+
+
+class WatermarkEngine:
+
+    version: str = ""
+
+    # Verification is a keyed gather over owner/epoch independent
+    # per-image planes (extract_planes / verify_planes), which can be
+    # persisted and re-scored without the image
+    supports_planes: bool = False
+
+    # The block layout does not depend on the owner, so one decode of an
+    # image is compared against every owner's signature (signature index)
+    supports_search: bool = False
+
+    @property
+    def decoder_version(self) -> str:
+        """
+        Engines with the same decoder verify each other's output, so
+        verification (and stored planes) runs once per decoder.
+        """
+        return self.version
+
+    @property
+    def planes_version(self) -> str:
+        """
+        Engines extracting identical planes share stored planes, even
+        when they score them differently.
+        """
+        return self.decoder_version
+
+    def embed(self, image_bytes: bytes, owner_id: str, epoch: str) -> bytes:
+        raise NotImplementedError
+
+    def verify(self, image_bytes: bytes, owner_id: str, epoch: str) -> dict:
+        raise NotImplementedError
+
+    def embed_array(self, img: np.ndarray, owner_id: str, epoch: str) -> np.ndarray:
+        raise NotImplementedError
+
+    def verify_array(self, img: np.ndarray, owner_id: str, epoch: str) -> dict:
+        raise NotImplementedError
+
+    def embed_ycrcb(self, ycrcb: np.ndarray, owner_id: str, epoch: str):
+        """
+        In place on a uint8 YCrCb frame from to_frame(); only the
+        channels in `frame_channels` are written. Used by the protection
+        pipeline.
+        """
+        raise NotImplementedError
+
+    def to_frame(self, img: np.ndarray) -> np.ndarray:
+        """
+        uint8 BGR -> the uint8 YCrCb frame embed_ycrcb expects.
+        """
+        raise NotImplementedError
+
+    # YCrCb channel indices embed_ycrcb writes
+    frame_channels: tuple[int, ...] = (0, 1, 2)
+
+    def embed_batch(self, images: np.ndarray, owner_id: str, epoch: str) -> np.ndarray:
+        return np.stack([self.embed_array(img, owner_id, epoch) for img in images])
+
+    def verify_batch(self, images: np.ndarray, owner_id: str, epoch: str) -> list[dict]:
+        return [self.verify_array(img, owner_id, epoch) for img in images]
+
+    def verify_epochs(
+        self,
+        image_bytes: bytes,
+        owner_id: str,
+        epochs: list[str]
+    ) -> dict | None:
+        """
+        Best result across epochs, or None if nothing correlated.
+        """
+
+        best = None
+
+        for epoch in epochs:
+
+            raw = self.verify(image_bytes, owner_id, epoch)
+
+            if raw["confidence"] > (best["confidence"] if best else 0.0):
+                best = raw
+
+        return best
+
+    def extract_planes(self, image_bytes: bytes) -> np.ndarray | None:
+        raise NotImplementedError
+
+    def extract_planes_batch(self, images: list[bytes]) -> list[np.ndarray | None]:
+        return [self.extract_planes(image_bytes) for image_bytes in images]
+
+    def verify_planes(
+        self,
+        planes: np.ndarray | None,
+        owner_id: str,
+        epochs: list[str]
+    ) -> dict | None:
+        raise NotImplementedError
+
+    def gather_planes(self, planes: np.ndarray, epoch: str) -> np.ndarray | None:
+        """
+        Deltas in embedding order for any owner of `epoch`
+        (supports_search engines).
+        """
+        raise NotImplementedError
+
+
+class ReferenceEngine(WatermarkEngine):
+    """
+    DWT + block-DCT embedder (image_embedder / image_verifier).
+    """
+
+    version = ALGORITHM_VERSION
+    decoder_version = ALGORITHM_VERSION
+
+    supports_planes = True
+
+    # Texture-masked per-block strength (MaskedEngine)
+    masking = False
+
+    # Keyed block layout (PermutedEngine: per-epoch Feistel)
+    layout = LAYOUT_SHUFFLE
+
+    # Every engine of this family extracts the same DWT/DCT planes
+    planes_version = ALGORITHM_VERSION
+
+    # Luma only
+    frame_channels = (0,)
+
+    def embed(self, image_bytes: bytes, owner_id: str, epoch: str) -> bytes:
+
+        from .image_embedder import embed_watermark
+
+        return embed_watermark(image_bytes, owner_id, epoch, self.masking, self.layout)
+
+    def verify(self, image_bytes: bytes, owner_id: str, epoch: str) -> dict:
+
+        from .image_verifier import verify_watermark
+
+        return verify_watermark(image_bytes, owner_id, epoch, self.layout)
+
+    def verify_epochs(
+        self,
+        image_bytes: bytes,
+        owner_id: str,
+        epochs: list[str]
+    ) -> dict | None:
+
+        from .image_verifier import verify_watermark_epochs
+
+        # Decodes once for all epochs
+        return verify_watermark_epochs(image_bytes, owner_id, epochs, self.layout)
+
+    def extract_planes(self, image_bytes: bytes) -> np.ndarray | None:
+
+        from .image_extractor import load_delta_planes
+
+        return load_delta_planes(image_bytes)
+
+    def extract_planes_batch(self, images: list[bytes]) -> list[np.ndarray | None]:
+
+        from .image_extractor import load_delta_planes_batch
+
+        return load_delta_planes_batch(images)
+
+    def verify_planes(
+        self,
+        planes: np.ndarray | None,
+        owner_id: str,
+        epochs: list[str]
+    ) -> dict | None:
+
+        from .image_verifier import verify_planes
+
+        return verify_planes(planes, owner_id, epochs, self.layout)
+
+    def embed_array(self, img: np.ndarray, owner_id: str, epoch: str) -> np.ndarray:
+
+        from .image_embedder import embed_array
+
+        return embed_array(img, owner_id, epoch, self.masking, layout=self.layout)
+
+    def verify_array(self, img: np.ndarray, owner_id: str, epoch: str) -> dict:
+
+        from .image_verifier import verify_array
+
+        return verify_array(img, owner_id, epoch, self.layout)
+
+    def to_frame(self, img: np.ndarray) -> np.ndarray:
+
+        from .image_embedder import to_ycrcb
+
+        return to_ycrcb(img)
+
+    def embed_ycrcb(self, ycrcb: np.ndarray, owner_id: str, epoch: str):
+
+        from .image_embedder import embed_ycrcb
+
+        embed_ycrcb(ycrcb, owner_id, epoch, self.masking, self.layout)
+
+    def embed_batch(self, images: np.ndarray, owner_id: str, epoch: str) -> np.ndarray:
+
+        from .image_embedder import embed_batch
+
+        return embed_batch(images, owner_id, epoch, self.masking, layout=self.layout)
+
+    def verify_batch(self, images: np.ndarray, owner_id: str, epoch: str) -> list[dict]:
+
+        from .image_verifier import verify_batch
+
+        return verify_batch(images, owner_id, epoch, self.layout)
+
+
+class MaskedEngine(ReferenceEngine):
+    """
+    ReferenceEngine with block amplitudes following texture energy.
+    Decoded by the reference verifier unchanged.
+    """
+
+    version = MASKED_ALGORITHM_VERSION
+
+    masking = True
+
+
+class PermutedEngine(MaskedEngine):
+    """
+    MaskedEngine over a per-epoch Feistel block layout (random access,
+    no per-owner shuffle). Needs its own decoder; v3 rows keep verifying
+    through the v3 engines, which stay registered.
+    """
+
+    version = PERMUTED_ALGORITHM_VERSION
+    decoder_version = PERMUTED_ALGORITHM_VERSION
+
+    layout = LAYOUT_FEISTEL
+
+    supports_search = True
+
+    def gather_planes(self, planes: np.ndarray, epoch: str) -> np.ndarray | None:
+
+        from .image_extractor import gather_deltas
+
+        # The Feistel layout is keyed by epoch alone
+        return gather_deltas(planes, "", epoch, self.layout)
+
+
+# --------------------------------
+# Registry
+# --------------------------------
+
+_ENGINES: dict[str, WatermarkEngine] = {}
+
+
+def register_engine(engine: WatermarkEngine, replace: bool = False):
+
+    if not engine.version:
+        raise ValueError("Engine has no version")
+
+    if engine.version in _ENGINES and not replace:
+        raise ValueError(f"Engine {engine.version} already registered")
+
+    _ENGINES[engine.version] = engine
+
+
+def registered_versions() -> list[str]:
+    return sorted(_ENGINES)
+
+
+def load_engine(spec: str) -> WatermarkEngine:
+    """
+    Resolve a registered version or a "package.module:attr" path to an
+    engine instance (or class).
+    """
+
+    if spec in _ENGINES:
+        return _ENGINES[spec]
+
+    if ":" not in spec:
+        raise KeyError(f"Unknown watermark engine {spec!r}")
+
+    module_name, attr = spec.split(":", 1)
+
+    engine = getattr(importlib.import_module(module_name), attr)
+
+    return engine() if isinstance(engine, type) else engine
+
+
+register_engine(ReferenceEngine())
+register_engine(MaskedEngine())
+register_engine(PermutedEngine())
+
+DEFAULT_ENGINE_VERSION = os.getenv("AURORAA_DEFAULT_ENGINE", PERMUTED_ALGORITHM_VERSION)
+
+
+def get_watermark_engine(version: str | None = None) -> WatermarkEngine:
+    """
+    Engine for a stored algorithm version; the default engine when None.
+    """
+
+    version = version or DEFAULT_ENGINE_VERSION
+
+    try:
+        return _ENGINES[version]
+    except KeyError:
+        raise KeyError(f"No watermark engine registered for {version!r}")
@@ -6,32 +6,18 @@ import pywt
 
 from .image_config import (
     DWT_WAVE,
-    DCT_POS_A,
-    DCT_POS_B,
+    LAYOUT_SHUFFLE,
     SIGNAL_LENGTH,
     REPEAT,
     TARGET
 )
 
-from .image_crypto import shuffled_blocks
+from .image_crypto import block_order
+from .image_parallel import TRANSFORM_TILES, map_tiles
+from .image_transform import delta_plane, haar_bands, luma_strips
 
 
-def detect_watermark_signal(
-    image_bytes: bytes,
-    owner_id: str,
-    epoch: str
-) -> np.ndarray | None:
-
-    # --------------------------------
-    # Decode image
-    # --------------------------------
-    img = cv2.imdecode(
-        np.frombuffer(image_bytes, np.uint8),
-        cv2.IMREAD_COLOR
-    )
-
-    if img is None:
-        return None
+def _luma(img: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
 
     # --------------------------------
     # Resize normalization (CRITICAL)
@@ -48,59 +34,158 @@ def detect_watermark_signal(
     y = cv2.cvtColor(
         img,
         cv2.COLOR_BGR2YCrCb
-    )[:, :, 0].astype(np.float32)
+    )[:, :, 0]
 
     h, w = y.shape
+
     y = y[:h - h % 2, :w - w % 2]
 
-    # --------------------------------
-    # DWT
-    # --------------------------------
-    LL, (LH, HL, HH) = pywt.dwt2(y, DWT_WAVE)
+    if out is None:
+        return y.astype(np.float32)
 
-    # --------------------------------
-    # Multi-band extraction
-    # --------------------------------
-    bands = [LL, LH, HL]
+    # Straight into a batch slot, no intermediate float plane
+    np.copyto(out, y, casting="unsafe")
 
-    deltas = []
+    return out
 
-    # 3 bands × signal × repeat
-    max_len = SIGNAL_LENGTH * REPEAT * 3
 
-    for band in bands:
+def _bands(y: np.ndarray) -> tuple[np.ndarray, ...]:
+
+    if DWT_WAVE == "haar":
+        return haar_bands(y)
+
+    LL, (LH, HL, HH) = pywt.dwt2(y, DWT_WAVE, axes=(-2, -1))
+
+    return LL, LH, HL
 
-        blocks = shuffled_blocks(
-            band.shape[0],
-            band.shape[1],
-            owner_id,
-            epoch
+
+def luma_delta_planes(y: np.ndarray, tiles: int = TRANSFORM_TILES) -> np.ndarray:
+    """
+    Normalised float32 luma (..., H, W) -> (..., 3, gh, gw) block deltas
+    for LL, LH, HL. A stacked batch goes through as one array
+    computation; row strips are spread over the thread budget.
+    """
+
+    def strip_planes(rows):
+
+        return np.stack(
+            [delta_plane(band) for band in _bands(y[..., rows, :])],
+            axis=-3
         )
 
-        for idx, (i, j) in enumerate(blocks):
+    return np.concatenate(
+        map_tiles(strip_planes, luma_strips(y.shape[-2], tiles)),
+        axis=-2
+    )
+
+
+def array_delta_planes(img: np.ndarray, tiles: int = TRANSFORM_TILES) -> np.ndarray:
+    """
+    uint8 BGR ([N,] H, W, 3) -> ([N,] 3, gh, gw) block deltas for LL, LH, HL.
+    Owner/epoch independent.
+    """
 
-            if idx >= max_len:
-                break
+    if img.ndim == 4:
+        return luma_delta_planes(np.stack([_luma(frame) for frame in img]), tiles)
 
-            block = band[i:i+8, j:j+8]
+    return luma_delta_planes(_luma(img), tiles)
 
-            if block.shape != (8, 8):
-                continue
 
-            dct = cv2.dct(block)
+def _decode(image_bytes: bytes) -> np.ndarray | None:
 
-            delta = dct[DCT_POS_A] - dct[DCT_POS_B]
+    return cv2.imdecode(
+        np.frombuffer(image_bytes, np.uint8),
+        cv2.IMREAD_COLOR
+    )
 
-            deltas.append(delta)
 
-    if not deltas:
+def load_delta_planes(image_bytes: bytes) -> np.ndarray | None:
+    """
+    Decode, normalise and transform once; owner/epoch independent.
+    """
+
+    img = _decode(image_bytes)
+
+    if img is None:
         return None
 
-    # Debug (remove later)
-    print(
-        "DELTAS:",
-        round(np.mean(deltas), 4),
-        round(np.std(deltas), 4)
-    )
+    return array_delta_planes(img)
+
+
+def load_delta_planes_batch(images: list[bytes]) -> list[np.ndarray | None]:
+    """
+    load_delta_planes for several uploads: decoded and normalised one by
+    one into a single stack, then transformed as one batch.
+    """
+
+    stack = None
+    valid = []
+
+    for n, image_bytes in enumerate(images):
+
+        img = _decode(image_bytes)
+
+        if img is None:
+            continue
+
+        if stack is None:
+            stack = np.empty((len(images), TARGET, TARGET), dtype=np.float32)
+
+        _luma(img, stack[len(valid)])
+        valid.append(n)
+
+    planes = [None] * len(images)
+
+    if valid:
+
+        # Strips sized like a single image's keep the batch in cache
+        stacked = luma_delta_planes(
+            stack[:len(valid)],
+            TRANSFORM_TILES * len(valid)
+        )
+
+        for n, p in zip(valid, stacked):
+            planes[n] = p
+
+    return planes
+
+
+def gather_deltas(
+    planes: np.ndarray,
+    owner_id: str,
+    epoch: str,
+    layout: str = LAYOUT_SHUFFLE
+) -> np.ndarray | None:
+    """
+    (..., 3, gh, gw) planes -> (..., n) deltas in embedding order: every
+    block of LL in keyed order, then LH, then HL.
+    """
+
+    gh, gw = planes.shape[-2:]
+
+    if gh * gw == 0:
+        return None
+
+    # 3 bands × signal × repeat
+    max_len = SIGNAL_LENGTH * REPEAT * 3
+
+    order = block_order(gh, gw, owner_id, epoch, layout)[:max_len]
+
+    flat = planes.reshape(*planes.shape[:-2], gh * gw)[..., order]
+
+    return flat.reshape(*planes.shape[:-3], -1)
+
+
+def detect_watermark_signal(
+    image_bytes: bytes,
+    owner_id: str,
+    epoch: str,
+    layout: str = LAYOUT_SHUFFLE
+) -> np.ndarray | None:
+
+    planes = load_delta_planes(image_bytes)
+
+    if planes is None:
+        return None
 
-    return np.array(deltas, dtype=np.float32)
+    return gather_deltas(planes, owner_id, epoch, layout)
@@ -0,0 +1,134 @@
+# image_header.py
+
+import struct
+
+# --------------------------------
+# Header-only image probing
+# --------------------------------
+# Reads format and dimensions without decoding pixels, so callers can
+# reason about the decoded size of an upload before paying for it.
+
+
+def _probe_png(data: bytes):
+
+    if len(data) < 24 or data[12:16] != b"IHDR":
+        return None
+
+    w, h = struct.unpack(">II", data[16:24])
+
+    return "png", w, h
+
+
+def _probe_gif(data: bytes):
+
+    if len(data) < 10:
+        return None
+
+    w, h = struct.unpack("<HH", data[6:10])
+
+    return "gif", w, h
+
+
+def _probe_bmp(data: bytes):
+
+    if len(data) < 26:
+        return None
+
+    w, h = struct.unpack("<ii", data[18:26])
+
+    return "bmp", abs(w), abs(h)
+
+
+def _probe_webp(data: bytes):
+
+    if len(data) < 30:
+        return None
+
+    chunk = data[12:16]
+
+    if chunk == b"VP8X":
+        w = int.from_bytes(data[24:27], "little") + 1
+        h = int.from_bytes(data[27:30], "little") + 1
+        return "webp", w, h
+
+    if chunk == b"VP8L":
+        bits = int.from_bytes(data[21:25], "little")
+        w = (bits & 0x3FFF) + 1
+        h = ((bits >> 14) & 0x3FFF) + 1
+        return "webp", w, h
+
+    if chunk == b"VP8 ":
+        w, h = struct.unpack("<HH", data[26:30])
+        return "webp", w & 0x3FFF, h & 0x3FFF
+
+    return None
+
+
+# SOF markers carrying frame dimensions (excludes DHT/JPG/DAC)
+_JPEG_SOF = {
+    0xC0, 0xC1, 0xC2, 0xC3,
+    0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB,
+    0xCD, 0xCE, 0xCF,
+}
+
+
+def _probe_jpeg(data: bytes):
+
+    pos = 2
+    n = len(data)
+
+    while pos + 4 <= n:
+
+        if data[pos] != 0xFF:
+            return None
+
+        marker = data[pos + 1]
+
+        # Fill bytes
+        if marker == 0xFF:
+            pos += 1
+            continue
+
+        # Standalone markers
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+
+        if marker in _JPEG_SOF:
+
+            if pos + 9 > n:
+                return None
+
+            h, w = struct.unpack(">HH", data[pos + 5:pos + 9])
+
+            return "jpeg", w, h
+
+        pos += 2 + length
+
+    return None
+
+
+def probe_image(data: bytes) -> tuple[str, int, int] | None:
+    """
+    Return (format, width, height) from the header, or None if unknown.
+    """
+
+    if data[:3] == b"\xff\xd8\xff":
+        return _probe_jpeg(data)
+
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return _probe_png(data)
+
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _probe_webp(data)
+
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return _probe_gif(data)
+
+    if data[:2] == b"BM":
+        return _probe_bmp(data)
+
+    return None
@@ -0,0 +1,129 @@
+# image_parallel.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# --------------------------------
+# Configuration
+# --------------------------------
+
+# Cores this process may use for transform work, shared by concurrent
+# requests. Defaults to this worker's share of the machine.
+THREAD_BUDGET = int(os.getenv(
+    "AURORAA_THREAD_BUDGET",
+    str(max(1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1")))),
+))
+
+# Row strips per image for the DWT and band passes; 1 runs serially
+TRANSFORM_TILES = int(os.getenv("AURORAA_TRANSFORM_TILES", "3"))
+
+
+# --------------------------------
+# Thread budget
+# --------------------------------
+# Every thread running a transform holds one slot; extra tile threads
+# are only granted from free slots. An idle instance fans a request out
+# over several cores (lower single-image latency), a saturated one runs
+# each request on its own thread with no extra contention.
+
+class ThreadBudget:
+
+    def __init__(self, size: int):
+
+        self.size = max(1, size)
+
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def share(self, wanted: int):
+        """
+        Hold the caller's slot plus up to `wanted` extra ones (never
+        blocks). Yields the number of extra threads granted.
+        """
+
+        with self._lock:
+            extra = max(0, min(wanted, self.size - self._used - 1))
+            self._used += 1 + extra
+
+        try:
+            yield extra
+        finally:
+            with self._lock:
+                self._used -= 1 + extra
+
+    def resize(self, size: int):
+
+        with self._lock:
+            self.size = max(1, size)
+
+
+budget = ThreadBudget(THREAD_BUDGET)
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+
+    global _executor
+
+    with _executor_lock:
+
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, budget.size - 1),
+                thread_name_prefix="transform",
+            )
+
+        return _executor
+
+
+def map_tiles(fn, tiles: list) -> list:
+    """
+    [fn(t) for t in tiles], spread over the caller and whatever extra
+    threads the budget grants. numpy, pywt and OpenCV release the GIL in
+    their kernels, so tiles run truly in parallel.
+    """
+
+    if len(tiles) <= 1:
+        return [fn(t) for t in tiles]
+
+    with budget.share(len(tiles) - 1) as extra:
+
+        if extra == 0:
+            return [fn(t) for t in tiles]
+
+        workers = extra + 1
+
+        def run(k):
+            return [(i, fn(tiles[i])) for i in range(k, len(tiles), workers)]
+
+        futures = [_get_executor().submit(run, k) for k in range(1, workers)]
+
+        results = run(0)
+
+        for future in futures:
+            results.extend(future.result())
+
+    return [r for _, r in sorted(results, key=lambda item: item[0])]
+
+
+def configure_threads(size: int = THREAD_BUDGET):
+    """
+    Size the budget and OpenCV's pool together. Call once per process
+    (after fork).
+
+    With tiling on, OpenCV runs single-threaded: its pool is not charged
+    to the budget, so every request thread's decode/resize/convert would
+    otherwise fan out to `size` more threads on a saturated worker.
+    map_tiles owns the parallelism.
+    """
+
+    import cv2
+
+    budget.resize(size)
+
+    cv2.setNumThreads(1 if TRANSFORM_TILES > 1 else max(1, size))
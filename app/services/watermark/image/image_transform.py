@@ -0,0 +1,175 @@
+# image_transform.py
+
+import math
+
+import numpy as np
+
+from .image_config import DCT_POS_A, DCT_POS_B, DWT_WAVE, MASK_MIN, MASK_MAX
+
+# --------------------------------
+# Block-DCT coefficient pair as a spatial pattern
+# --------------------------------
+# cv2.dct on an 8x8 block is orthonormal, D = C @ X @ C.T, so
+#
+#   D[A] - D[B]           = <X, P>         (extraction)
+#   idct(D + s*(eA - eB)) = X + s * P      (embedding)
+#
+# with P = outer(C[a0], C[a1]) - outer(C[b0], C[b1]). Both become a
+# single vectorized pass over all blocks of a band instead of one
+# cv2.dct / cv2.idct call per block.
+
+
+def _dct_matrix(n: int = 8) -> np.ndarray:
+
+    c = np.zeros((n, n), dtype=np.float64)
+
+    for u in range(n):
+
+        alpha = math.sqrt((1 if u == 0 else 2) / n)
+
+        for x in range(n):
+            c[u, x] = alpha * math.cos((2 * x + 1) * u * math.pi / (2 * n))
+
+    return c
+
+
+_C = _dct_matrix()
+
+PAIR_PATTERN = (
+    np.outer(_C[DCT_POS_A[0]], _C[DCT_POS_A[1]])
+    - np.outer(_C[DCT_POS_B[0]], _C[DCT_POS_B[1]])
+).astype(np.float32)
+
+
+# --------------------------------
+# Block grid
+# --------------------------------
+
+def block_grid(h: int, w: int) -> tuple[int, int]:
+    """
+    Rows/cols of 8x8 blocks used by the embedder on an (h, w) band.
+    Matches shuffled_blocks: i in range(0, h - 7, 8), j in range(0, w - 8, 8).
+    """
+
+    return len(range(0, h - 7, 8)), len(range(0, w - 8, 8))
+
+
+def luma_strips(h: int, tiles: int) -> list[slice]:
+    """
+    Row ranges of an even-height luma plane for tiled transforms, cut on
+    16-row boundaries so every 8x8 band block falls in one strip. The
+    Haar DWT only couples 2x2 pixels, so per-strip transforms are
+    identical to the full-image one; other wavelets are not tiled.
+    """
+
+    gh = block_grid(h // 2, 8)[0]
+
+    if tiles <= 1 or gh < 2 or DWT_WAVE != "haar":
+        return [slice(None)]
+
+    cuts = sorted(set((np.linspace(0, gh, min(tiles, gh) + 1).astype(int) * 16).tolist()))
+
+    cuts[-1] = h
+
+    return [slice(a, b) for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+def _block_view(band: np.ndarray, gh: int, gw: int) -> np.ndarray:
+    """
+    (..., gh, 8, gw, 8) view of the block area of a (..., H, W) band.
+    """
+
+    lead = band.shape[:-2]
+
+    return band[..., :gh * 8, :gw * 8].reshape(*lead, gh, 8, gw, 8)
+
+
+# --------------------------------
+# Haar analysis
+# --------------------------------
+
+def haar_bands(y: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    LL, LH, HL of a one-level Haar DWT of (..., H, W) with even H and W:
+    pywt.dwt2(y, "haar") up to float rounding, as plain array arithmetic
+    over any leading batch axes (several times faster than pywt). HH is
+    not needed for extraction.
+    """
+
+    top, bottom = y[..., 0::2, :], y[..., 1::2, :]
+
+    a, b = top[..., 0::2], top[..., 1::2]
+    c, d = bottom[..., 0::2], bottom[..., 1::2]
+
+    s, t = a + b, c + d
+    u, v = a - b, c - d
+
+    return (s + t) * 0.5, (s - t) * 0.5, (u + v) * 0.5
+
+
+# --------------------------------
+# Extraction / embedding
+# --------------------------------
+
+def delta_plane(band: np.ndarray) -> np.ndarray:
+    """
+    D[A] - D[B] for every block: (..., H, W) -> (..., gh, gw) float32.
+    """
+
+    gh, gw = block_grid(*band.shape[-2:])
+
+    return np.einsum(
+        "...ixjy,xy->...ij",
+        _block_view(band, gh, gw),
+        PAIR_PATTERN,
+        optimize=True,
+    ).astype(np.float32, copy=False)
+
+
+def add_pattern(band: np.ndarray, amplitude: np.ndarray):
+    """
+    In place: add amplitude[i, j] * PAIR_PATTERN to every block.
+    `amplitude` is (gh, gw) or (..., gh, gw) broadcastable to the band.
+    """
+
+    gh, gw = amplitude.shape[-2:]
+
+    view = _block_view(band, gh, gw)
+
+    view += (
+        amplitude[..., :, None, :, None]
+        * PAIR_PATTERN[:, None, :]
+    ).astype(band.dtype, copy=False)
+
+
+def block_rms(band: np.ndarray, gh: int, gw: int) -> np.ndarray:
+    """
+    RMS energy (standard deviation) of every 8x8 block: (..., gh, gw).
+    """
+
+    view = _block_view(band, gh, gw)
+
+    # Block variance from first and second moments in one pass each
+    mean = view.sum(axis=(-3, -1)) / 64.0
+    power = np.einsum("...aibj,...aibj->...ab", view, view) / 64.0
+
+    return np.sqrt(np.maximum(power - mean * mean, 0.0) + 1.0)
+
+
+def mask_from_rms(rms: np.ndarray) -> np.ndarray:
+    """
+    Block RMS grid -> strength multiplier, mean-normalised per band and
+    clipped to [MASK_MIN, MASK_MAX].
+    """
+
+    scale = rms / rms.mean(axis=(-2, -1), keepdims=True)
+
+    return np.clip(scale, MASK_MIN, MASK_MAX, out=scale)
+
+
+def texture_mask(band: np.ndarray, gh: int, gw: int) -> np.ndarray:
+    """
+    Per-block strength multiplier (..., gh, gw) from block RMS energy.
+    """
+
+    return mask_from_rms(block_rms(band, gh, gw))
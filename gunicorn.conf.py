@@ -0,0 +1,36 @@
+# gunicorn.conf.py
+#
+# Preforking mode: the app and codec stack are imported once in the
+# master and shared copy-on-write by the workers.
+#
+#     gunicorn -c gunicorn.conf.py app.main:app
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+
+
+def on_starting(server):
+
+    from app.services.warmup import warm_imports
+
+    # Imports + secret only: no threads or sockets before fork
+    warm_imports()
+
+    # Keep the preloaded heap out of GC passes so pages stay shared
+    gc.freeze()
+
+
+def post_fork(server, worker):
+
+    from app.database.database import dispose_engine
+
+    dispose_engine()